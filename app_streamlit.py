@@ -5,20 +5,62 @@ APP STREAMLIT V28.6 - URLs FICHES DEPUIS LEONAR
 - URLs fiches de poste depuis Leonar (custom_text_1) ou manuelles
 - Messages injectés dans custom_variable_1/2/3 (séquence auto)
 - Backup dans notes (lisible)
-- Pagination Leonar (récupère tous les prospects)
+- Pagination Leonar parallèle (tous les prospects, filtrés au fil de l'eau)
+- Test manuel en streaming (message 1 validé dès sa fin)
+- Génération groupée des prospects d'une même fiche (un appel Claude)
 ═══════════════════════════════════════════════════════════════════
 """
 
 import streamlit as st
-import requests
 import os
 import re
 import json
-import time
+import threading
 import anthropic
-from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from config import (
+    MAX_PROSPECTS_IN_FLIGHT, CONCURRENCY_LIMITS, STAGE_TIMEOUT_SECONDS,
+    APIFY_BATCH_ENABLED, APIFY_BATCH_CHUNK_SIZE, SCRAPE_CACHE_TTL_HOURS, SCRAPE_CACHE_MAX_ENTRIES,
+    JOB_POSTING_CACHE_TTL_HOURS, BATCH_POLL_INTERVAL_SECONDS,
+    GENERATION_CACHE_ENABLED, GENERATION_CACHE_TTL_HOURS, GENERATION_CACHE_MAX_ENTRIES,
+    GROUPED_GENERATION_SIZE, GROUPED_GENERATION_WAIT_SECONDS,
+    CLAUDE_MODEL_TIERS, MODEL_ROUTING_ENABLED, MODEL_ROUTING_THRESHOLDS,
+    PROMPT_INPUT_TOKEN_BUDGET, PROMPT_BUDGET_SHARES, PROMPT_MAX_TOKENS_PER_POST
+)
+from prospection_utils.pipeline import limiter, run_concurrent, fan_out
+from prospection_utils.logger import log_event
+from prospection_utils.request_grouping import RequestGrouper
+from prospection_utils.disk_cache import make_key
+from prospection_utils.http_client import http
+from prospection_utils.leonar_auth import get_token_manager
+from prospection_utils.leonar_api import iter_matching_pages, LeonarAPIError
+from prospection_utils.leonar_writeback import LeonarWriteback
+from prospection_utils.processed_store import processed_store, sequence_hash
+from prospection_utils.prompt_cache import cached_system
+from prospection_utils.cost_tracker import usage_tokens, compute_cost
+from prospection_utils.rate_limiter import create_message, stream_message, claude_limiter
+from prospection_utils.sequence_stream import SequenceStreamParser, MalformedSequenceError, MESSAGE_2_MARKER
+from prospection_utils.generation_cache import (
+    generation_key, lookup_generation, store_generation, generation_lock
+)
+from prospection_utils.message_batches import (
+    make_custom_id, submit_batches, wait_for_batch, iter_batch_results,
+    save_manifest, load_pending_manifests, remove_manifest
+)
+from prospection_utils.apify_batch import (
+    scrape_posts_batch, scrape_posts_cached, scrape_profile_cached, normalize_linkedin_url
+)
+from prospection_utils import scrape_cache, http_cache, generation_cache, model_router, prompt_budget
+from prospection_utils.model_router import route_model, max_output_tokens
+from prospection_utils.prompt_budget import (
+    estimate_tokens, allocate, fit_items, fit_job_description, max_tokens_per_post, share_budget
+)
+from prospection_utils.http_cache import fetch_page, cached_job_posting
+from prospection_utils.date_parsing import filter_recent_posts
+from prospection_utils.html_parsing import JobPageParser, has_class, response_charset
 
 load_dotenv()
 
@@ -41,13 +83,35 @@ except:
     LEONAR_PASSWORD = os.getenv("LEONAR_PASSWORD")
     LEONAR_CAMPAIGN_ID = os.getenv("LEONAR_CAMPAIGN_ID")
 
-PROCESSED_FILE = "processed_prospects.txt"
-
 # Session state
 if 'leonar_prospects' not in st.session_state:
     st.session_state.leonar_prospects = []
 if 'generation_stats' not in st.session_state:
-    st.session_state.generation_stats = {'calls': 0, 'tokens': 0, 'cost': 0}
+    st.session_state.generation_stats = {
+        'calls': 0, 'tokens': 0, 'cache_read_tokens': 0, 'cost': 0, 'generation_cache_hits': 0,
+        'calls_by_model': {}
+    }
+
+# Limites de concurrence par service (partagées par tous les workers)
+limiter.configure(CONCURRENCY_LIMITS)
+scrape_cache.configure(ttl_hours=SCRAPE_CACHE_TTL_HOURS, max_entries=SCRAPE_CACHE_MAX_ENTRIES)
+http_cache.configure(ttl_hours=JOB_POSTING_CACHE_TTL_HOURS)
+generation_cache.configure(
+    enabled=GENERATION_CACHE_ENABLED,
+    ttl_hours=GENERATION_CACHE_TTL_HOURS,
+    max_entries=GENERATION_CACHE_MAX_ENTRIES
+)
+model_router.configure(
+    model_tiers=CLAUDE_MODEL_TIERS,
+    enabled=MODEL_ROUTING_ENABLED,
+    thresholds=MODEL_ROUTING_THRESHOLDS
+)
+prompt_budget.configure(
+    input_budget=PROMPT_INPUT_TOKEN_BUDGET,
+    shares=PROMPT_BUDGET_SHARES,
+    max_tokens_per_post=PROMPT_MAX_TOKENS_PER_POST
+)
+_stats_lock = threading.Lock()
 
 
 # ========================================
@@ -55,91 +119,84 @@ if 'generation_stats' not in st.session_state:
 # ========================================
 
 def get_leonar_token():
-    """Obtient un token d'authentification Leonar"""
-    try:
-        r = requests.post(
-            'https://dashboard.leonar.app/api/1.1/wf/auth',
-            json={"email": LEONAR_EMAIL, "password": LEONAR_PASSWORD},
-            timeout=10
-        )
-        return r.json()['response']['token'] if r.status_code == 200 else None
-    except:
-        return None
+    """
+    Token d'authentification Leonar
+    En cache (mémoire + disque) : pas de login à chaque rerun Streamlit
+    """
+    return get_token_manager(LEONAR_EMAIL, LEONAR_PASSWORD).get_token()
 
 
-def get_new_prospects_leonar(token):
-    """Récupère les nouveaux prospects depuis Leonar (avec pagination)"""
-    try:
-        all_prospects = []
-        cursor = 0
-        page = 1
-        
-        # Paginer pour récupérer TOUS les prospects
-        while True:
-            url = f'https://dashboard.leonar.app/api/1.1/obj/matching?constraints=[{{"key":"campaign","constraint_type":"equals","value":"{LEONAR_CAMPAIGN_ID}"}}]&cursor={cursor}&limit=100'
-            
-            r = requests.get(
-                url,
-                headers={'Authorization': f'Bearer {token}'},
-                timeout=15
-            )
-            
-            if r.status_code != 200:
-                st.error(f"❌ Leonar API erreur: status {r.status_code}")
-                break
-            
-            data = r.json()
-            results = data.get('response', {}).get('results', [])
-            remaining = data.get('response', {}).get('remaining', 0)
-            
-            all_prospects.extend(results)
-            st.info(f"📊 Page {page}: {len(results)} prospects (total: {len(all_prospects)}, remaining: {remaining})")
-            
-            # S'il n'y a plus de résultats, arrêter
-            if not results or remaining == 0:
-                break
-            
-            # Passer à la page suivante
-            cursor += len(results)
-            page += 1
-            
-            # Sécurité : max 10 pages (1000 prospects)
-            if page > 10:
-                st.warning("⚠️ Limite de 1000 prospects atteinte")
-                break
-        
-        st.info(f"📊 Debug: {len(all_prospects)} prospects TOTAL trouvés dans Leonar")
-        
-        processed = load_processed()
-        st.info(f"📊 Debug: {len(processed)} prospects déjà traités dans le fichier")
+def iter_new_prospects_leonar(token, on_page=None):
+    """
+    Génère les prospects à traiter, page par page (pagination parallèle)
+
+    Chaque page est filtrée (registre local + notes Leonar) dès sa réception :
+    les premiers prospects sont disponibles avant la fin de la pagination.
+
+    Args:
+        token (str): Token Leonar
+        on_page (callable): on_page(page, nb_reçus, nb_gardés, total) après chaque page
+
+    Yields:
+        dict: Prospect Leonar non traité
+    """
+    seen = set()
+
+    pages = iter_matching_pages(
+        token,
+        LEONAR_CAMPAIGN_ID,
+        max_workers=limiter.limits.get('leonar', 4)
+    )
+    for page, results, total in pages:
+        # Une requête indexée par page
+        processed = processed_store.processed_among(p['_id'] for p in results)
         
-        # Filtrer
-        filtered = []
-        for p in all_prospects:
+        kept = []
+        for p in results:
             pid = p['_id']
-            notes = p.get('notes', '')
+            if pid in seen:
+                continue  # Doublon (page décalée pendant la pagination)
+            seen.add(pid)
             
             if pid in processed:
-                continue  # Déjà traité (fichier local)
+                continue  # Déjà traité (registre local)
             
+            notes = p.get('notes', '')
             if notes and len(notes) >= 100 and 'MESSAGE 1' in notes:
                 continue  # Déjà traité (notes Leonar)
             
-            filtered.append(p)
+            kept.append(p)
         
+        if on_page:
+            on_page(page, len(results), len(kept), total)
+        yield from kept
+
+
+def get_new_prospects_leonar(token):
+    """Récupère tous les nouveaux prospects depuis Leonar (pagination parallèle, sans limite)"""
+    def on_page(page, received, kept, total):
+        st.info(f"📊 Page {page}: {received} prospects ({kept} à traiter) - total campagne: {total}")
+    
+    try:
+        filtered = list(iter_new_prospects_leonar(token, on_page=on_page))
         st.success(f"✅ {len(filtered)} prospects à traiter après filtrage")
         return filtered
         
+    except LeonarAPIError as e:
+        if e.status_code == 401:
+            # Token révoqué côté Leonar : le prochain appel se ré-authentifie
+            get_token_manager(LEONAR_EMAIL, LEONAR_PASSWORD).invalidate()
+        st.error(f"❌ {e}")
+        return []
     except Exception as e:
         st.error(f"Erreur Leonar: {e}")
         return []
 
 
-def update_prospect_leonar(token, prospect_id, sequence_data):
-    """Met à jour le prospect dans Leonar avec la séquence générée"""
-    try:
-        # Backup dans les notes (lisible)
-        formatted_notes = f"""═══════════════════════════════════════════════════════════════
+def build_leonar_fields(sequence_data):
+    """Champs Leonar à écrire pour une séquence générée (export via LeonarWriteback)"""
+    # Backup dans les notes (lisible)
+    formatted_notes = f"""═══════════════════════════════════════════════════════════════
 OBJETS SUGGÉRÉS
 ═══════════════════════════════════════════════════════════════
 
@@ -165,35 +222,13 @@ MESSAGE 3 (BREAK-UP - J+12)
 
 ═══════════════════════════════════════════════════════════════"""
 
-        # Envoi : notes (backup) + custom_variables (séquence auto)
-        requests.patch(
-            f'https://dashboard.leonar.app/api/1.1/obj/matching/{prospect_id}',
-            headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
-            json={
-                "notes": formatted_notes,
-                "custom_variable_1": sequence_data.get('message_1', ''),
-                "custom_variable_2": sequence_data.get('message_2', ''),
-                "custom_variable_3": sequence_data.get('message_3', '')
-            },
-            timeout=10
-        )
-        return True
-    except:
-        return False
-
-
-def load_processed():
-    """Charge la liste des prospects déjà traités"""
-    if os.path.exists(PROCESSED_FILE):
-        with open(PROCESSED_FILE, 'r') as f:
-            return set(f.read().splitlines())
-    return set()
-
-
-def save_processed(pid):
-    """Sauvegarde un prospect comme traité"""
-    with open(PROCESSED_FILE, 'a') as f:
-        f.write(f"{pid}\n")
+    # Notes (backup) + custom_variables (séquence auto)
+    return {
+        "notes": formatted_notes,
+        "custom_variable_1": sequence_data.get('message_1', ''),
+        "custom_variable_2": sequence_data.get('message_2', ''),
+        "custom_variable_3": sequence_data.get('message_3', '')
+    }
 
 
 # ========================================
@@ -209,173 +244,40 @@ def init_apify_client():
 
 
 def scrape_linkedin_profile(apify_client, linkedin_url):
-    """Scrape un profil LinkedIn"""
+    """Scrape un profil LinkedIn (cache disque)"""
     try:
-        run = apify_client.actor("dev_fusion/Linkedin-Profile-Scraper").call(
-            run_input={"profileUrls": [linkedin_url]}
-        )
-        items = list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
+        items = scrape_profile_cached(apify_client, linkedin_url)
         return items[0] if items else {}
     except:
         return {}
 
 
 def scrape_linkedin_posts(apify_client, linkedin_url):
-    """Scrape les posts LinkedIn"""
+    """Scrape les posts LinkedIn (cache disque, filtrage à la lecture)"""
     try:
-        run = apify_client.actor("supreme_coder/linkedin-post").call(
-            run_input={
-                "deepScrape": True,
-                "limitPerSource": 10,
-                "rawData": False,
-                "urls": [linkedin_url]
-            }
-        )
-        items = list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
+        items = scrape_posts_cached(apify_client, linkedin_url, limit_per_source=10)
         # Filtre strict 6 mois
         return filter_recent_posts(items, max_age_months=6)
     except:
         return []
 
 
-def filter_recent_posts(posts, max_age_months=6):
+def scrape_linkedin_posts_batch(apify_client, linkedin_urls):
     """
-    Filtre les posts < 6 mois
-    Si date non parsable → on INCLUT le post (moins strict)
+    Scrape les posts de toute une campagne en quelques runs Apify
+    Retourne {url_normalisée: posts filtrés <6 mois} (URLs en échec absentes)
     """
-    if not posts:
-        return []
-    
-    cutoff = datetime.now() - timedelta(days=max_age_months * 30)
-    recent = []
-    
-    for post in posts:
-        if not isinstance(post, dict):
-            continue
-        
-        # Récupérer la date - chercher TOUS les champs possibles
-        date_str = (
-            post.get('date') or 
-            post.get('postedDate') or 
-            post.get('postedAt') or
-            post.get('timestamp') or
-            post.get('publishedAt') or
-            post.get('time') or
-            post.get('posted') or
-            post.get('datePosted') or
-            ''
+    try:
+        posts_by_url = scrape_posts_batch(
+            apify_client,
+            linkedin_urls,
+            limit_per_source=10,
+            chunk_size=APIFY_BATCH_CHUNK_SIZE
         )
-        
-        # Si pas de date trouvée, on INCLUT quand même le post
-        # (approche permissive - mieux vaut un post potentiellement vieux qu'aucun post)
-        if not date_str:
-            recent.append(post)
-            continue
-        
-        # Parser la date
-        post_date = parse_date(date_str)
-        
-        # Si parsing échoue, on inclut quand même
-        if post_date is None:
-            recent.append(post)
-            continue
-        
-        # Si date récente, on inclut
-        if post_date >= cutoff:
-            recent.append(post)
-    
-    return recent[:5]
-
-
-def parse_date(date_str):
-    """Parse une date avec plusieurs formats"""
-    if not date_str:
-        return None
-    
-    date_str = str(date_str).strip()
-    
-    # Formats standards
-    formats = [
-        '%Y-%m-%d',
-        '%Y-%m-%dT%H:%M:%S',
-        '%Y-%m-%dT%H:%M:%S.%fZ',
-        '%Y-%m-%dT%H:%M:%SZ',
-        '%d/%m/%Y',
-        '%d-%m-%Y',
-        '%Y/%m/%d',
-        '%B %d, %Y',
-        '%b %d, %Y',
-    ]
-    
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str[:19], fmt)
-        except:
-            continue
-    
-    # Dates relatives ("2d ago", "3w ago", "il y a 2 jours")
-    return parse_relative_date(date_str)
-
-
-def parse_relative_date(date_str):
-    """Parse les dates relatives - formats LinkedIn et autres"""
-    if not date_str:
-        return None
-    
-    date_str = date_str.lower().strip()
-    now = datetime.now()
-    
-    # Patterns anglais et français
-    patterns = [
-        # Anglais complet
-        (r'(\d+)\s*d(?:ay)?s?\s*ago', 'days'),
-        (r'(\d+)\s*w(?:eek)?s?\s*ago', 'weeks'),
-        (r'(\d+)\s*mo(?:nth)?s?\s*ago', 'months'),
-        (r'(\d+)\s*h(?:our)?s?\s*ago', 'hours'),
-        (r'(\d+)\s*yr?s?\s*ago', 'years'),
-        # Anglais court (LinkedIn style: "1d", "2w", "3mo")
-        (r'^(\d+)d$', 'days'),
-        (r'^(\d+)w$', 'weeks'),
-        (r'^(\d+)mo$', 'months'),
-        (r'^(\d+)h$', 'hours'),
-        (r'^(\d+)yr?$', 'years'),
-        # Avec espace
-        (r'(\d+)\s*d\b', 'days'),
-        (r'(\d+)\s*w\b', 'weeks'),
-        (r'(\d+)\s*mo\b', 'months'),
-        (r'(\d+)\s*h\b', 'hours'),
-        # Français
-        (r'il y a (\d+)\s*jour', 'days'),
-        (r'il y a (\d+)\s*semaine', 'weeks'),
-        (r'il y a (\d+)\s*mois', 'months'),
-        (r'il y a (\d+)\s*heure', 'hours'),
-        (r'il y a (\d+)\s*an', 'years'),
-        # "posted X days ago"
-        (r'posted\s*(\d+)\s*d', 'days'),
-        (r'posted\s*(\d+)\s*w', 'weeks'),
-        (r'posted\s*(\d+)\s*mo', 'months'),
-        # "X days" sans "ago"
-        (r'^(\d+)\s*days?$', 'days'),
-        (r'^(\d+)\s*weeks?$', 'weeks'),
-        (r'^(\d+)\s*months?$', 'months'),
-    ]
-    
-    for pattern, unit in patterns:
-        match = re.search(pattern, date_str)
-        if match:
-            value = int(match.group(1))
-            if unit == 'hours':
-                return now - timedelta(hours=value)
-            elif unit == 'days':
-                return now - timedelta(days=value)
-            elif unit == 'weeks':
-                return now - timedelta(weeks=value)
-            elif unit == 'months':
-                return now - timedelta(days=value * 30)
-            elif unit == 'years':
-                return now - timedelta(days=value * 365)
-    
-    return None
+        return {url: filter_recent_posts(items, max_age_months=6) for url, items in posts_by_url.items()}
+    except Exception as e:
+        print(f"Erreur Apify batch: {e}")
+        return {}
 
 
 # ========================================
@@ -394,7 +296,7 @@ def search_web_prospect(full_name, company_name):
         # Recherche actualités récentes
         query = f'"{full_name}" "{company_name}" OR "{full_name}" finance'
         
-        response = requests.post(
+        response = http.post(
             'https://google.serper.dev/search',
             headers={
                 'X-API-KEY': SERPER_API_KEY,
@@ -444,6 +346,56 @@ def search_web_prospect(full_name, company_name):
 # SCRAPING FICHE DE POSTE - MULTI-SITES
 # ========================================
 
+# Extraction rapide (lxml, XPath compilés une fois) : mêmes sélecteurs que la
+# logique BeautifulSoup de chaque scraper, qui ne tourne plus que si elle échoue
+JOB_PAGE_PARSERS = {
+    'HelloWork': JobPageParser({
+        'title': {'xpaths': [f"//h1[{has_class('tw-text-3xl')}]", "//h1[@data-cy='job-title']", '//h1'], 'separator': ''},
+        'description': {'xpaths': ["//div[@data-cy='job-description']", f"//div[{has_class('job-description')}]",
+                                   f"//div[{has_class('description')}]", '//article', '//main'], 'min_chars': 200}
+    }, required=('description',)),
+    'LinkedIn': JobPageParser({
+        'title': {'xpaths': [f"//h1[{has_class('top-card-layout__title')}]", f"//h1[{has_class('topcard__title')}]", '//h1'], 'separator': ''},
+        'description': {'xpaths': [f"//div[{has_class('show-more-less-html__markup')}]", f"//div[{has_class('description__text')}]",
+                                   f"//div[{has_class('job-description')}]"]}
+    }, required=('description',)),
+    'Apec': JobPageParser({
+        'title': {'xpaths': ["//h1[@data-cy='offerTitle']", f"//h1[{has_class('offer-title')}]", '//h1'], 'separator': ''},
+        # Section de contenu la plus longue (structure Apec spécifique)
+        'description': {'xpaths': [f"//div[{has_class('offer-description')}] | //div[{has_class('job-description')}]"
+                                   f" | //section[{has_class('description')}] | //div[contains(@class, 'description')]"],
+                        'select': 'longest', 'min_chars': 200}
+    }, required=('description',)),
+    'Indeed': JobPageParser({
+        'title': {'xpaths': [f"//h1[{has_class('jobsearch-JobInfoHeader-title')}]", "//h1[@data-testid='jobTitle']", '//h1'], 'separator': ''},
+        'description': {'xpaths': ["//div[@id='jobDescriptionText']", f"//div[{has_class('jobsearch-jobDescriptionText')}]",
+                                   "//div[@data-testid='jobDescription']"]}
+    }, required=('description',)),
+    'Generic': JobPageParser({
+        'title': {'xpaths': ['//h1'], 'separator': ''},
+        'description': {'xpaths': ['//main', '//article', "//div[re:test(@class, 'content|description|job', 'i')]"]}
+    }, required=('description',), excluded_tags=('nav', 'footer', 'header'))
+}
+
+
+def parse_job_page(response, source, url):
+    """
+    Fiche extraite par le parseur lxml du site
+
+    Returns:
+        dict: Fiche (format des scrapers), ou None pour passer à la logique BeautifulSoup
+    """
+    parsed = JOB_PAGE_PARSERS[source].parse(response.content, response_charset(response))
+    if not parsed:
+        return None
+    return {
+        'title': parsed['title'][:200],
+        'description': parsed['description'][:4000],
+        'source': source,
+        'url': url
+    }
+
+
 def scrape_job_posting(url):
     """
     Scrape une fiche de poste depuis différents job boards
@@ -454,6 +406,12 @@ def scrape_job_posting(url):
     
     url = url.strip()
     
+    # Cache : même fiche partagée par plusieurs prospects / re-runs
+    return cached_job_posting(url, _scrape_job_posting_uncached)
+
+
+def _scrape_job_posting_uncached(url):
+    """Aiguillage vers le scraper du job board (sans cache de fiche parsée)"""
     try:
         if "hellowork.com" in url:
             return scrape_hellowork(url)
@@ -479,11 +437,15 @@ def scrape_hellowork(url):
             'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
         }
         
-        response = requests.get(url, headers=headers, timeout=15)
+        response = fetch_page(url, headers=headers, timeout=15)
         
         if response.status_code != 200:
             return scrape_generic(url)
         
+        job_posting = parse_job_page(response, 'HelloWork', url)
+        if job_posting:
+            return job_posting
+        
         soup = BeautifulSoup(response.content, 'html.parser')
         
         # Titre - plusieurs sélecteurs possibles
@@ -526,11 +488,15 @@ def scrape_linkedin_job(url):
             'Accept': 'text/html,application/xhtml+xml',
         }
         
-        response = requests.get(url, headers=headers, timeout=15)
+        response = fetch_page(url, headers=headers, timeout=15)
         
         if response.status_code != 200:
             return scrape_generic(url)
         
+        job_posting = parse_job_page(response, 'LinkedIn', url)
+        if job_posting:
+            return job_posting
+        
         soup = BeautifulSoup(response.content, 'html.parser')
         
         # Titre
@@ -568,11 +534,15 @@ def scrape_apec(url):
             'Accept-Language': 'fr-FR,fr;q=0.9',
         }
         
-        response = requests.get(url, headers=headers, timeout=15)
+        response = fetch_page(url, headers=headers, timeout=15)
         
         if response.status_code != 200:
             return scrape_generic(url)
         
+        job_posting = parse_job_page(response, 'Apec', url)
+        if job_posting:
+            return job_posting
+        
         soup = BeautifulSoup(response.content, 'html.parser')
         
         # Titre
@@ -617,11 +587,15 @@ def scrape_indeed(url):
             'Accept': 'text/html,application/xhtml+xml',
         }
         
-        response = requests.get(url, headers=headers, timeout=15)
+        response = fetch_page(url, headers=headers, timeout=15)
         
         if response.status_code != 200:
             return scrape_generic(url)
         
+        job_posting = parse_job_page(response, 'Indeed', url)
+        if job_posting:
+            return job_posting
+        
         soup = BeautifulSoup(response.content, 'html.parser')
         
         # Titre
@@ -658,11 +632,15 @@ def scrape_generic(url):
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
         }
         
-        response = requests.get(url, headers=headers, timeout=15)
+        response = fetch_page(url, headers=headers, timeout=15)
         
         if response.status_code != 200:
             return None
         
+        job_posting = parse_job_page(response, 'Generic', url)
+        if job_posting:
+            return job_posting
+        
         soup = BeautifulSoup(response.content, 'html.parser')
         
         # Supprimer scripts et styles
@@ -702,46 +680,25 @@ def scrape_generic(url):
 # GÉNÉRATION V28 - UN SEUL APPEL CLAUDE
 # ========================================
 
-def generate_sequence_v28(prospect_data, posts_data, web_data, job_posting_data):
-    """
-    Génère M1 + M2 en UN SEUL appel Claude
-    Intègre posts LinkedIn + résultats web
-    """
-    
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    
-    # Extraire données
-    prenom = get_firstname(prospect_data)
-    titre_poste = get_job_title(job_posting_data)
-    
-    # Formater pour le prompt
-    posts_formatted = format_posts(posts_data)
-    web_formatted = format_web_results(web_data)
-    profile_formatted = format_profile(prospect_data)
-    fiche_formatted = job_posting_data.get('description', '') if job_posting_data else ''
-    
-    prompt = f"""Tu es chasseur de têtes Finance chez Entourage Recrutement.
-Tu dois générer 2 messages de prospection pour ce prospect.
-
-═══════════════════════════════════════════════════════════════════
-DONNÉES PROSPECT
-═══════════════════════════════════════════════════════════════════
-{profile_formatted}
-
-═══════════════════════════════════════════════════════════════════
-POSTS LINKEDIN RÉCENTS (<6 mois uniquement)
-═══════════════════════════════════════════════════════════════════
-{posts_formatted}
-
-═══════════════════════════════════════════════════════════════════
-ACTUALITÉS WEB RÉCENTES (<6 mois uniquement)
-═══════════════════════════════════════════════════════════════════
-{web_formatted}
-
-═══════════════════════════════════════════════════════════════════
-FICHE DE POSTE : {titre_poste}
-═══════════════════════════════════════════════════════════════════
-{fiche_formatted[:2500]}
+# Consignes identiques pour tous les prospects : préfixe système mis en cache
+# (prompt caching), les données du prospect sont dans le message utilisateur.
+# Limite connue : ce préfixe fait ~750-1000 tokens (2,6k caractères dont ~400
+# « ═ »), soit au niveau ou sous le minimum cacheable de Sonnet (1024) et loin
+# de celui de Haiku 3.5 (2048), où partent les séquences « fiche seule » : le
+# cache ne s'applique en pratique pas à la séquence seule ni au petit modèle
+# (à vérifier dans 'claude_call' : cache_creation_tokens / cache_read_tokens).
+# L'appel groupé (+ SEQUENCE_GROUP_INSTRUCTIONS) peut franchir le seuil Sonnet.
+# M3 et les objets sont générés localement (templates) : les ajouter ici ne
+# ferait que gonfler le préfixe sans servir la réponse.
+# Version du prompt utilisateur (build_sequence_request) : à incrémenter quand il
+# change, pour invalider le cache des générations
+SEQUENCE_TEMPLATE_VERSION = 1
+
+SEQUENCE_SYSTEM_PROMPT = """Tu es chasseur de têtes Finance chez Entourage Recrutement.
+Tu dois générer 2 messages de prospection pour le prospect décrit dans le message utilisateur
+(données prospect, posts LinkedIn, actualités web, fiche de poste).
+Dans les structures ci-dessous, remplace [PRÉNOM] et [POSTE] par les valeurs indiquées
+à la fin du message utilisateur.
 
 ═══════════════════════════════════════════════════════════════════
 GÉNÈRE LES 2 MESSAGES
@@ -749,14 +706,14 @@ GÉNÈRE LES 2 MESSAGES
 
 **MESSAGE 1 (Icebreaker)** - Structure EXACTE :
 
-Bonjour {prenom},
+Bonjour [PRÉNOM],
 
 [HOOK - CHOISIS UNE OPTION - PRIORITÉ AUX INFOS RÉCENTES :]
 Option A (si un post LinkedIn OU une actualité web est pertinente) : 
   Référence personnalisée (sujet PRÉCIS, événement, publication, nomination...)
   Puis transition vers le poste.
 Option B (si aucune info récente pertinente) :
-  "Je vous contacte concernant votre recherche de {titre_poste}."
+  "Je vous contacte concernant votre recherche de [POSTE]."
 
 [PAIN POINT #1]
 Identifie LA difficulté principale de ce recrutement avec le VOCABULAIRE EXACT de la fiche.
@@ -771,9 +728,9 @@ Bien à vous,
 
 **MESSAGE 2 (Relance avec profils)** - Structure EXACTE :
 
-Bonjour {prenom},
+Bonjour [PRÉNOM],
 
-Je me permets de vous relancer concernant votre recherche de {titre_poste}.
+Je me permets de vous relancer concernant votre recherche de [POSTE].
 
 [PAIN POINT #2 - DIFFÉRENT DE M1]
 Autre angle sur une AUTRE difficulté, autres compétences de la fiche.
@@ -807,48 +764,204 @@ FORMAT DE RÉPONSE
 [contenu message 2]
 """
 
+
+def format_prospect_sections(profile_formatted, posts_formatted, web_formatted):
+    """Sections prospect du prompt (profil, posts, web)"""
+    return f"""═══════════════════════════════════════════════════════════════════
+DONNÉES PROSPECT
+═══════════════════════════════════════════════════════════════════
+{profile_formatted}
+
+═══════════════════════════════════════════════════════════════════
+POSTS LINKEDIN RÉCENTS (<6 mois uniquement)
+═══════════════════════════════════════════════════════════════════
+{posts_formatted}
+
+═══════════════════════════════════════════════════════════════════
+ACTUALITÉS WEB RÉCENTES (<6 mois uniquement)
+═══════════════════════════════════════════════════════════════════
+{web_formatted}"""
+
+
+def build_sequence_request(prospect_data, posts_data, web_data, job_posting_data, model=None):
+    """
+    Prépare l'appel Claude d'une séquence (mode interactif ou batch)
+    model : imposé (ex : appel groupé), sinon choisi par route_model selon
+    la richesse des données du prospect
+
+    Returns:
+        tuple: (params messages.create, contexte de finalisation
+                {'prenom', 'titre_poste', 'nom_complet', 'cache_key'})
+    """
+    # Extraire données
+    prenom = get_firstname(prospect_data)
+    titre_poste = get_job_title(job_posting_data)
+    
+    # Formater pour le prompt (fiche, posts et web ramenés au budget de tokens)
+    posts_formatted, web_formatted, fiche_formatted = budget_prompt_inputs(posts_data, web_data, job_posting_data)
+    profile_formatted = format_profile(prospect_data)
+    
+    # Seule partie variable du prompt (le préfixe système est mis en cache)
+    prompt = f"""{format_prospect_sections(profile_formatted, posts_formatted, web_formatted)}
+
+═══════════════════════════════════════════════════════════════════
+FICHE DE POSTE : {titre_poste}
+═══════════════════════════════════════════════════════════════════
+{fiche_formatted}
+
+═══════════════════════════════════════════════════════════════════
+[PRÉNOM] = {prenom}
+[POSTE] = {titre_poste}
+═══════════════════════════════════════════════════════════════════
+
+Génère les 2 messages."""
+
+    full_name = prospect_data.get('full_name') or prospect_data.get('user_full name', '')
+    if model is None:
+        model = route_model(
+            'sequence',
+            posts_count=len(posts_data or []),
+            web_count=len(web_data or []),
+            has_job_description=bool(fiche_formatted),
+            prospect=full_name
+        )
+
+    params = {
+        'model': model,
+        'max_tokens': 1500,
+        'system': cached_system(SEQUENCE_SYSTEM_PROMPT),
+        'messages': [{"role": "user", "content": prompt}]
+    }
+
+    # Tout ce que voit Claude sauf l'identité du prospect (nom et prénom)
+    cache_key = generation_key(
+        (SEQUENCE_TEMPLATE_VERSION, SEQUENCE_SYSTEM_PROMPT, params['model'], params['max_tokens']),
+        headline=prospect_data.get('headline') or prospect_data.get('linkedin_headline'),
+        company=prospect_data.get('company') or prospect_data.get('linkedin_company'),
+        job_title=titre_poste,
+        job_description=fiche_formatted,
+        posts=posts_formatted,
+        web=web_formatted
+    )
+    context = {
+        'prenom': prenom,
+        'titre_poste': titre_poste,
+        'nom_complet': full_name,
+        'cache_key': cache_key
+    }
+    return params, context
+
+
+def finalize_sequence(response_text, context):
+    """Construit la séquence à partir de la réponse Claude (M1/M2) + templates (M3, objets)"""
+    m1, m2 = parse_messages(response_text.strip())
+    
+    return {
+        'subject_lines': generate_subject_lines(context['titre_poste']),
+        'message_1': m1,
+        'message_2': m2,
+        'message_3': generate_message_3(context['prenom'])
+    }
+
+
+def record_usage(usage, batch=False, model=None):
+    """Stats de session (appelé depuis plusieurs workers) - model : message.model"""
+    tokens = usage_tokens(usage)
+    with _stats_lock:
+        stats = st.session_state.generation_stats
+        stats['calls'] += 1
+        stats['tokens'] += tokens['input'] + tokens['output'] + tokens['cache_creation'] + tokens['cache_read']
+        stats['cache_read_tokens'] = stats.get('cache_read_tokens', 0) + tokens['cache_read']
+        stats['cost'] += compute_cost(usage, batch=batch, model=model)
+        calls_by_model = stats.setdefault('calls_by_model', {})
+        calls_by_model[model or 'inconnu'] = calls_by_model.get(model or 'inconnu', 0) + 1
+
+
+def record_generation_cache_hit():
+    with _stats_lock:
+        stats = st.session_state.generation_stats
+        stats['generation_cache_hits'] = stats.get('generation_cache_hits', 0) + 1
+
+
+def cache_response(response_text, context):
+    """Met en cache une réponse au bon format (réutilisable pour un prospect identique)"""
+    if MESSAGE_2_MARKER not in response_text:
+        return False
+    return store_generation(context.get('cache_key'), response_text, context['prenom'], context.get('nom_complet', ''))
+
+
+def generate_sequence_v28(prospect_data, posts_data, web_data, job_posting_data):
+    """
+    Génère M1 + M2 en UN SEUL appel Claude
+    Intègre posts LinkedIn + résultats web
+    Une génération identique (même fiche, posts, web, titre) est relue du cache
+    Exécuté dans les workers : aucune écriture Streamlit, l'erreur est retournée
+
+    Returns:
+        tuple: (séquence ou None, message d'erreur ou None)
+    """
+    
+    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    params, context = build_sequence_request(prospect_data, posts_data, web_data, job_posting_data)
+
     try:
-        # Retry avec backoff exponentiel pour rate limit
-        max_retries = 3
-        base_delay = 30  # secondes
-        
-        for attempt in range(max_retries):
-            try:
-                message = client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=1500,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                break  # Succès, sortir de la boucle
-            except anthropic.RateLimitError as e:
-                if attempt < max_retries - 1:
-                    wait_time = base_delay * (2 ** attempt)  # 30s, 60s, 120s
-                    st.warning(f"⏳ Rate limit atteint. Attente {wait_time}s avant retry ({attempt + 1}/{max_retries})...")
-                    time.sleep(wait_time)
-                else:
-                    raise e  # Dernière tentative échouée, propager l'erreur
-        
-        # Stats
-        st.session_state.generation_stats['calls'] += 1
-        st.session_state.generation_stats['tokens'] += message.usage.input_tokens + message.usage.output_tokens
-        st.session_state.generation_stats['cost'] += (message.usage.input_tokens * 0.003 + message.usage.output_tokens * 0.015) / 1000
-        
-        result = message.content[0].text.strip()
-        m1, m2 = parse_messages(result)
-        m3 = generate_message_3(prenom)
-        subject_lines = generate_subject_lines(titre_poste)
-        
-        return {
-            'subject_lines': subject_lines,
-            'message_1': m1,
-            'message_2': m2,
-            'message_3': m3
-        }
+        # Les prospects identiques en parallèle attendent le premier puis lisent le cache
+        with generation_lock(context['cache_key']):
+            cached = lookup_generation(context['cache_key'], context['prenom'])
+            if cached is not None:
+                record_generation_cache_hit()
+                return finalize_sequence(cached, context), None
+
+            # Débit planifié sur les limites réelles du compte (en-têtes anthropic-ratelimit-*),
+            # partagé par tous les workers ; un 429 suspend les appels jusqu'à retry-after
+            message = create_message(client, **params)
+            
+            record_usage(message.usage, model=message.model)
+            response_text = message.content[0].text
+            cache_response(response_text, context)
+
+        return finalize_sequence(response_text, context), None
         
+    except Exception as e:
+        log_event('sequence_generation_error', {'error': str(e)})
+        return None, f"Erreur Claude: {e}"
+
+
+def generate_sequence_v28_stream(prospect_data, posts_data, web_data, job_posting_data,
+                                 on_progress=None, on_message_1=None):
+    """
+    Variante streaming de generate_sequence_v28 (onglet test manuel)
+    Le message 1 est validé dès que ---MESSAGE_2--- arrive ; une sortie hors
+    format interrompt la génération sans attendre (ni payer) la fin.
+
+    Args:
+        on_progress (callable): on_progress(parser) à chaque fragment reçu
+        on_message_1 (callable): on_message_1(m1) dès que le message 1 est complet
+    """
+    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    params, context = build_sequence_request(prospect_data, posts_data, web_data, job_posting_data)
+    parser = SequenceStreamParser(on_message_1=on_message_1)
+
+    def on_text(fragment):
+        parser.feed(fragment)
+        if on_progress:
+            on_progress(parser)
+
+    try:
+        message = stream_message(client, on_text=on_text, **params)
+    except MalformedSequenceError as e:
+        if e.partial_message is not None:
+            record_usage(e.partial_message.usage, model=e.partial_message.model)
+        log_event('sequence_stream_aborted', {'reason': str(e), 'chars_received': len(parser.text)})
+        st.error(f"Réponse hors format, génération interrompue : {e}")
+        return None
     except Exception as e:
         st.error(f"Erreur Claude: {e}")
         return None
 
+    record_usage(message.usage, model=message.model)
+    return finalize_sequence(parser.text, context)
+
 
 def parse_messages(response):
     """Parse la réponse Claude"""
@@ -888,6 +1001,205 @@ def generate_subject_lines(titre_poste):
 3. Question rapide sur votre recrutement"""
 
 
+# ========================================
+# GÉNÉRATION GROUPÉE (PLUSIEURS PROSPECTS, MÊME FICHE)
+# ========================================
+
+# Ajouté après SEQUENCE_SYSTEM_PROMPT (le préfixe caché reste commun)
+SEQUENCE_GROUP_INSTRUCTIONS = """═══════════════════════════════════════════════════════════════════
+MODE GROUPÉ
+═══════════════════════════════════════════════════════════════════
+Le message utilisateur contient la fiche de poste UNE seule fois, puis PLUSIEURS
+prospects (PROSPECT 1, PROSPECT 2...) qui recrutent pour ce même poste.
+Génère les 2 messages pour CHAQUE prospect, avec SES propres données (posts, actualités) :
+[PRÉNOM] est indiqué dans le bloc de chaque prospect, [POSTE] est commun.
+Varie les pain points et les profils proposés d'un prospect à l'autre.
+
+FORMAT DE RÉPONSE (remplace le format ci-dessus) : un bloc par prospect, dans l'ordre
+---PROSPECT_1---
+---MESSAGE_1---
+[contenu message 1]
+---MESSAGE_2---
+[contenu message 2]
+---PROSPECT_2---
+---MESSAGE_1---
+...
+"""
+
+PROSPECT_MARKER = re.compile(r'---PROSPECT_(\d+)---')
+
+
+def build_group_sequence_request(members, job_posting_data, model):
+    """
+    Un seul appel Claude pour plusieurs prospects d'une même fiche de poste
+    (la fiche n'est envoyée qu'une fois)
+
+    Args:
+        members (list): [(prospect_data, posts_data, web_data)]
+        job_posting_data (dict): Fiche commune
+        model (str): Modèle du groupe (voir group_model)
+
+    Returns:
+        dict: Paramètres messages.create
+    """
+    titre_poste = get_job_title(job_posting_data)
+    # Fiche envoyée une fois : sa part du budget ; posts et web budgétés par prospect
+    fiche_formatted = fit_job_description(
+        job_posting_data.get('description', '') if job_posting_data else '', share_budget('job_description')
+    )
+
+    blocks = []
+    for i, (prospect_data, posts_data, web_data) in enumerate(members, 1):
+        posts_formatted, web_formatted, _ = budget_prompt_inputs(posts_data, web_data, job_posting_data)
+        sections = format_prospect_sections(format_profile(prospect_data), posts_formatted, web_formatted)
+        blocks.append(f"""###################################################################
+PROSPECT {i} - [PRÉNOM] = {get_firstname(prospect_data)}
+###################################################################
+{sections}""")
+
+    prospects_formatted = "\n\n".join(blocks)
+    prompt = f"""═══════════════════════════════════════════════════════════════════
+FICHE DE POSTE : {titre_poste}
+═══════════════════════════════════════════════════════════════════
+{fiche_formatted}
+
+═══════════════════════════════════════════════════════════════════
+[POSTE] = {titre_poste}
+═══════════════════════════════════════════════════════════════════
+
+{prospects_formatted}
+
+Génère les 2 messages pour chacun des {len(members)} prospects."""
+
+    return {
+        'model': model,
+        # Borné au plafond du modèle routé (Haiku 3.5 : 8192), sinon 400 et repli par membre
+        'max_tokens': min(1500 * len(members), max_output_tokens(model)),
+        'system': cached_system(SEQUENCE_SYSTEM_PROMPT, SEQUENCE_GROUP_INSTRUCTIONS),
+        'messages': [{"role": "user", "content": prompt}]
+    }
+
+
+def parse_grouped_messages(response, count):
+    """
+    Découpe une réponse groupée en réponses individuelles (format parse_messages)
+
+    Returns:
+        list: Texte ---MESSAGE_1--- / ---MESSAGE_2--- de chaque prospect (dans l'ordre),
+              ou None si la réponse ne contient pas exactement les `count` blocs attendus
+    """
+    parts = PROSPECT_MARKER.split(response)
+    blocks = {}
+    for number, block in zip(parts[1::2], parts[2::2]):
+        blocks[int(number)] = block.strip()
+
+    if sorted(blocks) != list(range(1, count + 1)):
+        return None
+
+    texts = [blocks[i] for i in range(1, count + 1)]
+    for text in texts:
+        if '---MESSAGE_1---' not in text or MESSAGE_2_MARKER not in text:
+            return None
+        if not all(parse_messages(text)):
+            return None
+    return texts
+
+
+def group_model(members, job_posting_data):
+    """Modèle d'un appel groupé : celui du membre le plus riche"""
+    return route_model(
+        'sequence',
+        posts_count=max(len(posts_data or []) for _, posts_data, _ in members),
+        web_count=max(len(web_data or []) for _, _, web_data in members),
+        has_job_description=bool(job_posting_data and job_posting_data.get('description')),
+        prospect=f"groupe de {len(members)}"
+    )
+
+
+def generate_sequences_grouped(members, job_posting_data):
+    """
+    Génère les séquences de plusieurs prospects d'une même fiche en un appel
+    Repli sur un appel par prospect si la réponse groupée est illisible.
+
+    Args:
+        members (list): [(prospect_data, posts_data, web_data)]
+        job_posting_data (dict): Fiche commune
+
+    Returns:
+        list: (séquence ou None, erreur ou None) de chaque membre, dans l'ordre
+    """
+    model = group_model(members, job_posting_data)
+    contexts = [
+        build_sequence_request(prospect_data, posts_data, web_data, job_posting_data, model=model)[1]
+        for prospect_data, posts_data, web_data in members
+    ]
+
+    sequences = [(None, None)] * len(members)
+    pending = []
+    for i, context in enumerate(contexts):
+        cached = lookup_generation(context['cache_key'], context['prenom'])
+        if cached is not None:
+            record_generation_cache_hit()
+            sequences[i] = (finalize_sequence(cached, context), None)
+        else:
+            pending.append(i)
+
+    if len(pending) == 1:
+        i = pending[0]
+        sequences[i] = generate_sequence_v28(*members[i], job_posting_data)
+        return sequences
+    if not pending:
+        return sequences
+
+    texts = None
+    try:
+        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+        params = build_group_sequence_request([members[i] for i in pending], job_posting_data, model)
+        message = create_message(client, **params)
+        record_usage(message.usage, model=message.model)
+        texts = parse_grouped_messages(message.content[0].text, len(pending))
+    except Exception as e:
+        log_event('grouped_generation_error', {'size': len(pending), 'error': str(e)})
+
+    if texts is None:
+        log_event('grouped_generation_fallback', {'size': len(pending)})
+        for i in pending:
+            sequences[i] = generate_sequence_v28(*members[i], job_posting_data)
+        return sequences
+
+    for i, text in zip(pending, texts):
+        cache_response(text, contexts[i])
+        sequences[i] = (finalize_sequence(text, contexts[i]), None)
+    log_event('grouped_generation', {'size': len(pending)})
+    return sequences
+
+
+def job_group_key(job_posting_data):
+    """Clé de regroupement : prospects dont la fiche de poste est identique"""
+    if not job_posting_data:
+        return None
+    return make_key(get_job_title(job_posting_data), job_posting_data.get('description', '')[:2500])
+
+
+def execute_sequence_group(key, items):
+    """Callback RequestGrouper : items = [(prospect_data, posts_data, web_data, job_posting_data)]"""
+    job_posting_data = items[0][3]
+    members = [(prospect_data, posts_data, web_data) for prospect_data, posts_data, web_data, _ in items]
+    with limiter.slot('anthropic'):
+        return generate_sequences_grouped(members, job_posting_data)
+
+
+def start_sequence_grouper():
+    """Regroupement des générations par fiche pour un run (None si désactivé)"""
+    if GROUPED_GENERATION_SIZE <= 1:
+        return None
+    return RequestGrouper(
+        execute_sequence_group,
+        max_group_size=GROUPED_GENERATION_SIZE,
+        max_wait_seconds=GROUPED_GENERATION_WAIT_SECONDS
+    )
+
+
 # ========================================
 # UTILITAIRES
 # ========================================
@@ -913,24 +1225,62 @@ def get_job_title(job_posting_data):
     return title.strip() or "[Poste]"
 
 
-def format_posts(posts):
-    """Formate les posts LinkedIn pour le prompt"""
+def post_text(post):
+    """Texte d'un post LinkedIn (le champ varie selon l'acteur Apify)"""
+    return (
+        post.get('text') or 
+        post.get('postText') or 
+        post.get('content') or 
+        post.get('commentary') or
+        post.get('description') or
+        post.get('body') or
+        ''
+    )
+
+
+def web_result_text(item):
+    """Titre et extrait d'un résultat web"""
+    return f"{item.get('title', '')}\n{item.get('snippet', '')}"
+
+
+def budget_prompt_inputs(posts_data, web_data, job_posting_data):
+    """
+    Posts, résultats web et fiche formatés dans le budget de tokens du prompt
+    (config.PROMPT_INPUT_TOKEN_BUDGET, réparti selon PROMPT_BUDGET_SHARES)
+
+    Returns:
+        tuple: (posts_formatted, web_formatted, fiche_formatted)
+    """
+    description = job_posting_data.get('description', '') if job_posting_data else ''
+    budgets = allocate({
+        'job_description': estimate_tokens(description),
+        'posts': sum(min(estimate_tokens(post_text(post)), max_tokens_per_post()) for post in posts_data or []),
+        'web': sum(estimate_tokens(web_result_text(item)) for item in web_data or [])
+    })
+    return (
+        format_posts(posts_data, budgets['posts']),
+        format_web_results(web_data, budgets['web']),
+        fit_job_description(description, budgets['job_description'])
+    )
+
+
+def format_posts(posts, max_tokens=None):
+    """
+    Formate les posts LinkedIn pour le prompt
+    max_tokens : budget des textes (par défaut la part 'posts' du budget)
+    """
     if not posts:
         return "Aucun post LinkedIn récent trouvé."
     
+    posts = [post for post in posts if post_text(post)]
+    texts = fit_items(
+        [post_text(post) for post in posts],
+        max_tokens if max_tokens is not None else share_budget('posts'),
+        max_tokens_per_post()
+    )
+    
     formatted = []
-    for i, post in enumerate(posts[:5], 1):
-        # Chercher le texte dans plusieurs champs possibles
-        text = (
-            post.get('text') or 
-            post.get('postText') or 
-            post.get('content') or 
-            post.get('commentary') or
-            post.get('description') or
-            post.get('body') or
-            ''
-        )[:500]
-        
+    for i, (post, text) in enumerate(zip(posts, texts), 1):
         # Chercher la date
         date = (
             post.get('date') or 
@@ -949,8 +1299,7 @@ def format_posts(posts):
         if reactions or comments:
             stats = f" | 👍{reactions} 💬{comments}"
         
-        if text:
-            formatted.append(f"POST {i} ({date}{stats}):\n{text}")
+        formatted.append(f"POST {i} ({date}{stats}):\n{text}")
     
     if not formatted:
         return "Aucun post LinkedIn avec contenu trouvé."
@@ -958,18 +1307,23 @@ def format_posts(posts):
     return "\n\n".join(formatted)
 
 
-def format_web_results(web_data):
-    """Formate les résultats web pour le prompt"""
+def format_web_results(web_data, max_tokens=None):
+    """
+    Formate les résultats web pour le prompt
+    max_tokens : budget des extraits (par défaut la part 'web' du budget)
+    """
     if not web_data:
         return "Aucune actualité web récente trouvée."
     
+    texts = fit_items(
+        [web_result_text(item) for item in web_data],
+        max_tokens if max_tokens is not None else share_budget('web')
+    )
     formatted = []
-    for i, item in enumerate(web_data[:5], 1):
-        title = item.get('title', '')
-        snippet = item.get('snippet', '')
+    for item, text in zip(web_data, texts):
         date = item.get('date', '')
         item_type = item.get('type', 'web')
-        formatted.append(f"[{item_type.upper()}] {title}\n{snippet}\n({date})")
+        formatted.append(f"[{item_type.upper()}] {text}\n({date})")
     return "\n\n".join(formatted)
 
 
@@ -1001,6 +1355,454 @@ def extract_prospect_data(leonar_prospect):
     }
 
 
+# ========================================
+# PIPELINE PROSPECT (WORKERS)
+# ========================================
+
+def gather_prospect_inputs(prospect, job_url, apec_manual_description, apify_client, prefetched_posts=None):
+    """
+    Collecte les données d'un prospect : fiche de poste, posts LinkedIn, recherche web
+    Exécuté dans un thread worker : les messages UI sont collectés dans 'logs'
+    et affichés par le thread principal (pas d'écriture Streamlit concurrente)
+
+    prefetched_posts : {url_normalisée: posts} issu du scraping Apify par lots
+
+    Returns:
+        tuple: ((p_data, posts, web_results, job_data) ou None si ignoré,
+                result {'name', 'status', 'logs', 'timings'})
+    """
+    name = prospect.get('user_full name', 'Inconnu')
+    company = prospect.get('linkedin_company', '')
+    logs = []
+    result = {'name': name, 'status': 'skipped', 'logs': logs}
+
+    # Extraire données prospect
+    p_data = extract_prospect_data(prospect)
+
+    if not job_url:
+        logs.append(('warning', f"   ⚠️ Pas d'URL pour ce prospect - ignoré"))
+        return None, result
+
+    # Fiche de poste manuelle pour Apec (le scraping Apec ne fonctionne pas)
+    job_data = None
+    is_apec_url = 'apec.fr' in job_url.lower()
+
+    if is_apec_url and apec_manual_description:
+        job_data = {
+            'title': 'Poste Apec',
+            'description': apec_manual_description,
+            'source': 'Apec (manuel)',
+            'url': job_url
+        }
+
+    # 1-3. Fiche de poste, posts LinkedIn et recherche web : sans dépendance
+    # entre eux, lancés en parallèle
+    tasks = {}
+    if not is_apec_url:
+        tasks['job'] = lambda: _with_slot('job_boards', scrape_job_posting, job_url)
+    linkedin_key = normalize_linkedin_url(p_data.get('linkedin_url'))
+    if prefetched_posts and linkedin_key in prefetched_posts:
+        tasks['posts'] = lambda: prefetched_posts[linkedin_key]
+    elif p_data.get('linkedin_url'):
+        # Le slot 'apify' est pris par scrape_posts_cached (pas sur un hit de cache)
+        tasks['posts'] = lambda: scrape_linkedin_posts(apify_client, p_data['linkedin_url'])
+    if SERPER_API_KEY and name != 'Inconnu':
+        tasks['web'] = lambda: _with_slot('serper', search_web_prospect, name, company)
+
+    fetched, timings = fan_out(
+        tasks,
+        timeout=STAGE_TIMEOUT_SECONDS,
+        defaults={'job': None, 'posts': [], 'web': []}
+    )
+    result['timings'] = timings
+
+    if 'job' in tasks:
+        job_data = fetched['job']
+        if job_data:
+            logs.append(('caption', f"   ✅ Fiche: {job_data.get('title', 'N/A')[:40]}..."))
+    elif job_data:
+        logs.append(('caption', f"   ✅ Description Apec (manuelle)"))
+    else:
+        logs.append(('warning', f"   ⚠️ URL Apec détectée mais pas de description manuelle"))
+
+    posts = fetched.get('posts', [])
+    if 'posts' in tasks:
+        logs.append(('caption', f"   ✅ {len(posts)} posts LinkedIn (<6 mois)"))
+
+    web_results = fetched.get('web', [])
+    if 'web' in tasks:
+        logs.append(('caption', f"   ✅ {len(web_results)} résultats web"))
+
+    if timings:
+        logs.append(('caption', "   ⏱️ " + " | ".join(f"{stage} {t}s" for stage, t in timings.items())))
+
+    return (p_data, posts, web_results, job_data), result
+
+
+def process_leonar_prospect(prospect, job_url, apec_manual_description, apify_client, writeback,
+                            prefetched_posts=None, grouper=None):
+    """
+    Traite un prospect Leonar : scraping, génération, export
+
+    writeback : LeonarWriteback - l'export Leonar est mis en file, le worker
+    n'attend pas la réponse de Leonar
+    grouper : RequestGrouper - génération groupée avec les prospects de la même fiche
+
+    Returns:
+        dict: {'name', 'status', 'logs'} - status : ok (export en file), skipped, generation_error
+    """
+    inputs, result = gather_prospect_inputs(prospect, job_url, apec_manual_description, apify_client,
+                                            prefetched_posts=prefetched_posts)
+    if inputs is None:
+        return result
+    p_data, posts, web_results, job_data = inputs
+
+    # 4. Générer séquence (le slot 'anthropic' est pris par le meneur du groupe)
+    group_key = job_group_key(job_data) if grouper else None
+    if group_key:
+        sequence, error = grouper.submit(group_key, (p_data, posts, web_results, job_data))
+    else:
+        with limiter.slot('anthropic'):
+            sequence, error = generate_sequence_v28(p_data, posts, web_results, job_data)
+
+    if error:
+        result['logs'].append(('error', f"   ❌ {error}"))
+    if not sequence:
+        result['status'] = 'generation_error'
+        return result
+
+    # Export Leonar en arrière-plan (marqué traité une fois exporté ou mis en file de retry)
+    writeback.submit(prospect['_id'], build_leonar_fields(sequence), on_done=mark_exported)
+    result['status'] = 'ok'
+
+    return result
+
+
+def mark_exported(prospect_id, status, fields):
+    """Callback d'export : la séquence est dans Leonar ou dans la file de retry"""
+    if status in ('ok', 'queued_for_retry'):
+        processed_store.mark(
+            prospect_id,
+            campaign=LEONAR_CAMPAIGN_ID,
+            seq_hash=sequence_hash(fields),
+            status='exported' if status == 'ok' else status
+        )
+
+
+def _with_slot(service, fn, *args):
+    """Appelle fn(*args) en réservant un slot du service"""
+    with limiter.slot(service):
+        return fn(*args)
+
+
+def render_prospect_result(result):
+    """Affiche le résultat d'un prospect (thread principal uniquement)"""
+    name = result['name']
+
+    for level, text in result['logs']:
+        getattr(st, level)(text)
+
+    if result['status'] == 'ok':
+        st.toast(f"✅ {name}")
+    elif result['status'] == 'generation_error':
+        st.error(f"❌ Erreur génération pour {name}")
+
+
+def run_leonar_generation(jobs, apify_client, apec_manual_description, expected_total,
+                          prefetched_posts=None, grouped=False):
+    """
+    Traite les prospects en parallèle et affiche les résultats au fil de l'eau
+
+    Args:
+        jobs (iterable): (prospect, job_url, origine_url) - liste ou générateur
+            (ex: prospects livrés pendant la pagination Leonar)
+        expected_total (callable): Nombre de prospects attendu (peut évoluer
+            pendant la pagination)
+        prefetched_posts (dict): Posts issus du scraping Apify par lots
+        grouped (bool): Un appel Claude pour les prospects d'une même fiche
+
+    Returns:
+        int: Nombre de prospects traités
+    """
+    writeback = start_leonar_writeback()
+    grouper = start_sequence_grouper() if grouped else None
+
+    progress = st.progress(0)
+    status = st.empty()
+    done_count = [0]
+    origins = {}
+
+    def numbered_jobs():
+        # Garder l'origine de chaque job (le générateur n'est lu qu'une fois)
+        for index, job in enumerate(jobs):
+            origins[index] = job
+            yield job
+
+    def worker(index, job):
+        prospect, job_url, url_origin = job
+        return process_leonar_prospect(prospect, job_url, apec_manual_description, apify_client, writeback,
+                                       prefetched_posts=prefetched_posts, grouper=grouper)
+
+    def on_result(index, result, error):
+        prospect, job_url, url_origin = origins[index]
+        name = prospect.get('user_full name', 'Inconnu')
+        done_count[0] += 1
+        total = max(expected_total(), done_count[0])
+        progress.progress(done_count[0] / total)
+        status.write(f"⚙️ {done_count[0]}/{total} traités - dernier : **{name}**")
+
+        if job_url:
+            st.caption(f"   📄 URL {url_origin} - {name}")
+        if error:
+            st.error(f"❌ Erreur pour {name}: {error}")
+        else:
+            render_prospect_result(result)
+
+    # Les workers partagent le contexte Streamlit de la session
+    script_ctx = get_script_run_ctx()
+
+    # Traiter les prospects en parallèle (limites par service dans config.py)
+    run_concurrent(
+        numbered_jobs(),
+        worker,
+        max_workers=MAX_PROSPECTS_IN_FLIGHT,
+        on_result=on_result,
+        thread_initializer=lambda: add_script_run_ctx(threading.current_thread(), script_ctx)
+    )
+
+    progress.progress(1.0)
+    status.empty()
+
+    finish_leonar_writeback(writeback)
+
+    return done_count[0]
+
+
+def start_leonar_writeback():
+    """Exports Leonar en arrière-plan + rejeu des exports en échec des runs précédents"""
+    writeback = LeonarWriteback(
+        get_token_manager(LEONAR_EMAIL, LEONAR_PASSWORD),
+        max_workers=limiter.limits.get('leonar', 4)
+    )
+    replayed = writeback.replay_queue(on_done=mark_exported)
+    if replayed:
+        st.info(f"🔁 {replayed} export(s) Leonar en échec au run précédent relancé(s)")
+    return writeback
+
+
+def finish_leonar_writeback(writeback):
+    """Attend la fin des exports et affiche le bilan"""
+    with st.spinner("📤 Fin des exports Leonar..."):
+        export_stats = writeback.flush()
+    st.info(f"📤 Leonar : {export_stats.get('ok', 0)} séquence(s) exportée(s)")
+    if export_stats.get('queued_for_retry'):
+        st.warning(f"⚠️ {export_stats['queued_for_retry']} export(s) en échec - mis en file, relancés au prochain run")
+    if export_stats.get('lost'):
+        st.error(f"❌ {export_stats['lost']} export(s) en échec non sauvegardé(s) - voir les logs")
+    return export_stats
+
+
+# ========================================
+# MODE BATCH (API MESSAGE BATCHES)
+# ========================================
+
+def prepare_batch_requests(jobs, apify_client, apec_manual_description, prefetched_posts=None):
+    """
+    Collecte les données de tous les prospects (en parallèle) et prépare un
+    appel Claude par prospect, sans l'exécuter
+    Les prospects dont la génération est en cache n'ont pas besoin d'appel.
+
+    Returns:
+        tuple: ([(prospect_id, params messages.create, contexte de finalisation)],
+                [(prospect_id, séquence reprise du cache)])
+    """
+    prepared = []
+    cached = []
+    progress = st.progress(0)
+    done_count = [0]
+
+    def worker(index, job):
+        prospect, job_url, url_origin = job
+        inputs, result = gather_prospect_inputs(prospect, job_url, apec_manual_description, apify_client,
+                                                prefetched_posts=prefetched_posts)
+        if inputs is not None:
+            params, context = build_sequence_request(*inputs)
+            cached_text = lookup_generation(context['cache_key'], context['prenom'])
+            if cached_text is not None:
+                result['sequence'] = finalize_sequence(cached_text, context)
+            else:
+                result['request'] = (params, context)
+        return result
+
+    def on_result(index, result, error):
+        prospect = jobs[index][0]
+        done_count[0] += 1
+        progress.progress(done_count[0] / len(jobs))
+        if error:
+            st.error(f"❌ Erreur pour {prospect.get('user_full name', 'Inconnu')}: {error}")
+            return
+        for level, text in result['logs']:
+            getattr(st, level)(text)
+        if 'sequence' in result:
+            record_generation_cache_hit()
+            cached.append((prospect['_id'], result['sequence']))
+        elif 'request' in result:
+            params, context = result['request']
+            prepared.append((prospect['_id'], params, context))
+
+    script_ctx = get_script_run_ctx()
+    run_concurrent(
+        jobs,
+        worker,
+        max_workers=MAX_PROSPECTS_IN_FLIGHT,
+        on_result=on_result,
+        thread_initializer=lambda: add_script_run_ctx(threading.current_thread(), script_ctx)
+    )
+    progress.empty()
+    return prepared, cached
+
+
+def export_cached_sequences(cached):
+    """Exporte vers Leonar les séquences reprises du cache (aucun appel Claude)"""
+    writeback = start_leonar_writeback()
+    for prospect_id, sequence in cached:
+        writeback.submit(prospect_id, build_leonar_fields(sequence), on_done=mark_exported)
+    st.success(f"♻️ {len(cached)} séquence(s) reprise(s) du cache, sans appel Claude")
+    finish_leonar_writeback(writeback)
+
+
+def submit_campaign_batch(prepared):
+    """
+    Soumet les appels préparés en batch et enregistre un manifeste par batch
+    (reprise possible après fermeture de l'app)
+
+    Les prospects dont l'appel est identique (même clé de cache) partagent une
+    seule requête : ils sont rattachés au premier ('followers').
+
+    Returns:
+        list: Manifestes {'batch_id', 'contexts'}
+    """
+    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+
+    requests_batch = []
+    contexts = {}
+    leaders = {}
+    for prospect_id, params, context in prepared:
+        leader_id = leaders.get(context['cache_key'])
+        if leader_id is not None:
+            contexts[leader_id]['followers'].append({
+                'prospect_id': prospect_id,
+                'prenom': context['prenom'],
+                'titre_poste': context['titre_poste']
+            })
+            continue
+        custom_id = make_custom_id(prospect_id)
+        requests_batch.append({'custom_id': custom_id, 'params': params})
+        contexts[custom_id] = dict(context, prospect_id=prospect_id, followers=[])
+        leaders[context['cache_key']] = custom_id
+
+    manifests = []
+    for batch_id, custom_ids in submit_batches(client, requests_batch):
+        batch_contexts = {cid: contexts[cid] for cid in custom_ids}
+        save_manifest(batch_id, batch_contexts, meta={'campaign': LEONAR_CAMPAIGN_ID})
+        manifests.append({'batch_id': batch_id, 'contexts': batch_contexts})
+        # Exclus des prochains rafraîchissements tant que le batch est en cours
+        for context in batch_contexts.values():
+            for prospect_id in batch_prospect_ids(context):
+                processed_store.mark(prospect_id, campaign=LEONAR_CAMPAIGN_ID, status='batch_pending')
+    return manifests
+
+
+def batch_prospect_ids(context):
+    """Prospects couverts par une requête du batch (le premier + les identiques)"""
+    return [context['prospect_id']] + [follower['prospect_id'] for follower in context.get('followers', [])]
+
+
+def collect_batch_results(manifest, writeback):
+    """
+    Attend la fin d'un batch, construit les séquences (parse_messages) et les
+    met en file d'export Leonar. Le manifeste est supprimé une fois tout exporté
+    ou mis en file de retry ; les requêtes en erreur seront régénérées au
+    prochain run (prospects non marqués traités).
+
+    Returns:
+        dict: {'succeeded', 'errored'}
+    """
+    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    batch_id = manifest['batch_id']
+    contexts = manifest['contexts']
+    status = st.empty()
+
+    def on_poll(batch):
+        counts = batch.request_counts
+        status.write(
+            f"🌙 Batch `{batch_id}` : {batch.processing_status} - "
+            f"{counts.succeeded} ok, {counts.errored} erreurs, {counts.processing} en cours"
+        )
+
+    wait_for_batch(client, batch_id, poll_interval=BATCH_POLL_INTERVAL_SECONDS, on_poll=on_poll)
+
+    counts = {'succeeded': 0, 'errored': 0}
+    seen = set()
+    for custom_id, message, error in iter_batch_results(client, batch_id):
+        context = contexts.get(custom_id)
+        if context is None:
+            continue
+        seen.add(custom_id)
+        if error:
+            for prospect_id in batch_prospect_ids(context):
+                counts['errored'] += 1
+                processed_store.forget(prospect_id)
+            continue
+
+        record_usage(message.usage, batch=True, model=message.model)
+        response_text = message.content[0].text
+        sequence = finalize_sequence(response_text, context)
+        writeback.submit(context['prospect_id'], build_leonar_fields(sequence), on_done=mark_exported)
+        counts['succeeded'] += 1
+
+        # Prospects identiques : même réponse avec leur prénom (via le cache)
+        followers = context.get('followers', [])
+        shared = cache_response(response_text, context)
+        for follower in followers:
+            follower_text = lookup_generation(context.get('cache_key'), follower['prenom']) if shared else None
+            if follower_text is None:
+                # Réponse non réutilisable (nom de famille cité...) : régénéré au prochain run
+                counts['errored'] += 1
+                processed_store.forget(follower['prospect_id'])
+                continue
+            record_generation_cache_hit()
+            writeback.submit(
+                follower['prospect_id'],
+                build_leonar_fields(finalize_sequence(follower_text, follower)),
+                on_done=mark_exported
+            )
+            counts['succeeded'] += 1
+
+    # Requêtes absentes des résultats : retraitées au prochain run
+    for custom_id in set(contexts) - seen:
+        for prospect_id in batch_prospect_ids(contexts[custom_id]):
+            counts['errored'] += 1
+            processed_store.forget(prospect_id)
+
+    # Exports terminés ou dans la file de retry : les résultats ne sont plus nécessaires
+    writeback.flush()
+    remove_manifest(batch_id)
+    status.empty()
+    return counts
+
+
+def run_batch_generation(manifests):
+    """Suit les batchs jusqu'au bout et exporte les séquences vers Leonar"""
+    writeback = start_leonar_writeback()
+    for manifest in manifests:
+        counts = collect_batch_results(manifest, writeback)
+        st.success(f"✅ Batch `{manifest['batch_id']}` : {counts['succeeded']} séquence(s) générée(s)")
+        if counts['errored']:
+            st.warning(f"⚠️ {counts['errored']} requête(s) en erreur - prospects régénérés au prochain run")
+    finish_leonar_writeback(writeback)
+
+
 # ========================================
 # INTERFACE
 # ========================================
@@ -1039,7 +1841,18 @@ with st.sidebar:
     st.header("📊 Stats session")
     st.metric("Appels API", st.session_state.generation_stats['calls'])
     st.metric("Tokens", f"{st.session_state.generation_stats['tokens']:,}")
+    st.metric("Tokens lus en cache", f"{st.session_state.generation_stats.get('cache_read_tokens', 0):,}")
+    st.metric("Séquences servies par le cache", st.session_state.generation_stats.get('generation_cache_hits', 0))
     st.metric("Coût", f"${st.session_state.generation_stats['cost']:.4f}")
+    calls_by_model = st.session_state.generation_stats.get('calls_by_model', {})
+    if calls_by_model:
+        st.caption("🤖 " + " | ".join(f"{model}: {count}" for model, count in sorted(calls_by_model.items())))
+    limiter_stats = claude_limiter.snapshot()['stats']
+    if limiter_stats['waited_seconds'] >= 1 or limiter_stats['rate_limited']:
+        st.caption(
+            f"⏳ Limiteur Claude : {limiter_stats['waited_seconds']:.0f}s d'attente, "
+            f"{limiter_stats['rate_limited']} × 429"
+        )
 
 
 # Onglets
@@ -1061,6 +1874,14 @@ with tab1:
         st.error("Impossible de se connecter à Leonar")
         st.stop()
     
+    # Batchs soumis lors d'un run précédent (mode batch) pas encore exportés
+    pending_batches = load_pending_manifests()
+    if pending_batches:
+        pending_count = sum(len(m.get('contexts', {})) for m in pending_batches)
+        st.info(f"🌙 {len(pending_batches)} batch(s) en cours ({pending_count} prospects) soumis lors d'un run précédent")
+        if st.button("📥 Récupérer les batchs en cours", type="secondary"):
+            run_batch_generation(pending_batches)
+    
     # Zone URLs fiches de poste - AGRANDIE
     st.subheader("📄 URLs des fiches de poste (optionnel)")
     st.caption("💡 Priorité : URL dans Leonar (`custom_text_1`) > URL ci-dessous. Si tu remplis `custom_text_1` dans Leonar, tu peux laisser vide ici.")
@@ -1094,7 +1915,7 @@ with tab1:
         )
     
     # Rafraîchir prospects
-    col1, col2, col3 = st.columns([1, 1, 2])
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 2])
     with col1:
         if st.button("🔄 Rafraîchir", type="secondary"):
             with st.spinner("Chargement depuis Leonar..."):
@@ -1102,13 +1923,19 @@ with tab1:
     
     with col2:
         if st.button("🗑️ Reset traités", type="secondary"):
-            if os.path.exists(PROCESSED_FILE):
-                os.remove(PROCESSED_FILE)
-                st.success("✅ Liste des prospects traités effacée")
+            deleted = processed_store.reset()
+            st.success(f"✅ Liste des prospects traités effacée ({deleted})")
             with st.spinner("Rechargement..."):
                 st.session_state.leonar_prospects = get_new_prospects_leonar(token)
     
     with col3:
+        stream_clicked = st.button(
+            "⚡ Charger + générer",
+            type="secondary",
+            help="Traite les prospects pendant la pagination Leonar (URLs Leonar custom_text_1 uniquement)"
+        )
+    
+    with col4:
         if st.session_state.leonar_prospects:
             st.success(f"✅ {len(st.session_state.leonar_prospects)} prospects à traiter")
         else:
@@ -1145,6 +1972,20 @@ with tab1:
                     if value and str(value).strip():
                         st.write(f"- `{key}` = {str(value)[:100]}")
         
+        batch_mode = st.checkbox(
+            "🌙 Mode batch (API Message Batches)",
+            help="Toutes les séquences en un batch : -50% sur les tokens, pas de rate limit, "
+                 "résultats en quelques minutes (jusqu'à 24h). La page peut être fermée puis "
+                 "les résultats récupérés plus tard."
+        )
+        grouped_mode = st.checkbox(
+            "👥 Génération groupée par fiche",
+            value=GROUPED_GENERATION_SIZE > 1,
+            disabled=batch_mode or GROUPED_GENERATION_SIZE <= 1,
+            help=f"Jusqu'à {GROUPED_GENERATION_SIZE} prospects d'une même fiche de poste en un seul "
+                 "appel Claude (fiche envoyée une fois). Repli automatique sur un appel par prospect."
+        )
+        
         # Bouton génération
         if st.button("🚀 LANCER LA GÉNÉRATION", type="primary", use_container_width=True):
             
@@ -1168,95 +2009,48 @@ with tab1:
                 st.error(f"Erreur Apify: {e}")
                 st.stop()
             
-            # Progress
-            progress = st.progress(0)
-            status = st.empty()
-            
-            # Traiter chaque prospect
-            for i, prospect in enumerate(st.session_state.leonar_prospects):
-                progress.progress((i + 1) / len(st.session_state.leonar_prospects))
-                
-                name = prospect.get('user_full name', 'Inconnu')
-                company = prospect.get('linkedin_company', '')
-                status.write(f"⚙️ Traitement de **{name}**...")
-                
-                try:
-                    # Extraire données prospect
-                    p_data = extract_prospect_data(prospect)
-                    
-                    # URL fiche de poste : priorité Leonar (custom_text_1) > manuelle
-                    leonar_url = prospect.get('custom_text_1', '').strip()
-                    manual_url = job_urls_list[i] if (job_urls_list and i < len(job_urls_list)) else None
-                    
-                    if leonar_url:
-                        job_url = leonar_url
-                        st.caption(f"   📄 URL depuis Leonar")
-                    elif manual_url:
-                        job_url = manual_url
-                        st.caption(f"   📄 URL manuelle")
-                    else:
-                        st.warning(f"   ⚠️ Pas d'URL pour ce prospect - ignoré")
-                        continue
-                    
-                    # 1. Scraper la fiche de poste (ou utiliser description manuelle pour Apec)
-                    job_data = None
-                    is_apec_url = 'apec.fr' in job_url.lower()
-                    
-                    if is_apec_url and apec_manual_description:
-                        # Utiliser la description manuelle pour Apec
-                        job_data = {
-                            'title': 'Poste Apec',
-                            'description': apec_manual_description,
-                            'source': 'Apec (manuel)',
-                            'url': job_url
-                        }
-                        st.caption(f"   ✅ Description Apec (manuelle)")
-                    elif is_apec_url and not apec_manual_description:
-                        st.warning(f"   ⚠️ URL Apec détectée mais pas de description manuelle")
-                    else:
-                        with st.spinner(f"📄 Scraping fiche de poste..."):
-                            job_data = scrape_job_posting(job_url)
-                            if job_data:
-                                st.caption(f"   ✅ Fiche: {job_data.get('title', 'N/A')[:40]}...")
-                    
-                    # 2. Scraper LinkedIn posts
-                    posts = []
-                    if p_data.get('linkedin_url'):
-                        with st.spinner(f"🔍 Scraping LinkedIn..."):
-                            posts = scrape_linkedin_posts(apify_client, p_data['linkedin_url'])
-                            st.caption(f"   ✅ {len(posts)} posts LinkedIn (<6 mois)")
-                    
-                    # 3. Recherche web
-                    web_results = []
-                    if SERPER_API_KEY and name != 'Inconnu':
-                        with st.spinner(f"🌐 Recherche web..."):
-                            web_results = search_web_prospect(name, company)
-                            st.caption(f"   ✅ {len(web_results)} résultats web")
-                    
-                    # 4. Générer séquence
-                    with st.spinner(f"✨ Génération messages..."):
-                        sequence = generate_sequence_v28(p_data, posts, web_results, job_data)
-                    
-                    if sequence:
-                        # Update Leonar
-                        if update_prospect_leonar(token, prospect['_id'], sequence):
-                            save_processed(prospect['_id'])
-                            st.toast(f"✅ {name}")
-                        else:
-                            st.warning(f"⚠️ Erreur export Leonar pour {name}")
-                    else:
-                        st.error(f"❌ Erreur génération pour {name}")
-                
-                except Exception as e:
-                    st.error(f"❌ Erreur pour {name}: {e}")
-                
-                # Pause anti-rate-limit entre chaque prospect (sauf le dernier)
-                if i < len(st.session_state.leonar_prospects) - 1:
-                    status.write(f"⏳ Pause anti-rate-limit (3s)...")
-                    time.sleep(3)
-            
-            progress.progress(1.0)
-            status.empty()
+            prospects = st.session_state.leonar_prospects
+
+            # URL fiche de poste : priorité Leonar (custom_text_1) > manuelle
+            jobs = []
+            for i, prospect in enumerate(prospects):
+                leonar_url = prospect.get('custom_text_1', '').strip()
+                manual_url = job_urls_list[i] if (job_urls_list and i < len(job_urls_list)) else None
+                jobs.append((prospect, leonar_url or manual_url, 'Leonar' if leonar_url else 'manuelle'))
+
+            # Posts LinkedIn de toute la campagne en quelques runs Apify
+            prefetched_posts = {}
+            if APIFY_BATCH_ENABLED:
+                linkedin_urls = [p.get('linkedin_url') for p, job_url, _ in jobs if job_url and p.get('linkedin_url')]
+                if linkedin_urls:
+                    with st.spinner(f"🔍 Scraping LinkedIn par lots ({len(linkedin_urls)} profils)..."):
+                        prefetched_posts = scrape_linkedin_posts_batch(apify_client, linkedin_urls)
+
+            if batch_mode:
+                st.write("🔍 Collecte des données prospects...")
+                prepared, cached = prepare_batch_requests(jobs, apify_client, apec_manual_description,
+                                                          prefetched_posts=prefetched_posts)
+                if cached:
+                    export_cached_sequences(cached)
+                if prepared:
+                    manifests = submit_campaign_batch(prepared)
+                    submitted = sum(len(manifest['contexts']) for manifest in manifests)
+                    st.info(f"🌙 {submitted} requête(s) soumise(s) pour {len(prepared)} prospect(s) "
+                            f"en {len(manifests)} batch(s) - "
+                            "vous pouvez fermer la page et cliquer plus tard sur « Récupérer les batchs en cours »")
+                    run_batch_generation(manifests)
+                elif not cached:
+                    st.warning("⚠️ Aucun prospect à générer")
+            else:
+                run_leonar_generation(
+                    jobs,
+                    apify_client,
+                    apec_manual_description,
+                    expected_total=lambda: len(jobs),
+                    prefetched_posts=prefetched_posts,
+                    grouped=grouped_mode
+                )
+
             st.success("✅ Génération terminée !")
             st.balloons()
             
@@ -1264,6 +2058,43 @@ with tab1:
             st.session_state.leonar_prospects = []
 
 
+    # Génération en flux : chaque page Leonar est traitée dès sa réception
+    # (l'ordre des prospects n'est pas connu d'avance : pas d'URLs manuelles)
+    if stream_clicked:
+        try:
+            apify_client = init_apify_client()
+        except Exception as e:
+            st.error(f"Erreur Apify: {e}")
+            st.stop()
+        
+        pagination = {'expected': 0, 'filtered_out': 0}
+        
+        def on_page(page, received, kept, total):
+            pagination['filtered_out'] += received - kept
+            pagination['expected'] = total - pagination['filtered_out']
+        
+        def stream_jobs():
+            for prospect in iter_new_prospects_leonar(token, on_page=on_page):
+                leonar_url = prospect.get('custom_text_1', '').strip()
+                yield prospect, leonar_url or None, 'Leonar'
+        
+        try:
+            processed_count = run_leonar_generation(
+                stream_jobs(),
+                apify_client,
+                apec_manual_description,
+                expected_total=lambda: pagination['expected'],
+                grouped=GROUPED_GENERATION_SIZE > 1
+            )
+            st.success(f"✅ Génération terminée ! {processed_count} prospects traités")
+        except LeonarAPIError as e:
+            if e.status_code == 401:
+                get_token_manager(LEONAR_EMAIL, LEONAR_PASSWORD).invalidate()
+            st.error(f"❌ {e}")
+        
+        st.session_state.leonar_prospects = []
+
+
 # ========================================
 # TAB 2 : TEST MANUEL
 # ========================================
@@ -1293,47 +2124,71 @@ with tab2:
             'linkedin_url': t_linkedin
         }
         
-        # Scraper fiche
-        job_data = None
+        # Fiche, LinkedIn et recherche web en parallèle
+        tasks = {}
         if t_job_url:
-            with st.spinner("📄 Scraping fiche de poste..."):
-                job_data = scrape_job_posting(t_job_url)
-                if job_data:
-                    st.success(f"✅ Fiche: {job_data.get('title', '')[:50]}")
-        
-        # Scraper LinkedIn
-        posts = []
+            tasks['job'] = lambda: scrape_job_posting(t_job_url)
         if t_linkedin:
             try:
                 apify_client = init_apify_client()
-                with st.spinner("🔍 Scraping LinkedIn..."):
-                    posts = scrape_linkedin_posts(apify_client, t_linkedin)
-                    st.success(f"✅ {len(posts)} posts LinkedIn (<6 mois)")
+                tasks['posts'] = lambda: scrape_linkedin_posts(apify_client, t_linkedin)
             except Exception as e:
                 st.warning(f"Scraping LinkedIn échoué: {e}")
-        
-        # Recherche web
-        web_results = []
         if SERPER_API_KEY:
-            with st.spinner("🌐 Recherche web..."):
-                web_results = search_web_prospect(f"{t_prenom} {t_nom}", t_company)
-                st.success(f"✅ {len(web_results)} résultats web")
+            tasks['web'] = lambda: search_web_prospect(f"{t_prenom} {t_nom}", t_company)
+        
+        with st.spinner("📄🔍🌐 Scraping fiche, LinkedIn et web..."):
+            fetched, timings = fan_out(
+                tasks,
+                timeout=STAGE_TIMEOUT_SECONDS,
+                defaults={'job': None, 'posts': [], 'web': []}
+            )
+        
+        job_data = fetched.get('job')
+        if job_data:
+            st.success(f"✅ Fiche: {job_data.get('title', '')[:50]}")
+        
+        posts = fetched.get('posts', [])
+        if 'posts' in tasks:
+            st.success(f"✅ {len(posts)} posts LinkedIn (<6 mois)")
+        
+        web_results = fetched.get('web', [])
+        if 'web' in tasks:
+            st.success(f"✅ {len(web_results)} résultats web")
+        
+        if timings:
+            st.caption("⏱️ " + " | ".join(f"{stage} {t}s" for stage, t in timings.items()))
         
-        # Générer
-        with st.spinner("✨ Génération..."):
-            sequence = generate_sequence_v28(prospect, posts, web_results, job_data)
+        # Générer (streaming : les messages s'affichent au fil de l'eau)
+        st.divider()
+        
+        st.subheader("✉️ Message 1")
+        m1_box = st.empty()
+        
+        st.subheader("✉️ Message 2")
+        m2_box = st.empty()
+        
+        def show_progress(parser):
+            index, text = parser.current()
+            if index == 1:
+                m1_box.markdown(text + " ▌")
+            elif index == 2:
+                m2_box.markdown(text + " ▌")
+        
+        sequence = generate_sequence_v28_stream(
+            prospect, posts, web_results, job_data,
+            on_progress=show_progress,
+            on_message_1=m1_box.info
+        )
         
         if sequence:
-            st.divider()
-            
-            st.subheader("📧 Objets")
-            st.code(sequence['subject_lines'])
-            
-            st.subheader("✉️ Message 1")
-            st.info(sequence['message_1'])
-            
-            st.subheader("✉️ Message 2")
-            st.info(sequence['message_2'])
+            m1_box.info(sequence['message_1'])
+            m2_box.info(sequence['message_2'])
             
             st.subheader("✉️ Message 3")
             st.info(sequence['message_3'])
+            
+            st.subheader("📧 Objets")
+            st.code(sequence['subject_lines'])
+        else:
+            m2_box.empty()
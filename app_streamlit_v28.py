@@ -21,6 +21,23 @@ from sequence_generator_v28 import (
     scrape_linkedin_posts,
     tracker
 )
+from config import (
+    CLAUDE_MODEL_TIERS, MODEL_ROUTING_ENABLED, MODEL_ROUTING_THRESHOLDS,
+    PROMPT_INPUT_TOKEN_BUDGET, PROMPT_BUDGET_SHARES, PROMPT_MAX_TOKENS_PER_POST
+)
+from prospection_utils import model_router, prompt_budget
+
+# Niveaux de modèle (petit / grand) selon la richesse des données du prospect
+model_router.configure(
+    model_tiers=CLAUDE_MODEL_TIERS,
+    enabled=MODEL_ROUTING_ENABLED,
+    thresholds=MODEL_ROUTING_THRESHOLDS
+)
+prompt_budget.configure(
+    input_budget=PROMPT_INPUT_TOKEN_BUDGET,
+    shares=PROMPT_BUDGET_SHARES,
+    max_tokens_per_post=PROMPT_MAX_TOKENS_PER_POST
+)
 
 # ========================================
 # CONFIGURATION PAGE
@@ -0,0 +1,181 @@
+"""
+Benchmark de l'extraction des fiches de poste
+Compare, page par page, la logique BeautifulSoup (html.parser, arbre complet)
+et l'extraction lxml + XPath précompilés (prospection_utils/html_parsing.py)
+via les scrapers de scraper_job_posting.py, sans accès réseau
+
+Usage :
+    python benchmark_job_parsing.py [page.html ...] [--runs 20]
+
+Sans fichier : pages synthétiques de la taille d'une vraie fiche (menus,
+scripts, offres similaires). Le site est déduit du nom du fichier
+(hellowork, linkedin, apec, sinon générique).
+
+Mémoire : pic tracemalloc, qui ne voit que les allocations Python ; l'arbre
+libxml2 (alloué en C) n'y figure pas ; côté lxml, il compte surtout la page
+décodée (str) et les chaînes extraites.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+import tracemalloc
+
+import scraper_job_posting
+from prospection_utils import html_parsing
+
+SITE_URLS = {
+    'hellowork': 'https://www.hellowork.com/fr-fr/emplois/benchmark.html',
+    'linkedin': 'https://www.linkedin.com/jobs/view/benchmark',
+    'apec': 'https://www.apec.fr/candidat/recherche-emploi.html/emploi/detail-offre/benchmark',
+    'generic': 'https://careers.example.com/offres/benchmark'
+}
+
+# Markup propre à chaque site (titre et description aux emplacements attendus)
+SITE_MARKUP = {
+    'hellowork': (
+        '<h1 class="tw-text-3xl tw-font-bold">Contrôleur de gestion H/F</h1>'
+        '<p class="tw-text-xl">Groupe Exemple</p>'
+        '<div><span>Localisation</span> Lyon 69</div>'
+        '<div><span>Type de contrat</span> CDI</div>'
+        '<div class="job-description">{description}</div>'
+        '<h2>Vos missions</h2><ul>{missions}</ul>'
+        '<h2>Profil recherché</h2><ul>{profile}</ul>'
+    ),
+    'linkedin': (
+        '<h1 class="top-card-layout__title">Contrôleur de gestion H/F</h1>'
+        '<a class="topcard__org-name-link">Groupe Exemple</a>'
+        '<span class="topcard__flavor topcard__flavor--bullet">Lyon, Auvergne-Rhône-Alpes</span>'
+        '<div class="show-more-less-html__markup">{description}<ul>{missions}</ul><ul>{profile}</ul></div>'
+    ),
+    'apec': (
+        '<h1 class="title">Contrôleur de gestion H/F</h1>'
+        '<span class="company-name">Groupe Exemple</span>'
+        '<ul><li class="location">Lyon - 69</li><li>CDI</li></ul>'
+        '<div class="offre-description">{description}</div>'
+        '<h3>Missions</h3><ul>{missions}</ul>'
+        '<h3>Profil</h3><ul>{profile}</ul>'
+    ),
+    'generic': (
+        '<h1>Contrôleur de gestion H/F</h1>'
+        '<article>{description}<ul>{missions}</ul><ul>{profile}</ul></article>'
+    )
+}
+
+
+class _PageResponse:
+    status_code = 200
+    headers = {'Content-Type': 'text/html'}
+
+    def __init__(self, content):
+        self.content = content
+
+
+class _OfflineHttp:
+    """Remplace le client HTTP des scrapers : sert les pages chargées en mémoire"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, **kwargs):
+        return _PageResponse(self.pages[url])
+
+
+def synthetic_page(site):
+    """Fiche de poste type : ~300 Ko dont l'essentiel hors titre et description"""
+    sentence = "Vous pilotez le reporting mensuel et le budget annuel avec les opérationnels. "
+    description = ''.join(f'<p>{sentence * 3}</p>' for _ in range(12))
+    missions = ''.join(f'<li>Mission {i} : {sentence}</li>' for i in range(10))
+    profile = ''.join(f'<li>Compétence {i} : Excel avancé, SAP, Power BI.</li>' for i in range(8))
+    navigation = ''.join(f'<li><a href="/emplois/{i}" class="nav-link">Rubrique {i}</a></li>' for i in range(400))
+    scripts = ''.join(f'<script>window.__DATA_{i}__ = {{"items": [{", ".join(str(n) for n in range(400))}]}};</script>' for i in range(20))
+    similar = ''.join(
+        f'<div class="card"><a href="/offre/{i}"><span class="card-title">Offre similaire {i}</span></a>'
+        f'<span class="card-company">Entreprise {i}</span><span class="card-place">Paris</span></div>'
+        for i in range(600)
+    )
+    body = SITE_MARKUP[site].format(description=description, missions=missions, profile=profile)
+    return (
+        '<!DOCTYPE html><html lang="fr"><head><meta charset="utf-8"><title>Offre</title>'
+        f'{scripts}</head><body><header><nav><ul>{navigation}</ul></nav></header>'
+        f'<main>{body}<aside>{similar}</aside></main><footer><ul>{navigation}</ul></footer></body></html>'
+    ).encode('utf-8')
+
+
+def site_for_file(path):
+    name = os.path.basename(path).lower()
+    for site in ('hellowork', 'linkedin', 'apec'):
+        if site in name:
+            return site
+    return 'generic'
+
+
+def scrape(url, use_lxml):
+    """Un scraping complet ; use_lxml=False force la logique BeautifulSoup d'origine"""
+    available = html_parsing.LXML_AVAILABLE
+    html_parsing.LXML_AVAILABLE = available and use_lxml
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return scraper_job_posting.scrape_job_posting(url)
+    finally:
+        html_parsing.LXML_AVAILABLE = available
+
+
+def measure(url, use_lxml, runs):
+    """
+    Returns:
+        tuple: (temps moyen en ms, pic mémoire en Ko, résultat)
+    """
+    result = scrape(url, use_lxml)  # Préchauffage (imports, compilation)
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        scrape(url, use_lxml)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / runs
+
+    tracemalloc.start()
+    scrape(url, use_lxml)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_ms, peak / 1024, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('pages', nargs='*', help='Fichiers HTML enregistrés')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    pages = {}
+    labels = []
+    if args.pages:
+        for index, path in enumerate(args.pages):
+            url = f"{SITE_URLS[site_for_file(path)]}?page={index}"
+            with open(path, 'rb') as f:
+                pages[url] = f.read()
+            labels.append((os.path.basename(path), url))
+    else:
+        for site, url in SITE_URLS.items():
+            pages[url] = synthetic_page(site)
+            labels.append((f'{site} (synthétique)', url))
+
+    if not html_parsing.LXML_AVAILABLE:
+        print("⚠️  lxml non installé : les deux mesures utilisent BeautifulSoup (pip install lxml)\n")
+
+    scraper_job_posting.http = _OfflineHttp(pages)
+
+    print(f"{'Page':<26} {'Ko':>6} │ {'html.parser ms':>14} {'pic Ko':>8} │ {'lxml ms':>8} {'pic Ko':>8} │ {'gain':>6}  résultat")
+    for label, url in labels:
+        before_ms, before_kb, before = measure(url, use_lxml=False, runs=args.runs)
+        after_ms, after_kb, after = measure(url, use_lxml=True, runs=args.runs)
+        same = '✅ identique' if before == after else '⚠️  différent'
+        print(
+            f"{label:<26} {len(pages[url]) / 1024:>6.0f} │ {before_ms:>14.1f} {before_kb:>8.0f} │ "
+            f"{after_ms:>8.1f} {after_kb:>8.0f} │ {before_ms / after_ms:>5.1f}x  {same}"
+        )
+
+
+if __name__ == '__main__':
+    main()
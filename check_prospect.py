@@ -2,7 +2,8 @@
 Script pour vérifier les données d'un prospect dans Leonar
 """
 
-import requests
+from prospection_utils.http_client import http
+from prospection_utils.leonar_auth import get_token_manager
 import os
 from dotenv import load_dotenv
 
@@ -12,23 +13,19 @@ LEONAR_EMAIL = os.getenv("LEONAR_EMAIL")
 LEONAR_PASSWORD = os.getenv("LEONAR_PASSWORD")
 LEONAR_CAMPAIGN_ID = os.getenv("LEONAR_CAMPAIGN_ID")
 
-# 1. Authentification
-response = requests.post(
-    'https://dashboard.leonar.app/api/1.1/wf/auth',
-    headers={'Content-Type': 'application/json'},
-    json={
-        "email": LEONAR_EMAIL,
-        "password": LEONAR_PASSWORD
-    }
-)
+# 1. Authentification (token en cache partagé avec l'app)
+token = get_token_manager(LEONAR_EMAIL, LEONAR_PASSWORD).get_token()
+
+if not token:
+    print("❌ Erreur authentification Leonar")
+    exit(1)
 
-token = response.json()['response']['token']
 print("✅ Token obtenu\n")
 
 # 2. Récupérer les prospects de la campagne
 print("🔍 Récupération des prospects de la campagne...\n")
 
-response = requests.get(
+response = http.get(
     f'https://dashboard.leonar.app/api/1.1/obj/matching?constraints=[{{"key":"campaign","constraint_type":"equals","value":"{LEONAR_CAMPAIGN_ID}"}}]&cursor=0',
     headers={'Authorization': f'Bearer {token}'}
 )
@@ -329,13 +329,79 @@ OUTCOMES_DETAILED = {
 # ========================================
 # 9. PARAMÈTRES
 # ========================================
-DELAY_BETWEEN_PROSPECTS = 5  # Délai entre chaque prospect (secondes)
 CLAUDE_MODEL = "claude-sonnet-4-20250514"
 
+# Routage par niveau de modèle : cas simples (extraction de hooks, CAS C sans hook,
+# prospect sans posts ni actualités) au petit modèle, cas riches au grand
+CLAUDE_MODEL_TIERS = {
+    'small': "claude-3-5-haiku-20241022",
+    'large': CLAUDE_MODEL
+}
+MODEL_ROUTING_ENABLED = True  # False = tout au grand modèle
+MODEL_ROUTING_THRESHOLDS = {
+    'hook_score': 3,   # Icebreaker : score de hook (select_best_hook) pour le grand modèle
+    'posts': 1,        # Séquence : posts LinkedIn récents pour le grand modèle
+    'web_results': 1   # Séquence : actualités web récentes pour le grand modèle
+}
+
 # Paramètres de recherche web
 WEB_SEARCH_ENABLED = True  # Activer/désactiver facilement
 MAX_SEARCH_RESULTS = 5  # Limiter le nombre de résultats
 
+# Pipeline concurrent (onglet Génération Leonar)
+MAX_PROSPECTS_IN_FLIGHT = 4  # Prospects traités en parallèle (1 = séquentiel)
+CONCURRENCY_LIMITS = {
+    'apify': 3,        # Runs d'acteurs Apify simultanés
+    'serper': 5,       # Recherches web simultanées
+    'job_boards': 4,   # Scraping fiches de poste simultané
+    'anthropic': 2,    # Appels Claude simultanés
+    'leonar': 4        # Appels API Leonar simultanés
+}
+STAGE_TIMEOUT_SECONDS = 240  # Délai max des fetchs d'un prospect (fiche, posts, web)
+
+# Scraping Apify par lots (un run d'acteur pour plusieurs URLs LinkedIn)
+APIFY_BATCH_ENABLED = True
+APIFY_BATCH_CHUNK_SIZE = 25  # URLs par run d'acteur
+
+# Cache disque des scrapings LinkedIn (cache/prospection_cache.sqlite3)
+# TTL posts < fenêtre de filter_recent_posts (au-delà les posts sont inutiles)
+SCRAPE_CACHE_TTL_HOURS = {
+    'posts': 72,
+    'profile': 24 * 14
+}
+SCRAPE_CACHE_MAX_ENTRIES = 5000  # Éviction LRU au-delà
+
+# Cache HTTP des fiches de poste (revalidation ETag / Last-Modified au-delà du TTL)
+JOB_POSTING_CACHE_TTL_HOURS = 24
+
+# Cache des générations Claude (fiche + posts + web + titre identiques, prénom remis à la lecture)
+GENERATION_CACHE_ENABLED = True
+GENERATION_CACHE_TTL_HOURS = 24 * 7
+GENERATION_CACHE_MAX_ENTRIES = 2000  # Éviction LRU au-delà
+
+# Génération groupée : prospects d'une même fiche servis par un seul appel Claude
+# (la fiche n'est envoyée qu'une fois). Taille réelle bornée par MAX_PROSPECTS_IN_FLIGHT
+GROUPED_GENERATION_SIZE = 4  # Prospects max par appel (1 = désactivé)
+GROUPED_GENERATION_WAIT_SECONDS = 3  # Attente max des autres prospects de la même fiche
+# Plafond : 1500 tokens de sortie par prospect, un groupe peut partir au petit
+# modèle (Haiku 3.5 : 8192 tokens de sortie max) -> 5 prospects au plus
+GROUPED_GENERATION_MAX_SIZE = 5
+GROUPED_GENERATION_SIZE = max(1, min(GROUPED_GENERATION_SIZE, GROUPED_GENERATION_MAX_SIZE))
+
+# Mode batch (API Message Batches : -50% sur les tokens, résultats en différé)
+BATCH_POLL_INTERVAL_SECONDS = 60  # Intervalle de suivi d'un batch en cours
+
+# Budget de tokens des données variables du prompt (fiche + posts + web) : les
+# sections de fiche les plus utiles (missions, profil) passent avant la
+# présentation de l'entreprise et les avantages, coupe en fin de phrase
+PROMPT_INPUT_TOKEN_BUDGET = 1500
+PROMPT_BUDGET_SHARES = {'job_description': 0.5, 'posts': 0.3, 'web': 0.2}
+PROMPT_MAX_TOKENS_PER_POST = 150
+
+# Extraction des hooks en tool use : Claude remplit un schéma JSON au lieu de
+# rédiger du texte à parser (False = réponse texte lue par le parseur tolérant)
+HOOKS_TOOL_USE = False
+
 # ========================================
 # 10. COLONNES GOOGLE SHEET
 # ========================================
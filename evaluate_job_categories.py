@@ -0,0 +1,73 @@
+"""
+Évaluation hors ligne de la détection de catégorie métier
+Compare detect_category aux catégories attendues d'un jeu de fiches annotées
+
+Usage :
+    python evaluate_job_categories.py [fixtures/job_categories.json]
+
+Format du jeu : liste de {"title", "description", "headline", "expected"}
+Code de sortie 1 si au moins une fiche est mal classée.
+"""
+
+import json
+import sys
+import time
+from collections import Counter
+
+from prospection_utils.job_categories import detect_category
+
+DEFAULT_FIXTURES = 'fixtures/job_categories.json'
+
+
+def evaluate(cases):
+    """
+    Returns:
+        dict: {'total', 'correct', 'errors': [(cas, obtenu)], 'per_category': {cat: (ok, total)}}
+    """
+    errors = []
+    per_category = {}
+    for case in cases:
+        predicted = detect_category(case.get('title'), case.get('description'), case.get('headline'))
+        expected = case['expected']
+        ok, total = per_category.get(expected, (0, 0))
+        per_category[expected] = (ok + (predicted == expected), total + 1)
+        if predicted != expected:
+            errors.append((case, predicted))
+    return {
+        'total': len(cases),
+        'correct': len(cases) - len(errors),
+        'errors': errors,
+        'per_category': per_category
+    }
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FIXTURES
+    with open(path, encoding='utf-8') as f:
+        cases = json.load(f)
+
+    start = time.perf_counter()
+    report = evaluate(cases)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    accuracy = report['correct'] / report['total'] if report['total'] else 0
+    print(f"📊 {report['correct']}/{report['total']} fiches correctement classées ({accuracy:.1%}) en {elapsed_ms:.1f} ms\n")
+
+    for category, (ok, total) in sorted(report['per_category'].items()):
+        print(f"  {category:<18} {ok}/{total}")
+
+    if report['errors']:
+        print("\n❌ Erreurs :")
+        confusions = Counter((case['expected'], predicted) for case, predicted in report['errors'])
+        for case, predicted in report['errors']:
+            print(f"  - {case.get('title') or '(sans titre)'} : attendu {case['expected']}, obtenu {predicted}")
+        print("\nConfusions (attendu → obtenu) :")
+        for (expected, predicted), count in confusions.most_common():
+            print(f"  {expected} → {predicted} : {count}")
+        sys.exit(1)
+
+    print("\n✅ Aucune erreur")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,8 @@
 Script pour lister vos campagnes Leonar et trouver le CAMPAIGN_ID
 """
 
-import requests
+from prospection_utils.http_client import http
+from prospection_utils.leonar_auth import get_token_manager
 import os
 from dotenv import load_dotenv
 
@@ -18,27 +19,19 @@ if not LEONAR_EMAIL or not LEONAR_PASSWORD:
 
 print("🔐 Authentification Leonar...\n")
 
-# 1. Authentification
-response = requests.post(
-    'https://dashboard.leonar.app/api/1.1/wf/auth',
-    headers={'Content-Type': 'application/json'},
-    json={
-        "email": LEONAR_EMAIL,
-        "password": LEONAR_PASSWORD
-    }
-)
+# 1. Authentification (token en cache partagé avec l'app)
+token = get_token_manager(LEONAR_EMAIL, LEONAR_PASSWORD).get_token()
 
-if response.status_code != 200:
-    print(f"❌ Erreur authentification : {response.text}")
+if not token:
+    print("❌ Erreur authentification Leonar")
     exit(1)
 
-token = response.json()['response']['token']
 print(f"✅ Token obtenu\n")
 
 # 2. Liste des campagnes
 print("📋 RÉCUPÉRATION DE VOS CAMPAGNES...\n")
 
-response = requests.get(
+response = http.get(
     'https://dashboard.leonar.app/api/1.1/obj/campaign?cursor=0',
     headers={'Authorization': f'Bearer {token}'}
 )
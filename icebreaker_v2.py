@@ -12,12 +12,25 @@ Modifications V27.5 :
 import anthropic
 import os
 import re
+import time
+import numpy as np
 from datetime import datetime, timedelta
-from config import COMPANY_INFO
+from config import COMPANY_INFO, HOOKS_TOOL_USE
 
 # Imports utilitaires
 from prospection_utils.logger import log_event, log_error
 from prospection_utils.cost_tracker import tracker
+from prospection_utils.prompt_cache import cached_system
+from prospection_utils.rate_limiter import create_message
+from prospection_utils.model_router import route_model
+from prospection_utils.json_parsing import extract_json, tool_spec, forced_tool, tool_input
+from prospection_utils.prompt_budget import fit_job_description, truncate_to_tokens, max_tokens_per_post
+from prospection_utils.keyword_matcher import KeywordMatcher
+from prospection_utils.job_categories import detect_category
+from prospection_utils.date_parsing import filter_recent_posts
+from prospection_utils.apify_batch import (
+    scrape_posts_batch, scrape_profiles_batch, scrape_posts_cached, scrape_profile_cached
+)
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 APIFY_API_TOKEN = os.getenv("APIFY_API_TOKEN")
@@ -25,6 +38,9 @@ APIFY_API_TOKEN = os.getenv("APIFY_API_TOKEN")
 if not ANTHROPIC_API_KEY:
     raise ValueError("❌ ANTHROPIC_API_KEY non trouvée")
 
+# Extrait de fiche dans les prompts icebreaker (sections missions / profil en priorité)
+ICEBREAKER_JOB_DESCRIPTION_TOKENS = 170
+
 
 # ========================================
 # FONCTIONS APIFY (POUR APP_STREAMLIT.PY)
@@ -56,12 +72,8 @@ def scrape_linkedin_profile(apify_client, linkedin_url):
     try:
         log_event('scrape_linkedin_profile_start', {'url': linkedin_url})
         
-        run_input = {
-            "profileUrls": [linkedin_url]
-        }
-        
-        run = apify_client.actor("dev_fusion/Linkedin-Profile-Scraper").call(run_input=run_input)
-        items = list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
+        # Cache disque : pas de nouveau run Apify si profil scrapé récemment
+        items = scrape_profile_cached(apify_client, linkedin_url)
         
         if items:
             profile_data = items[0]
@@ -81,15 +93,8 @@ def scrape_linkedin_posts(apify_client, linkedin_url):
     try:
         log_event('scrape_linkedin_posts_start', {'url': linkedin_url})
         
-        run_input = {
-            "deepScrape": True,
-            "limitPerSource": 5,
-            "rawData": False,
-            "urls": [linkedin_url]
-        }
-        
-        run = apify_client.actor("supreme_coder/linkedin-post").call(run_input=run_input)
-        items = list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
+        # Cache disque : pas de nouveau run Apify si posts scrapés récemment
+        items = scrape_posts_cached(apify_client, linkedin_url, limit_per_source=5)
         
         if items:
             log_event('scrape_linkedin_posts_success', {'posts_count': len(items)})
@@ -103,41 +108,32 @@ def scrape_linkedin_posts(apify_client, linkedin_url):
         return []
 
 
-def extract_hooks_with_claude(profile_data, posts_data, web_results, company_data, 
-                               news_results, full_name, company_name):
+def scrape_linkedin_profiles_batch(apify_client, linkedin_urls, chunk_size=25):
     """
-    Extrait les meilleurs hooks depuis les données scrapées via Claude
-    VERSION V27.4 : Filtrage dates AVANT extraction
+    Scrape plusieurs profils LinkedIn en quelques runs Apify
+    Retourne {url_normalisée: profil} (URLs en échec absentes)
     """
     try:
-        log_event('extract_hooks_start', {'full_name': full_name})
-        
-        # NOUVEAU V27.4 : Filtrer les posts <3 mois AVANT envoi à Claude
-        from message_sequence_generator import filter_recent_posts
-        
-        if posts_data and isinstance(posts_data, list):
-            filtered_posts = filter_recent_posts(posts_data, max_age_months=3, max_posts=5)
-            if filtered_posts:
-                posts_data = filtered_posts
-            else:
-                log_event('no_recent_posts', {'full_name': full_name})
-                return []
-        
-        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        
-        context = f"""
-PROFIL : {full_name} - {company_name}
+        return scrape_profiles_batch(apify_client, linkedin_urls, chunk_size=chunk_size)
+    except Exception as e:
+        log_error('scrape_linkedin_profiles_batch_error', str(e), {'urls': len(linkedin_urls)})
+        return {}
 
-POSTS LINKEDIN (filtrés <3 mois) :
-{format_posts_for_extraction(posts_data)}
 
-PROFIL LINKEDIN :
-{format_profile_for_extraction(profile_data)}
-"""
-        
-        prompt = f"""Analyse ces données LinkedIn et extrait les 3-5 meilleurs hooks pour un message de prospection.
+def scrape_linkedin_posts_batch(apify_client, linkedin_urls, chunk_size=25):
+    """
+    Scrape les posts de plusieurs profils LinkedIn en quelques runs Apify
+    Retourne {url_normalisée: posts} (URLs en échec absentes)
+    """
+    try:
+        return scrape_posts_batch(apify_client, linkedin_urls, limit_per_source=5, chunk_size=chunk_size)
+    except Exception as e:
+        log_error('scrape_linkedin_posts_batch_error', str(e), {'urls': len(linkedin_urls)})
+        return {}
+
 
-{context}
+# Critères et format des hooks : préfixe système mis en cache (prompt caching)
+EXTRACT_HOOKS_SYSTEM_PROMPT = """Tu extrais des hooks de prospection depuis des données LinkedIn (posts et profil).
 
 Un bon hook est :
 - Récent (moins de 3 mois)
@@ -168,54 +164,108 @@ Un bon hook est :
 
 Format de retour (JSON uniquement, sans texte avant/après) :
 [
-  {{"text": "Votre participation au podcast Inside Banking avec Richard Michaud sur l'adoption de l'IA", "type": "post", "date": "2025-01"}},
-  {{"text": "Votre organisation du premier Data & AI Day chez LCL avec plus de 130 collaborateurs", "type": "post", "date": "2024-11"}}
+  {"text": "Votre participation au podcast Inside Banking avec Richard Michaud sur l'adoption de l'IA", "type": "post", "date": "2025-01"},
+  {"text": "Votre organisation du premier Data & AI Day chez LCL avec plus de 130 collaborateurs", "type": "post", "date": "2024-11"}
 ]
 
 Si aucun hook pertinent récent n'est trouvé, retourne : []
 """
+
+# Mode tool use (config.HOOKS_TOOL_USE) : même format, imposé par schéma
+HOOKS_TOOL = tool_spec(
+    'record_hooks',
+    "Enregistre les 3-5 meilleurs hooks extraits (liste vide si aucun hook récent pertinent)",
+    {
+        'type': 'object',
+        'properties': {
+            'hooks': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'text': {'type': 'string'},
+                        'type': {'type': 'string', 'enum': ['post', 'article', 'podcast', 'prix', 'certification', 'conference', 'autre']},
+                        'date': {'type': 'string'}
+                    },
+                    'required': ['text', 'type']
+                }
+            }
+        },
+        'required': ['hooks']
+    }
+)
+
+
+def extract_hooks_with_claude(profile_data, posts_data, web_results, company_data, 
+                               news_results, full_name, company_name):
+    """
+    Extrait les meilleurs hooks depuis les données scrapées via Claude
+    VERSION V27.4 : Filtrage dates AVANT extraction
+    """
+    try:
+        log_event('extract_hooks_start', {'full_name': full_name})
         
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1024,
-            messages=[{"role": "user", "content": prompt}]
-        )
+        # NOUVEAU V27.4 : Filtrer les posts <3 mois AVANT envoi à Claude
+        if posts_data and isinstance(posts_data, list):
+            filtered_posts = filter_recent_posts(posts_data, max_age_months=3, max_posts=5)
+            if filtered_posts:
+                posts_data = filtered_posts
+            else:
+                log_event('no_recent_posts', {'full_name': full_name})
+                return []
+        
+        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
         
-        tracker.track(message.usage, 'extract_hooks_with_claude')
+        context = f"""
+PROFIL : {full_name} - {company_name}
+
+POSTS LINKEDIN (filtrés <3 mois) :
+{format_posts_for_extraction(posts_data)}
+
+PROFIL LINKEDIN :
+{format_profile_for_extraction(profile_data)}
+"""
         
-        result = message.content[0].text.strip()
+        prompt = f"""Analyse ces données LinkedIn et extrait les 3-5 meilleurs hooks pour un message de prospection.
+
+{context}"""
+        
+        tool_params = {'tools': [HOOKS_TOOL], 'tool_choice': forced_tool(HOOKS_TOOL['name'])} if HOOKS_TOOL_USE else {}
         
-        # Parser le JSON en gérant les backticks Markdown
-        import json
+        start = time.perf_counter()
+        message = create_message(
+            client,
+            model=route_model('extract_hooks', posts_count=len(posts_data or []), prospect=full_name),
+            max_tokens=1024,
+            system=cached_system(EXTRACT_HOOKS_SYSTEM_PROMPT),
+            messages=[{"role": "user", "content": prompt}],
+            **tool_params
+        )
         
-        json_match = re.search(r'```json\s*(\[.*?\])\s*```', result, re.DOTALL)
+        tracker.track(message.usage, 'extract_hooks_with_claude', latency=time.perf_counter() - start,
+                      model=message.model)
         
-        if json_match:
-            json_str = json_match.group(1)
+        if HOOKS_TOOL_USE:
+            hooks = (tool_input(message, HOOKS_TOOL['name']) or {}).get('hooks')
+            complete = message.stop_reason != 'max_tokens'
+            result = str(hooks)
         else:
-            json_array_match = re.search(r'(\[.*?\])', result, re.DOTALL)
-            if json_array_match:
-                json_str = json_array_match.group(1)
-            else:
-                json_str = result
+            # Parseur tolérant : ```json, texte autour, crochets dans les hooks, sortie tronquée
+            result = message.content[0].text.strip()
+            hooks, complete = extract_json(result, expect=list)
         
-        try:
-            hooks = json.loads(json_str)
-            
-            if not isinstance(hooks, list):
-                log_event('extract_hooks_invalid_format', {'type': type(hooks).__name__})
-                return []
-            
-            log_event('extract_hooks_success', {'hooks_count': len(hooks)})
-            return hooks
-            
-        except json.JSONDecodeError as e:
-            log_event('extract_hooks_json_error', {
-                'raw_result': result[:500],
-                'error': str(e)
-            })
+        if not isinstance(hooks, list):
+            log_event('extract_hooks_json_error', {'raw_result': result[:500]})
             return []
         
+        hooks = [hook for hook in hooks if isinstance(hook, dict)]
+        if not complete:
+            # Réponse coupée (max_tokens) : on garde les hooks complets déjà reçus
+            log_event('extract_hooks_truncated', {'hooks_kept': len(hooks)})
+        
+        log_event('extract_hooks_success', {'hooks_count': len(hooks)})
+        return hooks
+        
     except Exception as e:
         log_error('extract_hooks_error', str(e), {'full_name': full_name})
         return []
@@ -235,7 +285,7 @@ def format_posts_for_extraction(posts_data):
         post_content = f"Post {i+1} ({date})"
         if title:
             post_content += f"\nTitre: {title}"
-        post_content += f"\nContenu: {text[:500]}"
+        post_content += f"\nContenu: {truncate_to_tokens(text, max_tokens_per_post())}"
         
         formatted.append(post_content)
     
@@ -315,139 +365,302 @@ def extract_hooks_from_linkedin(hooks_data):
     return valid_hooks
 
 
-def score_hook_relevance(hook, job_posting_data):
+# Mots-clés du scoring des hooks (ordre significatif pour TECHNICAL_KEYWORDS :
+# le premier mot-clé commun à la fiche et au hook est retenu)
+TECHNICAL_KEYWORDS = [
+    'tagetik', 'epm', 'anaplan', 'hyperion', 'oracle planning', 'sap bpc', 'sap bfc', 'onestream',
+    'sap', 's/4hana', 's4hana', 'oracle', 'sage', 'sage x3', 'dynamics',
+    'ifrs', 'consolidation', 'statutory reporting', 'gaap', 'sox',
+    'power bi', 'powerbi', 'tableau', 'qlik', 'data science', 'python', 'sql', 'r',
+    'agile', 'scrum', 'kanban', 'safe', 'prince2', 'pmp',
+    'ia', 'ai', 'intelligence artificielle', 'machine learning', 'copilot', 'chatgpt',
+    'adoption ia', 'acculturation ia', 'acculturation', 'adoption',
+    'data & ai day', 'ai day', 'centre d\'excellence', 'centre excellence',
+    'trésorerie', 'cash management', 'fiscalité', 'tax', 'fp&a', 'fpa',
+    'bancaire', 'bank', 'banque', 'fintech', 'audiovisuel', 'cinéma', 'production',
+    'alm', 'actif-passif', 'liquidité', 'refinancement',
+    'solvabilité', 'solvency', 'iard', 'assurance', 'actuariat'
+]
+
+CONTEXT_KEYWORDS = [
+    'transformation', 'digitalisation', 'automatisation', 'projet',
+    'déploiement', 'implémentation', 'migration', 'change management',
+    'adoption', 'formation', 'training', 'accompagnement',
+    'gouvernance', 'data governance', 'process', 'efficiency',
+    'reporting', 'forecast', 'budget', 'clôture'
+]
+
+SECTOR_KEYWORDS = [
+    'finance', 'financial', 'comptabilité', 'accounting',
+    'contrôle de gestion', 'fpa', 'audit', 'consolidation',
+    'data', 'données', 'analytics'
+]
+
+# Points par critère (réglables hors ligne sur l'historique des réponses,
+# voir hook_feature_matrix) ; l'ordre est celui des colonnes de HOOK_FEATURES
+HOOK_SCORE_WEIGHTS = {
+    'technical': 3,        # NIVEAU 1 : compétence technique commune fiche / hook
+    'context': 2,          # NIVEAU 2 : contexte professionnel (>= HOOK_CONTEXT_MIN_MATCHES)
+    'sector': 1,           # NIVEAU 3 : secteur / industrie
+    'podcast': 3.0,        # 1. PODCAST/INTERVIEW - PRIORITÉ ABSOLUE
+    'article': 2.5,        # 2. ARTICLE PUBLIÉ
+    'award': 2.5,          # 3. AWARD/RÉCOMPENSE
+    'certification': 2.0,  # 4. CERTIFICATION
+    'event': 2.0,          # 5. ÉVÉNEMENT/CONFÉRENCE
+    'launch': 2.0,         # 6. LANCEMENT PROJET
+    'generic_penalty': -1  # Félicitations / remerciements sans autre intérêt
+}
+HOOK_FEATURES = [name for name in HOOK_SCORE_WEIGHTS if name != 'generic_penalty']
+
+HOOK_CONTEXT_MIN_MATCHES = 2
+HOOK_GENERIC_PENALTY_BELOW = 3  # Pénalité seulement si le score reste faible
+
+# Bonus événements majeurs : mots-clés cherchés dans le hook seul
+EVENT_BONUSES = [
+    ('podcast', ['podcast', 'inside banking', 'interview', 'échange avec', 'j\'ai eu le plaisir']),
+    ('article', ['article', 'publié dans', 'tribune', 'j\'ai écrit', 'publication']),
+    ('award', ['award', 'prix', 'récompense', 'distinction', 'lauréat', 'trophée']),
+    ('certification', ['certifié', 'certification', 'safe', 'pmp', 'aws', 'diplôme', 'formation certifiante', 'cia', 'cisa']),
+    ('event', ['conférence', 'webinar', 'speaker', 'intervenant', 'table ronde', 'vivatech', 'salon', 'événement dédié']),
+    ('launch', ['lancement', 'lancer', 'accélère', 'démarrage', 'inauguration', 'premier', 'première'])
+]
+
+GENERIC_PHRASES = ['heureux de', 'ravi de', 'fier de', 'merci', 'bravo', 'félicitations']
+
+# Automate unique compilé à l'import : fiche et hooks parcourus une seule fois
+HOOK_KEYWORD_MATCHER = KeywordMatcher(
+    TECHNICAL_KEYWORDS + CONTEXT_KEYWORDS + SECTOR_KEYWORDS + GENERIC_PHRASES
+    + [keyword for _, keywords in EVENT_BONUSES for keyword in keywords]
+)
+
+# Colonnes de la matrice hooks × mots-clés (scoring en lot)
+_KEYWORD_COLUMNS = {keyword: column for column, keyword in enumerate(HOOK_KEYWORD_MATCHER.keywords)}
+
+
+def _columns(keywords):
+    return np.array([_KEYWORD_COLUMNS[keyword] for keyword in keywords], dtype=np.intp)
+
+
+_TECHNICAL_COLUMNS = _columns(TECHNICAL_KEYWORDS)
+_CONTEXT_COLUMNS = _columns(CONTEXT_KEYWORDS)
+_SECTOR_COLUMNS = _columns(SECTOR_KEYWORDS)
+_GENERIC_COLUMNS = _columns(GENERIC_PHRASES)
+_EVENT_COLUMNS = [(name, _columns(keywords)) for name, keywords in EVENT_BONUSES]
+
+
+def _bonus_label(name, weights):
+    return f"{name}_bonus_+{weights[name]}"
+
+
+def job_keywords(job_posting_data):
+    """Mots-clés présents dans la fiche (titre + description), calculés une fois par prospect"""
+    if not job_posting_data:
+        return set()
+    return HOOK_KEYWORD_MATCHER.find(
+        f"{job_posting_data.get('title', '')} {job_posting_data.get('description', '')}"
+    )
+
+
+def score_hook_relevance(hook, job_posting_data, job_keyword_set=None, weights=None):
     """
     Score un hook de 1 à 10 selon sa pertinence
     VERSION V27.4 : Bonus massifs pour événements majeurs
+    job_keyword_set : job_keywords(job_posting_data) déjà calculé
+    Version unitaire de score_hooks_batch (mêmes poids, même résultat)
     """
     if not job_posting_data:
         return 2, []
     
+    weights = weights or HOOK_SCORE_WEIGHTS
     hook_text = hook['text'].lower()
     hook_title = hook.get('title', '').lower()
-    combined_text = f"{hook_text} {hook_title}"
     
-    job_title = str(job_posting_data.get('title', '')).lower()
-    job_desc = str(job_posting_data.get('description', '')).lower()
-    job_full = f"{job_title} {job_desc}"
+    if job_keyword_set is None:
+        job_keyword_set = job_keywords(job_posting_data)
+    hook_keywords = HOOK_KEYWORD_MATCHER.find(f"{hook_text} {hook_title}")
+    common = hook_keywords & job_keyword_set
     
     score = 0
     matching_keywords = []
     
     # ========================================
-    # NIVEAU 1 : COMPÉTENCES TECHNIQUES (+3 points)
+    # NIVEAU 1 : COMPÉTENCES TECHNIQUES
     # ========================================
-    technical_keywords = [
-        'tagetik', 'epm', 'anaplan', 'hyperion', 'oracle planning', 'sap bpc', 'sap bfc', 'onestream',
-        'sap', 's/4hana', 's4hana', 'oracle', 'sage', 'sage x3', 'dynamics',
-        'ifrs', 'consolidation', 'statutory reporting', 'gaap', 'sox',
-        'power bi', 'powerbi', 'tableau', 'qlik', 'data science', 'python', 'sql', 'r',
-        'agile', 'scrum', 'kanban', 'safe', 'prince2', 'pmp',
-        'ia', 'ai', 'intelligence artificielle', 'machine learning', 'copilot', 'chatgpt',
-        'adoption ia', 'acculturation ia', 'acculturation', 'adoption',
-        'data & ai day', 'ai day', 'centre d\'excellence', 'centre excellence',
-        'trésorerie', 'cash management', 'fiscalité', 'tax', 'fp&a', 'fpa',
-        'bancaire', 'bank', 'banque', 'fintech', 'audiovisuel', 'cinéma', 'production',
-        'alm', 'actif-passif', 'liquidité', 'refinancement',
-        'solvabilité', 'solvency', 'iard', 'assurance', 'actuariat'
-    ]
-    
-    for kw in technical_keywords:
-        if kw in job_full and kw in combined_text:
-            score += 3
-            matching_keywords.append(kw)
-            break
+    technical = next((kw for kw in TECHNICAL_KEYWORDS if kw in common), None)
+    if technical:
+        score += weights['technical']
+        matching_keywords.append(technical)
     
     # ========================================
-    # NIVEAU 2 : CONTEXTE PROFESSIONNEL (+2 points)
+    # NIVEAU 2 : CONTEXTE PROFESSIONNEL
     # ========================================
-    context_keywords = [
-        'transformation', 'digitalisation', 'automatisation', 'projet',
-        'déploiement', 'implémentation', 'migration', 'change management',
-        'adoption', 'formation', 'training', 'accompagnement',
-        'gouvernance', 'data governance', 'process', 'efficiency',
-        'reporting', 'forecast', 'budget', 'clôture'
-    ]
-    
-    context_matches = sum(1 for kw in context_keywords if kw in job_full and kw in combined_text)
-    if context_matches >= 2:
-        score += 2
+    context_matches = sum(1 for kw in CONTEXT_KEYWORDS if kw in common)
+    if context_matches >= HOOK_CONTEXT_MIN_MATCHES:
+        score += weights['context']
         matching_keywords.append(f"{context_matches} context keywords")
     
     # ========================================
-    # NIVEAU 3 : SECTEUR/INDUSTRIE (+1 point)
+    # NIVEAU 3 : SECTEUR/INDUSTRIE
     # ========================================
-    sector_keywords = [
-        'finance', 'financial', 'comptabilité', 'accounting',
-        'contrôle de gestion', 'fpa', 'audit', 'consolidation',
-        'data', 'données', 'analytics'
-    ]
-    
-    if any(kw in job_full and kw in combined_text for kw in sector_keywords):
-        score += 1
+    if any(kw in common for kw in SECTOR_KEYWORDS):
+        score += weights['sector']
         matching_keywords.append("sector match")
     
     # ========================================
     # BONUS ÉVÉNEMENTS MAJEURS
     # ========================================
-    
-    # 1. PODCAST/INTERVIEW (+3.0) - PRIORITÉ ABSOLUE
-    podcast_keywords = ['podcast', 'inside banking', 'interview', 'échange avec', 'j\'ai eu le plaisir']
-    if any(kw in combined_text for kw in podcast_keywords):
-        score += 3.0
-        matching_keywords.append("podcast_bonus_+3.0")
-    
-    # 2. ARTICLE PUBLIÉ (+2.5)
-    article_keywords = ['article', 'publié dans', 'tribune', 'j\'ai écrit', 'publication']
-    if any(kw in combined_text for kw in article_keywords):
-        score += 2.5
-        matching_keywords.append("article_bonus_+2.5")
-    
-    # 3. AWARD/RÉCOMPENSE (+2.5)
-    award_keywords = ['award', 'prix', 'récompense', 'distinction', 'lauréat', 'trophée']
-    if any(kw in combined_text for kw in award_keywords):
-        score += 2.5
-        matching_keywords.append("award_bonus_+2.5")
-    
-    # 4. CERTIFICATION (+2.0)
-    cert_keywords = ['certifié', 'certification', 'safe', 'pmp', 'aws', 'diplôme', 'formation certifiante', 'cia', 'cisa']
-    if any(kw in combined_text for kw in cert_keywords):
-        score += 2.0
-        matching_keywords.append("certification_bonus_+2.0")
-    
-    # 5. ÉVÉNEMENT/CONFÉRENCE (+2.0)
-    event_keywords = ['conférence', 'webinar', 'speaker', 'intervenant', 'table ronde', 'vivatech', 'salon', 'événement dédié']
-    if any(kw in combined_text for kw in event_keywords):
-        score += 2.0
-        matching_keywords.append("event_bonus_+2.0")
-    
-    # 6. LANCEMENT PROJET (+2.0)
-    launch_keywords = ['lancement', 'lancer', 'accélère', 'démarrage', 'inauguration', 'premier', 'première']
-    if any(kw in combined_text for kw in launch_keywords):
-        score += 2.0
-        matching_keywords.append("launch_bonus_+2.0")
+    for name, keywords in EVENT_BONUSES:
+        if any(kw in hook_keywords for kw in keywords):
+            score += weights[name]
+            matching_keywords.append(_bonus_label(name, weights))
     
     # ========================================
     # PÉNALITÉS
     # ========================================
-    generic_phrases = ['heureux de', 'ravi de', 'fier de', 'merci', 'bravo', 'félicitations']
-    if any(phrase in combined_text for phrase in generic_phrases) and score < 3:
-        score -= 1
+    if any(phrase in hook_keywords for phrase in GENERIC_PHRASES) and score < HOOK_GENERIC_PENALTY_BELOW:
+        score += weights['generic_penalty']
         matching_keywords.append("generic_penalty")
     
     # ========================================
     # CALCUL FINAL
     # ========================================
-    final_score = max(1, min(10, score))
-    
-    log_event('hook_scored', {
-        'hook_index': hook.get('index'),
-        'score': final_score,
-        'matching_keywords': matching_keywords,
-        'hook_preview': hook_text[:100]
+    return max(1, min(10, score)), matching_keywords
+
+
+# ========================================
+# SCORING DES HOOKS EN LOT (CAMPAGNE)
+# ========================================
+
+def _keyword_matrix(texts):
+    """Matrice booléenne textes × mots-clés (une passe de l'automate par texte)"""
+    matrix = np.zeros((len(texts), len(_KEYWORD_COLUMNS)), dtype=bool)
+    for row, text in enumerate(texts):
+        columns = [_KEYWORD_COLUMNS[keyword] for keyword in HOOK_KEYWORD_MATCHER.find(text)]
+        matrix[row, columns] = True
+    return matrix
+
+
+def hook_feature_matrix(campaign):
+    """
+    Critères de scoring de tous les hooks d'une campagne
+
+    Args:
+        campaign (list): [(clé prospect, hooks_list, job_posting_data)]
+                         hooks_list au format extract_hooks_from_linkedin
+
+    Returns:
+        dict: {
+            'features': matrice hooks × HOOK_FEATURES (0/1),
+            'generic': hooks avec formule générique (bool),
+            'has_job': hooks dont le prospect a une fiche (bool),
+            'owner': indice du prospect de chaque hook,
+            'common': hooks × mots-clés communs fiche / hook,
+            'hooks': hooks à plat (même ordre que les lignes)
+        }
+    """
+    # Une fiche partagée par plusieurs prospects n'est analysée qu'une fois
+    job_rows, job_texts, prospect_job = {}, [], []
+    for _, _, job_posting_data in campaign:
+        if not job_posting_data:
+            prospect_job.append(-1)
+            continue
+        text = f"{job_posting_data.get('title', '')} {job_posting_data.get('description', '')}"
+        if text not in job_rows:
+            job_rows[text] = len(job_texts)
+            job_texts.append(text)
+        prospect_job.append(job_rows[text])
+
+    hooks, owner = [], []
+    for prospect_index, (_, hooks_list, _) in enumerate(campaign):
+        hooks.extend(hooks_list or [])
+        owner.extend([prospect_index] * len(hooks_list or []))
+    owner = np.array(owner, dtype=np.intp)
+
+    hook_matrix = _keyword_matrix([f"{hook['text']} {hook.get('title', '')}" for hook in hooks])
+    # Ligne vide en dernière position pour les prospects sans fiche
+    job_matrix = np.vstack([_keyword_matrix(job_texts), np.zeros((1, len(_KEYWORD_COLUMNS)), dtype=bool)])
+    hook_job = np.array(prospect_job, dtype=np.intp)[owner] if len(owner) else owner
+    common = hook_matrix & job_matrix[hook_job]
+
+    columns = [
+        common[:, _TECHNICAL_COLUMNS].any(axis=1),
+        common[:, _CONTEXT_COLUMNS].sum(axis=1) >= HOOK_CONTEXT_MIN_MATCHES,
+        common[:, _SECTOR_COLUMNS].any(axis=1)
+    ] + [hook_matrix[:, event_columns].any(axis=1) for _, event_columns in _EVENT_COLUMNS]
+
+    return {
+        'features': np.column_stack(columns).astype(np.float64) if len(hooks) else np.zeros((0, len(HOOK_FEATURES))),
+        'generic': hook_matrix[:, _GENERIC_COLUMNS].any(axis=1),
+        'has_job': hook_job >= 0,
+        'owner': owner,
+        'common': common,
+        'hooks': hooks
+    }
+
+
+def _hook_labels(matrix, row, weights):
+    """Critères retenus pour un hook (même format que score_hook_relevance)"""
+    features = matrix['features'][row]
+    labels = []
+    if features[0]:
+        technical = matrix['common'][row, _TECHNICAL_COLUMNS]
+        labels.append(TECHNICAL_KEYWORDS[int(np.argmax(technical))])
+    if features[1]:
+        labels.append(f"{int(matrix['common'][row, _CONTEXT_COLUMNS].sum())} context keywords")
+    if features[2]:
+        labels.append("sector match")
+    for offset, (name, _) in enumerate(EVENT_BONUSES, 3):
+        if features[offset]:
+            labels.append(_bonus_label(name, weights))
+    return labels
+
+
+def score_hooks_batch(campaign, top_k=1, weights=None):
+    """
+    Score tous les hooks d'une campagne en opérations matricielles
+    (mêmes règles que score_hook_relevance) et garde les top_k par prospect
+
+    Args:
+        campaign (list): [(clé prospect, hooks_list, job_posting_data)]
+        top_k (int): Hooks retenus par prospect (None = tous, triés)
+        weights (dict): Poids (défaut : HOOK_SCORE_WEIGHTS)
+
+    Returns:
+        dict: {clé prospect: [(hook, score, critères)] par score décroissant}
+    """
+    start = time.perf_counter()
+    weights = weights or HOOK_SCORE_WEIGHTS
+    matrix = hook_feature_matrix(campaign)
+
+    scores = matrix['features'] @ np.array([weights[name] for name in HOOK_FEATURES], dtype=np.float64)
+    penalized = matrix['generic'] & (scores < HOOK_GENERIC_PENALTY_BELOW)
+    scores = scores + penalized * weights['generic_penalty']
+    # Sans fiche : score neutre, comme score_hook_relevance
+    scores = np.clip(np.where(matrix['has_job'], scores, 2), 1, 10)
+
+    results = {}
+    bounds = np.searchsorted(matrix['owner'], np.arange(len(campaign) + 1))
+    for prospect_index, (prospect_key, _, _) in enumerate(campaign):
+        first, last = bounds[prospect_index], bounds[prospect_index + 1]
+        # Tri stable : à score égal, l'ordre des hooks est conservé
+        order = first + np.argsort(-scores[first:last], kind='stable')[:top_k]
+        ranked = []
+        for row in order:
+            labels = _hook_labels(matrix, row, weights) if matrix['has_job'][row] else []
+            if penalized[row] and matrix['has_job'][row]:
+                labels.append("generic_penalty")
+            score = float(scores[row])
+            ranked.append((matrix['hooks'][row], int(score) if score.is_integer() else score, labels))
+        results[prospect_key] = ranked
+
+    log_event('hooks_scored_batch', {
+        'prospects': len(campaign),
+        'hooks': len(matrix['hooks']),
+        'mean_score': round(float(scores.mean()), 2) if len(scores) else None,
+        'hooks_score_3_plus': int((scores >= 3).sum()),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
     })
-    
-    return final_score, matching_keywords
+    return results
 
 
 def select_best_hook(hooks_list, job_posting_data):
@@ -456,28 +669,17 @@ def select_best_hook(hooks_list, job_posting_data):
         log_event('no_hooks_to_select', {})
         return None, 0, []
     
-    scored_hooks = []
-    
-    for hook in hooks_list:
-        score, keywords = score_hook_relevance(hook, job_posting_data)
-        scored_hooks.append({
-            'hook': hook,
-            'score': score,
-            'keywords': keywords
-        })
-    
-    scored_hooks.sort(key=lambda x: x['score'], reverse=True)
-    
-    best = scored_hooks[0]
+    scored_hooks = score_hooks_batch([(0, hooks_list, job_posting_data)], top_k=None)[0]
+    best_hook, best_score, best_keywords = scored_hooks[0]
     
     log_event('best_hook_selected', {
-        'score': best['score'],
-        'keywords': best['keywords'],
+        'score': best_score,
+        'keywords': best_keywords,
         'total_hooks_analyzed': len(scored_hooks),
-        'all_scores': [h['score'] for h in scored_hooks]
+        'all_scores': [score for _, score, _ in scored_hooks]
     })
     
-    return best['hook'], best['score'], best['keywords']
+    return best_hook, best_score, best_keywords
 
 
 # ========================================
@@ -488,115 +690,13 @@ def detect_job_category(prospect_data, job_posting_data):
     """
     Détecte automatiquement la catégorie métier du prospect
     VERSION V27.4 : PRIORITÉ TITRE > DESCRIPTION + exclusions contextuelles
+    Règles : prospection_utils.job_categories.JOB_CATEGORY_RULES
     """
+    job_title = job_posting_data.get('title', '') if job_posting_data else ''
+    job_desc = job_posting_data.get('description', '') if job_posting_data else ''
+    headline = f"{prospect_data.get('headline', '')} {prospect_data.get('title', '')}"
     
-    # ÉTAPE 1 : Extraire TITRE seul (prioritaire)
-    job_title = ""
-    if job_posting_data:
-        job_title = str(job_posting_data.get('title', '')).lower()
-    
-    # ÉTAPE 2 : Extraire description (secondaire)
-    job_desc = ""
-    if job_posting_data:
-        job_desc = str(job_posting_data.get('description', '')).lower()
-    
-    # ÉTAPE 3 : Headline prospect (tertiaire)
-    headline = f"{prospect_data.get('headline', '')} {prospect_data.get('title', '')}".lower()
-    
-    # ════════════════════════════════════════════════════════════════
-    # DÉTECTION SUR TITRE UNIQUEMENT (PRIORITÉ ABSOLUE)
-    # ════════════════════════════════════════════════════════════════
-    
-    # Comptable / Comptabilité
-    if any(word in job_title for word in ['comptable', 'accountant', 'accounting']):
-        # EXCLUSION : "comptable" dans titre mais "consolidation" aussi → consolidation
-        if 'consolidation' in job_title or 'consolidateur' in job_title:
-            return 'consolidation'
-        return 'comptabilite'
-    
-    # Audit
-    if any(word in job_title for word in ['audit', 'auditeur', 'auditor']):
-        return 'audit'
-    
-    # Consolidation
-    if any(word in job_title for word in ['consolidation', 'consolidateur', 'consolidator']):
-        return 'consolidation'
-    
-    # Contrôle de gestion
-    if any(word in job_title for word in ['contrôle de gestion', 'controle de gestion', 'contrôleur de gestion', 'controller', 'business controller']):
-        return 'controle_gestion'
-    
-    # FP&A
-    if any(word in job_title for word in ['fp&a', 'fpa', 'financial planning', 'fpna']):
-        return 'fpna'
-    
-    # DAF / CFO
-    if any(word in job_title for word in ['daf', 'directeur administratif', 'cfo', 'chief financial', 'directeur financier']):
-        return 'daf'
-    
-    # RAF
-    if any(word in job_title for word in ['raf', 'responsable administratif']):
-        return 'raf'
-    
-    # Data / IA
-    if any(word in job_title for word in ['data officer', 'ia officer', 'ai officer', 'data & ia', 'chief data', 'cdo']):
-        return 'data_ia'
-    
-    # EPM
-    if any(word in job_title for word in ['epm', 'anaplan', 'hyperion', 'tagetik']):
-        return 'epm'
-    
-    # BI / Data
-    if any(word in job_title for word in ['bi ', 'business intelligence', ' data ', 'analytics']):
-        return 'bi_data'
-    
-    # ════════════════════════════════════════════════════════════════
-    # SI TITRE NON CONCLUANT → DESCRIPTION (avec exclusions)
-    # ════════════════════════════════════════════════════════════════
-    
-    # Nettoyer la description des mentions contextuelles
-    desc_cleaned = job_desc
-    
-    # Exclure "ou audit", "contrôles de niveau 2", etc.
-    contextual_exclusions = [
-        r'\bou audit\b',
-        r'\baudit externe\b',  # Souvent mentionné comme "en lien avec audit externe"
-        r'\bcontrôles? de niveau \d\b',
-        r'\brelation avec.*audit\b',
-        r'\ben collaboration avec.*audit\b',
-        r'\baudit interne et externe\b'  # Contexte, pas le poste
-    ]
-    
-    for pattern in contextual_exclusions:
-        desc_cleaned = re.sub(pattern, '', desc_cleaned, flags=re.IGNORECASE)
-    
-    # Maintenant chercher dans description nettoyée
-    if any(word in desc_cleaned for word in ['comptable', 'comptabilité', 'accounting']) and 'audit' not in job_title:
-        return 'comptabilite'
-    
-    if any(word in desc_cleaned for word in ['auditeur', 'audit interne', 'internal audit']):
-        return 'audit'
-    
-    if any(word in desc_cleaned for word in ['consolidation', 'ifrs 10', 'normes ifrs']):
-        return 'consolidation'
-    
-    if any(word in desc_cleaned for word in ['contrôle de gestion', 'business controller']):
-        return 'controle_gestion'
-    
-    # ════════════════════════════════════════════════════════════════
-    # FALLBACK : HEADLINE PROSPECT
-    # ════════════════════════════════════════════════════════════════
-    
-    if any(word in headline for word in ['daf', 'cfo', 'directeur financier']):
-        return 'daf'
-    elif any(word in headline for word in ['audit']):
-        return 'audit'
-    elif any(word in headline for word in ['comptab']):
-        return 'comptabilite'
-    elif any(word in headline for word in ['contrôl']):
-        return 'controle_gestion'
-    
-    return 'general'
+    return detect_category(job_title, job_desc, headline)
 
 
 def get_relevant_pain_point(job_category, job_posting_data):
@@ -625,8 +725,6 @@ def generate_icebreaker(prospect_data, hooks_data, job_posting_data):
     })
     
     # NOUVEAU V27.4 : Filtrer hooks <3 mois
-    from message_sequence_generator import filter_recent_posts
-    
     if hooks_data != "NOT_FOUND" and isinstance(hooks_data, list):
         filtered_posts = filter_recent_posts(hooks_data, max_age_months=3, max_posts=5)
         if filtered_posts:
@@ -645,18 +743,13 @@ def generate_icebreaker(prospect_data, hooks_data, job_posting_data):
     hooks_list = extract_hooks_from_linkedin(hooks_data)
     best_hook, hook_score, hook_keywords = select_best_hook(hooks_list, job_posting_data)
     
-    if best_hook and hook_score >= 3:
-        message_type = "CAS A (Hook LinkedIn + Annonce)"
-        hook_text = best_hook['text']
-        hook_title = best_hook.get('title', '')
-    elif best_hook and hook_score >= 2:
-        message_type = "CAS B (Hook faible + Focus annonce)"
-        hook_text = best_hook['text']
-        hook_title = best_hook.get('title', '')
-    else:
-        message_type = "CAS C (Annonce seule)"
+    message_type = choose_message_type(best_hook, hook_score)
+    if message_type == "CAS C (Annonce seule)":
         hook_text = None
         hook_title = None
+    else:
+        hook_text = best_hook['text']
+        hook_title = best_hook.get('title', '')
     
     log_event('icebreaker_strategy', {
         'message_type': message_type,
@@ -667,22 +760,32 @@ def generate_icebreaker(prospect_data, hooks_data, job_posting_data):
     })
     
     if message_type == "CAS A (Hook LinkedIn + Annonce)":
-        prompt = build_prompt_case_a(first_name, context_name, hook_text, hook_title, 
-                                     job_posting_data, pain_point)
+        system_prompt, prompt = build_prompt_case_a(first_name, context_name, hook_text, hook_title, 
+                                                    job_posting_data, pain_point)
     elif message_type == "CAS B (Hook faible + Focus annonce)":
-        prompt = build_prompt_case_b(first_name, context_name, hook_text, 
-                                     job_posting_data, pain_point)
+        system_prompt, prompt = build_prompt_case_b(first_name, context_name, hook_text, 
+                                                    job_posting_data, pain_point)
     else:
-        prompt = build_prompt_case_c(first_name, context_name, job_posting_data, pain_point)
+        system_prompt, prompt = build_prompt_case_c(first_name, context_name, job_posting_data, pain_point)
     
     try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
+        start = time.perf_counter()
+        message = create_message(
+            client,
+            model=route_model(
+                'icebreaker',
+                posts_count=len(hooks_list),
+                hook_score=hook_score,
+                has_job_description=bool(job_posting_data),
+                prospect=prospect_data.get('_id', 'unknown')
+            ),
             max_tokens=800,
+            system=cached_system(system_prompt),
             messages=[{"role": "user", "content": prompt}]
         )
         
-        tracker.track(message.usage, 'generate_icebreaker')
+        tracker.track(message.usage, 'generate_icebreaker', latency=time.perf_counter() - start,
+                      model=message.model)
         result = message.content[0].text.strip()
         
         # Nettoyage des signatures parasites
@@ -705,34 +808,234 @@ def generate_icebreaker(prospect_data, hooks_data, job_posting_data):
         raise
 
 
+def choose_message_type(best_hook, hook_score):
+    """Stratégie du message selon le score du meilleur hook (select_best_hook)"""
+    if best_hook and hook_score >= 3:
+        return "CAS A (Hook LinkedIn + Annonce)"
+    if best_hook and hook_score >= 2:
+        return "CAS B (Hook faible + Focus annonce)"
+    return "CAS C (Annonce seule)"
+
+
 # ========================================
-# CONSTRUCTION DES PROMPTS
+# HOOKS + ICEBREAKER EN UN SEUL APPEL
 # ========================================
 
-def build_prompt_case_a(first_name, context_name, hook_text, hook_title, 
-                        job_posting_data, pain_point):
-    """Prompt pour CAS A : Hook pertinent + Annonce"""
-    
+# Ajouté après les consignes d'extraction et des 3 cas (préfixe caché commun)
+COMBINED_SYSTEM_INSTRUCTIONS = """═══════════════════════════════════════════════════════════════════
+MODE COMBINÉ : EXTRACTION + CHOIX DU HOOK + ICEBREAKER EN UNE RÉPONSE
+═══════════════════════════════════════════════════════════════════
+Le message utilisateur contient le contexte (prénom, poste), les posts LinkedIn
+(filtrés <3 mois), le profil, la fiche de poste et le pain point identifié.
+
+1. Extrais les 3-5 meilleurs hooks (règles d'extraction ci-dessus).
+2. Choisis le hook le plus pertinent POUR LA FICHE, par ordre de priorité :
+   - compétence technique de la fiche présente dans le hook (outil, norme, métier)
+   - contexte professionnel commun (transformation, projet, reporting, clôture...)
+   - podcast / interview > article, prix > certification, conférence, lancement
+   - les posts de simples félicitations ou remerciements sont peu pertinents
+3. Détermine le cas :
+   - "A" : hook très pertinent pour la fiche (structure CAS A)
+   - "B" : hook disponible mais peu aligné avec la fiche (structure CAS B)
+   - "C" : aucun hook exploitable (structure CAS C, chosen_hook = null)
+4. Rédige l'icebreaker selon la structure du cas choisi.
+
+FORMAT DE RÉPONSE (remplace les formats ci-dessus) - JSON uniquement, sans texte avant/après :
+{
+  "hooks": [{"text": "...", "type": "post", "date": "2025-01"}],
+  "chosen_hook": 0,
+  "case": "A",
+  "message": "Bonjour ...,\n\n...\n\nBien à vous,"
+}
+chosen_hook est l'index (à partir de 0) du hook choisi dans "hooks", ou null."""
+
+COMBINED_CASES = {
+    'A': "CAS A (Hook LinkedIn + Annonce)",
+    'B': "CAS B (Hook faible + Focus annonce)",
+    'C': "CAS C (Annonce seule)"
+}
+
+
+def build_prompt_combined(first_name, context_name, posts_data, profile_data, job_posting_data, pain_point):
+    """
+    Prompt du mode combiné (hooks + choix + icebreaker)
+
+    Returns:
+        tuple: (blocs système statiques, message utilisateur)
+    """
     job_title = job_posting_data.get('title', 'N/A') if job_posting_data else 'N/A'
     job_desc = job_posting_data.get('description', 'N/A') if job_posting_data else 'N/A'
-    
-    return f"""Tu es expert en prospection B2B pour cabinet de recrutement Finance.
 
-CONTEXTE :
-Prénom : {first_name}
-Poste recherché : {context_name}
+    competences_str = ""
+    if pain_point.get('competences_rares'):
+        competences_str = f"\nCOMPÉTENCES RARES : {', '.join(pain_point['competences_rares'])}"
+
+    system_blocks = (
+        EXTRACT_HOOKS_SYSTEM_PROMPT,
+        CASE_A_SYSTEM_PROMPT,
+        CASE_B_SYSTEM_PROMPT,
+        CASE_C_SYSTEM_PROMPT,
+        COMBINED_SYSTEM_INSTRUCTIONS
+    )
+    return system_blocks, f"""CONTEXTE :
+Prénom ([PRÉNOM]) : {first_name}
+Poste recherché ([POSTE]) : {context_name}
 
-HOOK LINKEDIN SÉLECTIONNÉ (Score élevé - Très pertinent) :
-Titre : {hook_title if hook_title else 'N/A'}
-Contenu : {hook_text[:500]}
+POSTS LINKEDIN (filtrés <3 mois) :
+{format_posts_for_extraction(posts_data)}
 
-FICHE DE POSTE (pour identifier les compétences RARES) :
+PROFIL LINKEDIN :
+{format_profile_for_extraction(profile_data)}
+
+FICHE DE POSTE :
 Titre : {job_title}
-Description (extraits clés) : {str(job_desc)[:600]}
+Description : {fit_job_description(str(job_desc), ICEBREAKER_JOB_DESCRIPTION_TOKENS)}
 
 PAIN POINT IDENTIFIÉ :
 Court : {pain_point['short']}
-Contexte : {pain_point['context']}
+Contexte : {pain_point['context']}{competences_str}
+
+Génère la réponse JSON maintenant :"""
+
+
+def parse_combined_response(result):
+    """
+    Lit la réponse JSON du mode combiné
+
+    Returns:
+        dict: {'hooks', 'chosen_hook', 'case', 'message'} ou None si illisible
+    """
+    data, _ = extract_json(result, expect=dict)
+
+    if not isinstance(data, dict) or not isinstance(data.get('hooks'), list):
+        return None
+    if not isinstance(data.get('message'), str) or data.get('case') not in COMBINED_CASES:
+        return None
+    return data
+
+
+def combined_choice_agrees(data, hooks_list, job_posting_data):
+    """
+    Compare le choix de Claude au classement local (score_hook_relevance)
+
+    Returns:
+        tuple: (accord bool, type de message local, meilleur hook local, score local)
+    """
+    best_hook, hook_score, _ = select_best_hook(hooks_list, job_posting_data)
+    local_type = choose_message_type(best_hook, hook_score)
+
+    if COMBINED_CASES[data['case']] != local_type:
+        return False, local_type, best_hook, hook_score
+    if local_type == "CAS C (Annonce seule)":
+        return True, local_type, best_hook, hook_score
+
+    # Même cas : le hook choisi doit être à égalité avec le meilleur score local
+    chosen = data.get('chosen_hook')
+    if not isinstance(chosen, int) or not 0 <= chosen < len(data['hooks']):
+        return False, local_type, best_hook, hook_score
+    chosen_text = str(data['hooks'][chosen].get('text', '')).strip() if isinstance(data['hooks'][chosen], dict) else ''
+    chosen_hooks = [hook for hook in hooks_list if hook['text'] == chosen_text]
+    if not chosen_hooks:
+        return False, local_type, best_hook, hook_score
+    chosen_score, _ = score_hook_relevance(chosen_hooks[0], job_posting_data)
+    return chosen_score >= hook_score, local_type, best_hook, hook_score
+
+
+def generate_icebreaker_combined(prospect_data, profile_data, posts_data, job_posting_data,
+                                 full_name, company_name):
+    """
+    Extraction des hooks, choix du hook et icebreaker en UN appel Claude
+    (au lieu de extract_hooks_with_claude puis generate_icebreaker)
+
+    Le choix de Claude est vérifié par le classement local (score_hook_relevance) :
+    en cas de désaccord, l'icebreaker est régénéré par generate_icebreaker à partir
+    des hooks déjà extraits ; si la réponse est illisible, repli sur les 2 appels.
+
+    Returns:
+        tuple: (icebreaker str, hooks list)
+    """
+    log_event('generate_icebreaker_combined_start', {'full_name': full_name})
+
+    # Filtrer les posts <3 mois AVANT envoi à Claude (comme extract_hooks_with_claude)
+    recent_posts = []
+    if posts_data and isinstance(posts_data, list):
+        recent_posts = filter_recent_posts(posts_data, max_age_months=3, max_posts=5)
+    if not recent_posts:
+        # Pas de matière pour un hook : CAS C, un seul appel de toute façon
+        log_event('no_recent_posts', {'full_name': full_name})
+        return generate_icebreaker(prospect_data, "NOT_FOUND", job_posting_data), []
+
+    first_name = get_safe_firstname(prospect_data)
+    context_name, is_hiring = get_smart_context(job_posting_data, prospect_data)
+    job_category = detect_job_category(prospect_data, job_posting_data)
+    pain_point = get_relevant_pain_point(job_category, job_posting_data)
+    system_blocks, prompt = build_prompt_combined(
+        first_name, context_name, recent_posts, profile_data, job_posting_data, pain_point
+    )
+
+    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    try:
+        start = time.perf_counter()
+        message = create_message(
+            client,
+            model=route_model(
+                'hooks_and_icebreaker',
+                posts_count=len(recent_posts),
+                has_job_description=bool(job_posting_data),
+                prospect=full_name
+            ),
+            max_tokens=1500,
+            system=cached_system(*system_blocks),
+            messages=[{"role": "user", "content": prompt}]
+        )
+        tracker.track(message.usage, 'generate_icebreaker_combined', latency=time.perf_counter() - start,
+                      model=message.model)
+        data = parse_combined_response(message.content[0].text.strip())
+    except anthropic.APIError as e:
+        log_error('claude_api_error', str(e), {'function': 'generate_icebreaker_combined'})
+        data = None
+
+    if data is None:
+        log_event('combined_fallback', {'reason': 'réponse illisible', 'full_name': full_name})
+        hooks = extract_hooks_with_claude(profile_data, posts_data, [], None, [], full_name, company_name)
+        return generate_icebreaker(prospect_data, hooks or "NOT_FOUND", job_posting_data), hooks
+
+    hooks = [hook for hook in data['hooks'] if isinstance(hook, dict)]
+    hooks_list = extract_hooks_from_linkedin(hooks)
+    agrees, local_type, best_hook, hook_score = combined_choice_agrees(data, hooks_list, job_posting_data)
+
+    log_event('combined_choice', {
+        'claude_case': data['case'],
+        'local_type': local_type,
+        'local_score': hook_score,
+        'agrees': agrees
+    })
+
+    if not agrees:
+        # Les hooks extraits sont réutilisés : seul l'icebreaker est régénéré
+        return generate_icebreaker(prospect_data, hooks or "NOT_FOUND", job_posting_data), hooks
+
+    result = clean_signature(data['message'].strip())
+    log_event('icebreaker_generated', {
+        'length': len(result),
+        'message_type': local_type,
+        'hook_score': hook_score,
+        'mode': 'combined'
+    })
+    return result, hooks
+
+
+# ========================================
+# CONSTRUCTION DES PROMPTS
+# ========================================
+
+# Consignes statiques de chaque cas : préfixe système mis en cache (prompt
+# caching). [PRÉNOM] et [POSTE] sont renseignés dans le message utilisateur.
+
+CASE_A_SYSTEM_PROMPT = """Tu es expert en prospection B2B pour cabinet de recrutement Finance.
+Le message utilisateur contient le contexte (prénom, poste recherché), le hook LinkedIn
+sélectionné (score élevé - très pertinent), la fiche de poste et le pain point identifié.
+Remplace [PRÉNOM] et [POSTE] par les valeurs du contexte.
 
 ═══════════════════════════════════════════════════════════════════
 MISSION : Rédiger un icebreaker de 70-90 mots
@@ -740,7 +1043,7 @@ MISSION : Rédiger un icebreaker de 70-90 mots
 
 STRUCTURE OBLIGATOIRE :
 
-1. "Bonjour {first_name},"
+1. "Bonjour [PRÉNOM],"
 
 2. SAUT DE LIGNE (ligne vide)
 
@@ -751,7 +1054,7 @@ STRUCTURE OBLIGATOIRE :
    → Paraphrase intelligemment en conservant les détails clés
 
 4. Transition vers le pain point SPÉCIFIQUE (25-35 mots)
-   → "Cela résonne avec votre recherche de {context_name}."
+   → "Cela résonne avec votre recherche de [POSTE]."
    → Mentionne des compétences EXACTES de la fiche (ex: réassurance, consolidation IFRS, etc.)
    → JAMAIS de généralités ("rigueur", "agilité", "dynamisme")
 
@@ -771,48 +1074,22 @@ INTERDICTIONS ABSOLUES
 ❌ Jamais mentionner le cabinet ou "nos services"
 ❌ Jamais de superlatifs ou ton commercial
 ❌ Jamais modifier la question finale (elle est TOUJOURS identique)
-❌ Jamais ajouter de signature au-delà de "Bien à vous,"
-
-Génère l'icebreaker maintenant :"""
-
-
-def build_prompt_case_b(first_name, context_name, hook_text, job_posting_data, pain_point):
-    """Prompt pour CAS B : Hook faible + Focus annonce"""
-    
-    job_title = job_posting_data.get('title', 'N/A') if job_posting_data else 'N/A'
-    job_desc = job_posting_data.get('description', 'N/A') if job_posting_data else 'N/A'
-    
-    # Extraire les compétences rares si disponibles
-    competences_str = ""
-    if pain_point.get('competences_rares'):
-        competences_str = f"\nCOMPÉTENCES RARES EXTRAITES : {', '.join(pain_point['competences_rares'])}"
-    
-    return f"""Tu es expert en prospection B2B pour cabinet de recrutement Finance.
+❌ Jamais ajouter de signature au-delà de "Bien à vous,\""""
 
-CONTEXTE :
-Prénom : {first_name}
-Poste recherché : {context_name}
-
-HOOK LINKEDIN DISPONIBLE (Score faible - Peu aligné) :
-{hook_text[:300]}
-
-FICHE DE POSTE (élément principal) :
-Titre : {job_title}
-Description : {str(job_desc)[:600]}
-
-PAIN POINT IDENTIFIÉ :
-Court : {pain_point['short']}
-Contexte : {pain_point['context']}{competences_str}
+CASE_B_SYSTEM_PROMPT = """Tu es expert en prospection B2B pour cabinet de recrutement Finance.
+Le message utilisateur contient le contexte (prénom, poste recherché), un hook LinkedIn
+(score faible - peu aligné), la fiche de poste (élément principal) et le pain point identifié.
+Remplace [PRÉNOM] et [POSTE] par les valeurs du contexte.
 
 ═══════════════════════════════════════════════════════════════════
 STRATÉGIE : Le hook est peu pertinent, donc structure ainsi
 ═══════════════════════════════════════════════════════════════════
 
-1. "Bonjour {first_name},"
+1. "Bonjour [PRÉNOM],"
 2. SAUT DE LIGNE
 3. Phrase d'introduction (UTILISE UNE DE CES FORMULATIONS EXACTES) :
-   - "Je vous contacte concernant votre recherche de {context_name}."
-   - "J'ai consulté votre annonce pour le poste de {context_name}."
+   - "Je vous contacte concernant votre recherche de [POSTE]."
+   - "J'ai consulté votre annonce pour le poste de [POSTE]."
 4. Référence BRÈVE au hook (10-15 mots max)
 5. Pain point SPÉCIFIQUE avec vocabulaire EXACT de la fiche (25-30 mots)
 6. Question finale OBLIGATOIRE : "Quels sont les principaux écarts que vous observez entre vos attentes et les profils rencontrés ?"
@@ -827,46 +1104,23 @@ INTERDICTIONS ABSOLUES
 ❌ JAMAIS utiliser de termes génériques ("rigueur", "agilité", "dynamique", "croissance")
 ❌ JAMAIS inventer des compétences non mentionnées dans la fiche
 ❌ Jamais modifier la question finale
-❌ Jamais ajouter de signature au-delà de "Bien à vous,"
+❌ Jamais ajouter de signature au-delà de "Bien à vous,\""""
 
-Génère l'icebreaker maintenant :"""
-
-
-def build_prompt_case_c(first_name, context_name, job_posting_data, pain_point):
-    """Prompt pour CAS C : Annonce seule (pas de hook)"""
-    
-    job_title = job_posting_data.get('title', 'N/A') if job_posting_data else 'N/A'
-    job_desc = job_posting_data.get('description', 'N/A') if job_posting_data else 'N/A'
-    
-    # Extraire les compétences rares si disponibles
-    competences_str = ""
-    if pain_point.get('competences_rares'):
-        competences_str = f"\n\nCOMPÉTENCES RARES À MENTIONNER : {', '.join(pain_point['competences_rares'])}"
-    
-    return f"""Tu es expert en prospection B2B pour cabinet de recrutement Finance.
-
-CONTEXTE :
-Prénom : {first_name}
-Poste recherché : {context_name}
-
-FICHE DE POSTE :
-Titre : {job_title}
-Description : {str(job_desc)[:600]}
-
-PAIN POINT IDENTIFIÉ :
-Court : {pain_point['short']}
-Contexte : {pain_point['context']}{competences_str}
+CASE_C_SYSTEM_PROMPT = """Tu es expert en prospection B2B pour cabinet de recrutement Finance.
+Le message utilisateur contient le contexte (prénom, poste recherché), la fiche de poste
+et le pain point identifié.
+Remplace [PRÉNOM] et [POSTE] par les valeurs du contexte.
 
 ═══════════════════════════════════════════════════════════════════
 STRATÉGIE : Pas de hook LinkedIn disponible
 ═══════════════════════════════════════════════════════════════════
 
-1. "Bonjour {first_name},"
+1. "Bonjour [PRÉNOM],"
 2. SAUT DE LIGNE
 3. Phrase d'introduction (UTILISE UNE DE CES FORMULATIONS EXACTES) :
-   - "Je vous contacte concernant votre recherche de {context_name}."
-   - "Je me permets de vous écrire au sujet de votre poste de {context_name}."
-   - "J'ai consulté votre annonce pour le poste de {context_name}."
+   - "Je vous contacte concernant votre recherche de [POSTE]."
+   - "Je me permets de vous écrire au sujet de votre poste de [POSTE]."
+   - "J'ai consulté votre annonce pour le poste de [POSTE]."
 4. Pain point SPÉCIFIQUE extrait de la fiche (35-40 mots)
    → Mentionne les COMPÉTENCES RARES demandées dans la fiche
    → Utilise le VOCABULAIRE EXACT de la fiche (ex: réassurance, coassurance, provisions)
@@ -883,7 +1137,101 @@ INTERDICTIONS ABSOLUES
 ❌ JAMAIS inventer des compétences non mentionnées dans la fiche
 ❌ JAMAIS utiliser des pain points génériques ("rigueur", "agilité", "dynamique")
 ❌ Jamais modifier la question finale
-❌ Jamais ajouter de signature au-delà de "Bien à vous,"
+❌ Jamais ajouter de signature au-delà de "Bien à vous,\""""
+
+
+def build_prompt_case_a(first_name, context_name, hook_text, hook_title, 
+                        job_posting_data, pain_point):
+    """
+    Prompt pour CAS A : Hook pertinent + Annonce
+    
+    Returns:
+        tuple: (prompt système statique, message utilisateur)
+    """
+    
+    job_title = job_posting_data.get('title', 'N/A') if job_posting_data else 'N/A'
+    job_desc = job_posting_data.get('description', 'N/A') if job_posting_data else 'N/A'
+    
+    return CASE_A_SYSTEM_PROMPT, f"""CONTEXTE :
+Prénom ([PRÉNOM]) : {first_name}
+Poste recherché ([POSTE]) : {context_name}
+
+HOOK LINKEDIN SÉLECTIONNÉ (Score élevé - Très pertinent) :
+Titre : {hook_title if hook_title else 'N/A'}
+Contenu : {hook_text[:500]}
+
+FICHE DE POSTE (pour identifier les compétences RARES) :
+Titre : {job_title}
+Description (extraits clés) : {fit_job_description(str(job_desc), ICEBREAKER_JOB_DESCRIPTION_TOKENS)}
+
+PAIN POINT IDENTIFIÉ :
+Court : {pain_point['short']}
+Contexte : {pain_point['context']}
+
+Génère l'icebreaker maintenant :"""
+
+
+def build_prompt_case_b(first_name, context_name, hook_text, job_posting_data, pain_point):
+    """
+    Prompt pour CAS B : Hook faible + Focus annonce
+    
+    Returns:
+        tuple: (prompt système statique, message utilisateur)
+    """
+    
+    job_title = job_posting_data.get('title', 'N/A') if job_posting_data else 'N/A'
+    job_desc = job_posting_data.get('description', 'N/A') if job_posting_data else 'N/A'
+    
+    # Extraire les compétences rares si disponibles
+    competences_str = ""
+    if pain_point.get('competences_rares'):
+        competences_str = f"\nCOMPÉTENCES RARES EXTRAITES : {', '.join(pain_point['competences_rares'])}"
+    
+    return CASE_B_SYSTEM_PROMPT, f"""CONTEXTE :
+Prénom ([PRÉNOM]) : {first_name}
+Poste recherché ([POSTE]) : {context_name}
+
+HOOK LINKEDIN DISPONIBLE (Score faible - Peu aligné) :
+{hook_text[:300]}
+
+FICHE DE POSTE (élément principal) :
+Titre : {job_title}
+Description : {fit_job_description(str(job_desc), ICEBREAKER_JOB_DESCRIPTION_TOKENS)}
+
+PAIN POINT IDENTIFIÉ :
+Court : {pain_point['short']}
+Contexte : {pain_point['context']}{competences_str}
+
+Génère l'icebreaker maintenant :"""
+
+
+def build_prompt_case_c(first_name, context_name, job_posting_data, pain_point):
+    """
+    Prompt pour CAS C : Annonce seule (pas de hook)
+    
+    Returns:
+        tuple: (prompt système statique, message utilisateur)
+    """
+    
+    job_title = job_posting_data.get('title', 'N/A') if job_posting_data else 'N/A'
+    job_desc = job_posting_data.get('description', 'N/A') if job_posting_data else 'N/A'
+    
+    # Extraire les compétences rares si disponibles
+    competences_str = ""
+    if pain_point.get('competences_rares'):
+        competences_str = f"\n\nCOMPÉTENCES RARES À MENTIONNER : {', '.join(pain_point['competences_rares'])}"
+    
+    return CASE_C_SYSTEM_PROMPT, f"""CONTEXTE :
+Prénom ([PRÉNOM]) : {first_name}
+Poste recherché ([POSTE]) : {context_name}
+
+FICHE DE POSTE :
+Titre : {job_title}
+Description : {fit_job_description(str(job_desc), ICEBREAKER_JOB_DESCRIPTION_TOKENS)}
+
+PAIN POINT IDENTIFIÉ :
+Court : {pain_point['short']}
+Contexte : {pain_point['context']}{competences_str}
 
 Génère l'icebreaker maintenant :"""
 
@@ -7,6 +7,8 @@ from .logger import logger, log_event, log_error
 from .cost_tracker import tracker, ClaudeUsageTracker
 from .validator import validate_sequence, validate_and_report, is_sequence_valid
 from .fallback_templates import generate_fallback_sequence, get_fallback_if_needed
+from .pipeline import limiter, ServiceLimiter, run_concurrent, fan_out
+from .http_client import http, HttpClient
 
 __all__ = [
     'logger',
@@ -18,7 +20,13 @@ __all__ = [
     'validate_and_report',
     'is_sequence_valid',
     'generate_fallback_sequence',
-    'get_fallback_if_needed'
+    'get_fallback_if_needed',
+    'limiter',
+    'ServiceLimiter',
+    'run_concurrent',
+    'fan_out',
+    'http',
+    'HttpClient'
 ]
 
 
@@ -0,0 +1,239 @@
+"""
+Scraping Apify par lots
+Un seul run d'acteur pour plusieurs URLs LinkedIn, résultats redistribués par profil
+Version: 1.0
+"""
+
+from urllib.parse import urlparse, unquote
+
+from prospection_utils.logger import log_event, log_error
+from prospection_utils.pipeline import limiter, run_concurrent
+from prospection_utils import scrape_cache
+
+POSTS_ACTOR = "supreme_coder/linkedin-post"
+PROFILE_ACTOR = "dev_fusion/Linkedin-Profile-Scraper"
+
+DEFAULT_CHUNK_SIZE = 25
+
+# Champs des items Apify qui peuvent contenir l'URL du profil d'origine
+SOURCE_URL_FIELDS = [
+    'inputUrl', 'input_url', 'sourceUrl', 'source_url',
+    'profileUrl', 'linkedinUrl', 'linkedin_url', 'authorProfileUrl', 'url'
+]
+
+
+def normalize_linkedin_url(url):
+    """
+    Normalise une URL LinkedIn pour comparaison / clé de cache
+
+    Ex: 'https://fr.linkedin.com/in/Jean-Dupont/?utm=x' -> 'linkedin.com/in/jean-dupont'
+
+    Args:
+        url (str): URL LinkedIn brute
+
+    Returns:
+        str: URL normalisée ('' si vide)
+    """
+    if not url:
+        return ''
+
+    url = unquote(str(url).strip()).lower()
+    if '://' not in url:
+        url = f"https://{url}"
+
+    parsed = urlparse(url)
+    host = parsed.netloc.split(':')[0]
+    if host.endswith('linkedin.com'):
+        host = 'linkedin.com'
+
+    path = parsed.path.rstrip('/')
+    return f"{host}{path}"
+
+
+def _item_source_keys(item):
+    """Retourne les URLs normalisées candidates d'un item Apify"""
+    keys = set()
+    for field in SOURCE_URL_FIELDS:
+        value = item.get(field)
+        if isinstance(value, str) and 'linkedin.com' in value.lower():
+            keys.add(normalize_linkedin_url(value))
+
+    author = item.get('author')
+    if isinstance(author, dict):
+        for field in ('profileUrl', 'url', 'linkedinUrl'):
+            value = author.get(field)
+            if isinstance(value, str):
+                keys.add(normalize_linkedin_url(value))
+
+    return keys
+
+
+def _chunks(items, size):
+    size = max(1, int(size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def run_actor_batch(apify_client, actor, urls, build_input, chunk_size=DEFAULT_CHUNK_SIZE,
+                    kind='posts', variant=None):
+    """
+    Lance l'acteur sur les URLs par paquets et redistribue les items par URL
+
+    Les URLs déjà en cache ne sont pas rescrapées. Les paquets tournent en
+    parallèle dans la limite du slot 'apify'. Une URL d'un paquet réussi sans
+    item associé reçoit une liste vide, sauf si des items du paquet n'ont pu
+    être rattachés à aucune URL (repost, slug différent de l'URL d'entrée) :
+    elle est alors absente du résultat, comme les URLs d'un paquet en échec
+    (à rescraper une par une, rien n'est mis en cache).
+
+    Args:
+        apify_client: Client Apify
+        actor (str): Nom de l'acteur
+        urls (list): URLs LinkedIn
+        build_input (callable): build_input(urls_du_paquet) -> run_input
+        chunk_size (int): Nombre d'URLs par run d'acteur
+        kind (str): 'posts' ou 'profile' (TTL du cache)
+        variant: Paramètre d'input qui différencie les résultats (clé de cache)
+
+    Returns:
+        dict: {url_normalisée: [items]}
+    """
+    results = {}
+    unique_urls = []
+    seen = set()
+    for url in urls:
+        key = normalize_linkedin_url(url)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        cached = scrape_cache.get_cached(kind, actor, key, variant)
+        if cached is not None:
+            results[key] = cached
+        else:
+            unique_urls.append(url)
+
+    if not unique_urls:
+        return results
+
+    chunks = _chunks(unique_urls, chunk_size)
+
+    log_event('apify_batch_start', {
+        'actor': actor,
+        'urls': len(unique_urls),
+        'cached': len(results),
+        'runs': len(chunks)
+    })
+
+    def run_chunk(index, chunk):
+        with limiter.slot('apify'):
+            run = apify_client.actor(actor).call(run_input=build_input(chunk))
+            items = list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
+
+        by_url = {normalize_linkedin_url(url): [] for url in chunk}
+        items = [item for item in items if isinstance(item, dict)]
+        if len(by_url) == 1:
+            # Une seule URL : tous les items sont les siens, rattachés ou non
+            by_url[next(iter(by_url))] = items
+            return by_url
+
+        unmatched = 0
+        for item in items:
+            matched = [key for key in _item_source_keys(item) if key in by_url]
+            if matched:
+                by_url[matched[0]].append(item)
+            else:
+                unmatched += 1
+
+        if unmatched:
+            # Les URLs restées vides ont peut-être ces items : pas de [] en cache
+            missing = [key for key, url_items in by_url.items() if not url_items]
+            for key in missing:
+                del by_url[key]
+            log_event('apify_batch_unmatched_items', {'actor': actor, 'count': unmatched, 'urls_retried': len(missing)})
+
+        return by_url
+
+    for chunk, by_url in zip(chunks, run_concurrent(chunks, run_chunk, max_workers=len(chunks))):
+        if by_url is None:
+            log_error('apify_batch_chunk_error', 'Run Apify en échec', {'actor': actor, 'urls': len(chunk)})
+            continue
+        for key, items in by_url.items():
+            scrape_cache.set_cached(actor, key, items, variant)
+        results.update(by_url)
+
+    log_event('apify_batch_done', {
+        'actor': actor,
+        'urls_ok': len(results),
+        'items': sum(len(v) for v in results.values())
+    })
+
+    return results
+
+
+def scrape_posts_batch(apify_client, urls, limit_per_source=10, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Scrape les posts de plusieurs profils LinkedIn en un minimum de runs
+
+    Returns:
+        dict: {url_normalisée: [posts bruts]}
+    """
+    def build_input(chunk):
+        return {
+            "deepScrape": True,
+            "limitPerSource": limit_per_source,
+            "rawData": False,
+            "urls": chunk
+        }
+
+    return run_actor_batch(apify_client, POSTS_ACTOR, urls, build_input, chunk_size,
+                           kind='posts', variant=limit_per_source)
+
+
+def scrape_profiles_batch(apify_client, urls, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Scrape plusieurs profils LinkedIn en un minimum de runs
+
+    Returns:
+        dict: {url_normalisée: profil (dict, {} si non trouvé)}
+    """
+    def build_input(chunk):
+        return {"profileUrls": chunk}
+
+    items_by_url = run_actor_batch(apify_client, PROFILE_ACTOR, urls, build_input, chunk_size,
+                                   kind='profile')
+    return {key: (items[0] if items else {}) for key, items in items_by_url.items()}
+
+
+def scrape_posts_cached(apify_client, url, limit_per_source=10):
+    """
+    Scrape les posts d'un seul profil, via le cache disque
+
+    Returns:
+        list: Posts bruts (non filtrés)
+    """
+    def fetch():
+        with limiter.slot('apify'):
+            run = apify_client.actor(POSTS_ACTOR).call(run_input={
+                "deepScrape": True,
+                "limitPerSource": limit_per_source,
+                "rawData": False,
+                "urls": [url]
+            })
+            return list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
+
+    return scrape_cache.cached_scrape('posts', POSTS_ACTOR, normalize_linkedin_url(url), fetch,
+                                      variant=limit_per_source)
+
+
+def scrape_profile_cached(apify_client, url):
+    """
+    Scrape un seul profil, via le cache disque
+
+    Returns:
+        list: Items bruts du dataset (le profil est le premier)
+    """
+    def fetch():
+        with limiter.slot('apify'):
+            run = apify_client.actor(PROFILE_ACTOR).call(run_input={"profileUrls": [url]})
+            return list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
+
+    return scrape_cache.cached_scrape('profile', PROFILE_ACTOR, normalize_linkedin_url(url), fetch)
@@ -11,6 +11,66 @@ import os
 # Prix Claude Sonnet 4 (au 21/01/2026 - vérifier les prix réels sur console.anthropic.com)
 PRICE_INPUT_TOKEN = 0.000003   # $3 per 1M tokens
 PRICE_OUTPUT_TOKEN = 0.000015  # $15 per 1M tokens
+# Prompt caching : écriture du cache +25%, lecture -90% par rapport à l'input
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+PRICE_CACHE_WRITE_TOKEN = PRICE_INPUT_TOKEN * CACHE_WRITE_MULTIPLIER
+PRICE_CACHE_READ_TOKEN = PRICE_INPUT_TOKEN * CACHE_READ_MULTIPLIER
+# Prix (entrée, sortie) par famille de modèle - Sonnet par défaut
+MODEL_PRICES = {
+    'haiku': (0.0000008, 0.000004),   # $0.80 / $4 per 1M tokens (Haiku 3.5)
+    'sonnet': (PRICE_INPUT_TOKEN, PRICE_OUTPUT_TOKEN),
+    'opus': (0.000015, 0.000075)      # $15 / $75 per 1M tokens
+}
+# API Message Batches : -50% sur tous les tokens
+BATCH_DISCOUNT = 0.5
+
+
+def usage_tokens(usage):
+    """
+    Compteurs de tokens d'un appel (les champs cache valent 0 si absents)
+
+    Args:
+        usage: Objet usage de Claude (message.usage)
+
+    Returns:
+        dict: {'input', 'output', 'cache_creation', 'cache_read'}
+    """
+    return {
+        'input': usage.input_tokens,
+        'output': usage.output_tokens,
+        'cache_creation': getattr(usage, 'cache_creation_input_tokens', None) or 0,
+        'cache_read': getattr(usage, 'cache_read_input_tokens', None) or 0
+    }
+
+
+def model_prices(model=None):
+    """Prix (entrée, sortie) par token d'un modèle (famille reconnue dans son nom)"""
+    for family, prices in MODEL_PRICES.items():
+        if model and family in model:
+            return prices
+    return MODEL_PRICES['sonnet']
+
+
+def compute_cost(usage, batch=False, model=None):
+    """
+    Coût d'un appel en USD (input_tokens n'inclut pas les tokens lus/écrits en cache)
+
+    Args:
+        usage: Objet usage de Claude (message.usage)
+        batch (bool): Appel traité via l'API Message Batches (tarif réduit)
+        model (str): Modèle utilisé (message.model) - défaut : tarif Sonnet
+    """
+    tokens = usage_tokens(usage)
+    price_input, price_output = model_prices(model)
+    cost = (
+        tokens['input'] * price_input
+        + tokens['output'] * price_output
+        + tokens['cache_creation'] * price_input * CACHE_WRITE_MULTIPLIER
+        + tokens['cache_read'] * price_input * CACHE_READ_MULTIPLIER
+    )
+    return cost * BATCH_DISCOUNT if batch else cost
+
 
 class ClaudeUsageTracker:
     """Tracker pour suivre l'utilisation et les coûts de l'API Claude"""
@@ -18,41 +78,72 @@ class ClaudeUsageTracker:
     def __init__(self):
         self.total_input_tokens = 0
         self.total_output_tokens = 0
+        self.total_cache_creation_tokens = 0
+        self.total_cache_read_tokens = 0
+        self.total_cost = 0.0
         self.calls = []
         self.session_start = datetime.now()
     
-    def track(self, usage, function_name):
+    def track(self, usage, function_name, latency=None, model=None):
         """
         Enregistre l'utilisation d'un appel API
         
         Args:
             usage: Objet usage de Claude (message.usage)
             function_name (str): Nom de la fonction appelante
+            latency (float): Durée de l'appel en secondes (optionnel)
+            model (str): Modèle utilisé (message.model), pour le tarif
         """
-        self.total_input_tokens += usage.input_tokens
-        self.total_output_tokens += usage.output_tokens
+        tokens = usage_tokens(usage)
+        self.total_input_tokens += tokens['input']
+        self.total_output_tokens += tokens['output']
+        self.total_cache_creation_tokens += tokens['cache_creation']
+        self.total_cache_read_tokens += tokens['cache_read']
         
         # Calculer le coût de cet appel
-        call_cost = (usage.input_tokens * PRICE_INPUT_TOKEN) + (usage.output_tokens * PRICE_OUTPUT_TOKEN)
+        call_cost = compute_cost(usage, model=model)
+        self.total_cost += call_cost
         
         call_data = {
             'timestamp': datetime.now().isoformat(),
             'function': function_name,
-            'input_tokens': usage.input_tokens,
-            'output_tokens': usage.output_tokens,
-            'total_tokens': usage.input_tokens + usage.output_tokens,
+            'model': model,
+            'input_tokens': tokens['input'],
+            'output_tokens': tokens['output'],
+            'cache_creation_tokens': tokens['cache_creation'],
+            'cache_read_tokens': tokens['cache_read'],
+            'total_tokens': tokens['input'] + tokens['output'] + tokens['cache_creation'] + tokens['cache_read'],
+            'latency_s': round(latency, 2) if latency is not None else None,
             'cost_usd': round(call_cost, 4)
         }
         
         self.calls.append(call_data)
         
         # Afficher dans la console
-        print(f"💰 [{function_name}] Tokens: {usage.input_tokens}→{usage.output_tokens} | Coût: ${call_cost:.4f}")
+        print(f"💰 [{function_name}{' - ' + model if model else ''}] Tokens: {tokens['input']}→{tokens['output']} "
+              f"(cache lu: {tokens['cache_read']}, écrit: {tokens['cache_creation']}) | Coût: ${call_cost:.4f}")
     
     def get_total_cost(self):
-        """Retourne le coût total de la session"""
-        total = (self.total_input_tokens * PRICE_INPUT_TOKEN) + (self.total_output_tokens * PRICE_OUTPUT_TOKEN)
-        return round(total, 4)
+        """Retourne le coût total de la session (tarif de chaque appel selon son modèle)"""
+        return round(self.total_cost, 4)
+    
+    def get_cost_by_model(self):
+        """Appels, coût et latence moyenne par modèle (mesure du routage)"""
+        by_model = {}
+        for call in self.calls:
+            entry = by_model.setdefault(call.get('model') or 'inconnu', {'calls': 0, 'cost_usd': 0.0, 'latencies': []})
+            entry['calls'] += 1
+            entry['cost_usd'] += call['cost_usd']
+            if call['latency_s'] is not None:
+                entry['latencies'].append(call['latency_s'])
+        return {
+            model: {
+                'calls': entry['calls'],
+                'cost_usd': round(entry['cost_usd'], 4),
+                'avg_latency_s': round(sum(entry['latencies']) / len(entry['latencies']), 2) if entry['latencies'] else None
+            }
+            for model, entry in by_model.items()
+        }
     
     def get_summary(self):
         """Retourne un résumé de l'utilisation"""
@@ -63,10 +154,19 @@ class ClaudeUsageTracker:
             'total_calls': len(self.calls),
             'total_input_tokens': self.total_input_tokens,
             'total_output_tokens': self.total_output_tokens,
+            'total_cache_creation_tokens': self.total_cache_creation_tokens,
+            'total_cache_read_tokens': self.total_cache_read_tokens,
+            'cache_hit_rate': round(self.get_cache_hit_rate(), 3),
             'total_tokens': self.total_input_tokens + self.total_output_tokens,
-            'total_cost_usd': self.get_total_cost()
+            'total_cost_usd': self.get_total_cost(),
+            'by_model': self.get_cost_by_model()
         }
     
+    def get_cache_hit_rate(self):
+        """Part des tokens d'entrée servis par le cache de prompt"""
+        prompt_tokens = self.total_input_tokens + self.total_cache_creation_tokens + self.total_cache_read_tokens
+        return self.total_cache_read_tokens / prompt_tokens if prompt_tokens else 0.0
+    
     def print_summary(self):
         """Affiche un résumé formaté"""
         summary = self.get_summary()
@@ -78,8 +178,13 @@ class ClaudeUsageTracker:
         print(f"📞 Nombre d'appels     : {summary['total_calls']}")
         print(f"📥 Tokens entrée       : {summary['total_input_tokens']:,}")
         print(f"📤 Tokens sortie       : {summary['total_output_tokens']:,}")
+        print(f"♻️  Tokens cache lus    : {summary['total_cache_read_tokens']:,} ({summary['cache_hit_rate']:.0%} de l'entrée)")
+        print(f"🗄️  Tokens cache écrits : {summary['total_cache_creation_tokens']:,}")
         print(f"📊 Tokens total        : {summary['total_tokens']:,}")
         print(f"💵 COÛT TOTAL          : ${summary['total_cost_usd']}")
+        for model, stats in summary['by_model'].items():
+            latency = f", {stats['avg_latency_s']}s/appel" if stats['avg_latency_s'] is not None else ""
+            print(f"   🤖 {model} : {stats['calls']} appel(s), ${stats['cost_usd']}{latency}")
         print("="*60 + "\n")
     
     def save_to_file(self, filename=None):
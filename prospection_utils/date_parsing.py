@@ -0,0 +1,210 @@
+"""
+Normalisation des dates de posts (Apify LinkedIn, Serper)
+Dates ISO (fromisoformat), formats absolus et relatifs ("2w", "3mo ago",
+"il y a 2 jours") reconnus par une seule expression compilée ; les chaînes
+déjà vues sont servies par un cache LRU
+Version: 1.0
+"""
+
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# Champs de date possibles selon l'acteur Apify (ordre de priorité)
+DATE_FIELDS = ('date', 'postedDate', 'postedAt', 'timestamp', 'publishedAt', 'time', 'posted', 'datePosted')
+
+# Conversion des unités relatives (mois et années approchés comme en V27)
+RELATIVE_UNITS = {
+    'minutes': timedelta(minutes=1),
+    'hours': timedelta(hours=1),
+    'days': timedelta(days=1),
+    'weeks': timedelta(weeks=1),
+    'months': timedelta(days=30),
+    'years': timedelta(days=365)
+}
+
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8,
+    'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+    'janvier': 1, 'février': 2, 'fevrier': 2, 'mars': 3, 'avril': 4, 'mai': 5, 'juin': 6,
+    'juillet': 7, 'août': 8, 'aout': 8, 'septembre': 9, 'octobre': 10, 'novembre': 11,
+    'décembre': 12, 'decembre': 12
+}
+
+CACHE_SIZE = 4096
+
+# Un groupe nommé par forme reconnue ; la première alternative qui correspond l'emporte
+_DATE_PATTERN = re.compile(r'''
+    (?P<ymd>(?P<y1>\d{4})[-/](?P<m1>\d{1,2})[-/](?P<d1>\d{1,2}))
+  | (?P<dmy>(?P<d2>\d{1,2})[-/](?P<m2>\d{1,2})[-/](?P<y2>\d{4}))
+  | (?P<mdy>(?P<mon3>[a-zéû]+)\.?\s+(?P<d3>\d{1,2}),?\s+(?P<y3>\d{4}))
+  | (?P<dmony>(?P<d4>\d{1,2})(?:er)?\s+(?P<mon4>[a-zéû]+)\.?\s+(?P<y4>\d{4}))
+  | (?P<relative>(?P<value>\d+)\s*(?:
+        (?P<months>mo(?:nths?)?|mois)
+      | (?P<weeks>w(?:ee)?ks?|w|semaines?)
+      | (?P<days>d(?:ays?)?|jours?)
+      | (?P<hours>h(?:(?:ou)?rs?)?|heures?)
+      | (?P<minutes>min(?:utes?)?|m)
+      | (?P<years>y(?:ea)?rs?|y|ans?)
+    )(?![a-zà-ÿ]))
+''', re.VERBOSE)
+
+# Horodatage epoch en millisecondes au-delà de ce seuil
+_EPOCH_MS_THRESHOLD = 10 ** 11
+
+
+def _safe_datetime(year, month, day):
+    try:
+        return datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_text(text):
+    """
+    Analyse d'une chaîne (mise en cache : ne dépend pas de l'heure courante)
+
+    Returns:
+        datetime (date absolue), timedelta (ancienneté relative) ou None
+    """
+    text = text.strip().lower()
+    if not text:
+        return None
+
+    # Chemin rapide : ISO 8601 (la grande majorité des datasets Apify)
+    if text[0].isdigit() and len(text) >= 10 and text[4] == '-':
+        try:
+            parsed = datetime.fromisoformat(text.upper().replace('Z', '+00:00'))
+            # Dates naïves comme en V27 (heure UTC gardée telle quelle)
+            return parsed.replace(tzinfo=None)
+        except ValueError:
+            pass
+
+    match = _DATE_PATTERN.search(text)
+    if not match:
+        return None
+    if match.group('ymd'):
+        return _safe_datetime(match.group('y1'), match.group('m1'), match.group('d1'))
+    if match.group('dmy'):
+        return _safe_datetime(match.group('y2'), match.group('m2'), match.group('d2'))
+    if match.group('mdy'):
+        month = MONTHS.get(match.group('mon3'))
+        return _safe_datetime(match.group('y3'), month, match.group('d3')) if month else None
+    if match.group('dmony'):
+        month = MONTHS.get(match.group('mon4'))
+        return _safe_datetime(match.group('y4'), month, match.group('d4')) if month else None
+
+    value = int(match.group('value'))
+    for unit, step in RELATIVE_UNITS.items():
+        if match.group(unit):
+            return step * value
+    return None
+
+
+def parse_date(value, now=None):
+    """
+    Date d'un post (chaîne ISO / absolue / relative, epoch en s ou ms)
+
+    Args:
+        value: Valeur brute du champ de date
+        now (datetime): Référence des dates relatives (défaut : maintenant)
+
+    Returns:
+        datetime naïve, ou None si illisible
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, dict):
+        # Certains acteurs imbriquent la date : {"timestamp": ..., "date": ...}
+        return parse_date(value.get('timestamp') or value.get('date'), now)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = value / 1000 if value > _EPOCH_MS_THRESHOLD else value
+        try:
+            return datetime.fromtimestamp(seconds)
+        except (OverflowError, OSError, ValueError):
+            return None
+
+    parsed = _parse_text(str(value))
+    if isinstance(parsed, timedelta):
+        return (now or datetime.now()) - parsed
+    return parsed
+
+
+def parse_many(values, now=None):
+    """
+    Dates d'un dataset entier : chaque valeur distincte n'est analysée qu'une
+    fois (les dates relatives "1w", "2mo" se répètent beaucoup)
+
+    Returns:
+        list: datetime ou None, dans l'ordre des valeurs
+    """
+    now = now or datetime.now()
+    unique = {}
+    parsed = []
+    for value in values:
+        key = value if isinstance(value, (str, int, float)) else None
+        if key is None:
+            parsed.append(parse_date(value, now))
+            continue
+        if key not in unique:
+            unique[key] = parse_date(value, now)
+        parsed.append(unique[key])
+    return parsed
+
+
+def post_date_value(post):
+    """Valeur brute de date d'un post (premier champ renseigné de DATE_FIELDS)"""
+    for field in DATE_FIELDS:
+        value = post.get(field)
+        if value:
+            return value
+    return None
+
+
+def filter_recent_posts(posts, max_age_months=6, max_posts=5, keep_undated=True, max_undated=None,
+                        max_undated_when_fewer_than=None, now=None):
+    """
+    Posts de moins de max_age_months (mois de 30 jours), dans l'ordre d'origine
+
+    Args:
+        posts (list): Items Apify (les non-dict sont ignorés)
+        max_age_months (int): Ancienneté max
+        max_posts (int): Nombre max de posts retournés (None = tous)
+        keep_undated (bool): Garder les posts sans date lisible (approche permissive)
+        max_undated (int): Nombre max de posts sans date gardés (None = sans limite)
+        max_undated_when_fewer_than (int): Post sans date gardé seulement si moins
+            de N posts (datés ou non) sont déjà retenus (None = pas de condition)
+        now (datetime): Référence (défaut : maintenant)
+
+    Returns:
+        list: Posts retenus
+    """
+    if not posts:
+        return []
+
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=max_age_months * 30)
+    posts = [post for post in posts if isinstance(post, dict)]
+    dates = parse_many([post_date_value(post) for post in posts], now)
+
+    recent = []
+    undated = 0
+    for post, post_date in zip(posts, dates):
+        if post_date is None:
+            if not keep_undated or (max_undated is not None and undated >= max_undated):
+                continue
+            if max_undated_when_fewer_than is not None and len(recent) >= max_undated_when_fewer_than:
+                continue
+            undated += 1
+            recent.append(post)
+        elif post_date >= cutoff:
+            recent.append(post)
+        if max_posts is not None and len(recent) >= max_posts:
+            break
+
+    return recent
@@ -0,0 +1,224 @@
+"""
+Cache persistant sur disque (SQLite)
+Clés adressées par contenu, TTL, éviction LRU et compteurs hit/miss
+Version: 1.0
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from prospection_utils.logger import log_event
+
+CACHE_DIR = os.getenv('PROSPECTION_CACHE_DIR', 'cache')
+CACHE_FILE = 'prospection_cache.sqlite3'
+
+# Vérification de la taille tous les N set() (évite un COUNT à chaque écriture)
+EVICTION_CHECK_EVERY = 50
+
+
+def make_key(*parts):
+    """
+    Construit une clé de cache stable à partir de plusieurs éléments
+
+    Args:
+        *parts: Éléments sérialisables en JSON
+
+    Returns:
+        str: Hash SHA-256 hexadécimal
+    """
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """Cache clé/valeur JSON persistant, partagé entre threads"""
+
+    def __init__(self, namespace, ttl_seconds=None, max_entries=5000, path=None):
+        """
+        Args:
+            namespace (str): Espace de noms (plusieurs caches par fichier)
+            ttl_seconds (float): Durée de vie des entrées (None = illimitée)
+            max_entries (int): Nombre max d'entrées avant éviction LRU
+            path (str): Fichier SQLite (défaut : cache/prospection_cache.sqlite3)
+        """
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path or os.path.join(CACHE_DIR, CACHE_FILE)
+        self.hits = 0
+        self.misses = 0
+        self._sets = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def configure(self, ttl_seconds=None, max_entries=None):
+        """Met à jour TTL et taille max (valeurs None ignorées)"""
+        if ttl_seconds is not None:
+            self.ttl_seconds = ttl_seconds
+        if max_entries is not None:
+            self.max_entries = max_entries
+
+    def _conn(self):
+        # Une connexion par thread (sqlite3 n'autorise pas le partage par défaut)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._init_schema(conn)
+        return conn
+
+    def _init_schema(self, conn):
+        with self._lock:
+            if self._initialized:
+                return
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache (namespace, last_access)'
+            )
+            conn.commit()
+            self._initialized = True
+
+    def get(self, key, ttl_seconds=None):
+        """
+        Lit une entrée
+
+        Args:
+            key (str): Clé (voir make_key)
+            ttl_seconds (float): TTL spécifique à cette lecture (défaut : TTL du cache)
+
+        Returns:
+            Valeur désérialisée, ou None si absente/expirée
+        """
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        ).fetchone()
+
+        now = time.time()
+        if row is None or (ttl is not None and now - row[1] > ttl):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        conn.execute(
+            'UPDATE cache SET last_access = ?, hits = hits + 1 WHERE namespace = ? AND key = ?',
+            (now, self.namespace, key)
+        )
+        conn.commit()
+        with self._lock:
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Écrit (ou remplace) une entrée"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (namespace, key, value, created_at, last_access, hits) '
+            'VALUES (?, ?, ?, ?, ?, 0)',
+            (self.namespace, key, json.dumps(value, ensure_ascii=False, default=str), now, now)
+        )
+        conn.commit()
+
+        with self._lock:
+            self._sets += 1
+            check = self._sets % EVICTION_CHECK_EVERY == 1
+        if check:
+            self.evict()
+
+    def get_or_fetch(self, key, fetch, ttl_seconds=None):
+        """
+        Retourne la valeur en cache, sinon appelle fetch() et la met en cache
+        Une exception levée par fetch() n'est pas mise en cache.
+        """
+        value = self.get(key, ttl_seconds=ttl_seconds)
+        if value is not None:
+            return value
+        value = fetch()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def entry_hits(self, key):
+        """Nombre de lectures réussies d'une entrée"""
+        row = self._conn().execute(
+            'SELECT hits FROM cache WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def delete(self, key):
+        conn = self._conn()
+        conn.execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (self.namespace, key))
+        conn.commit()
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute('DELETE FROM cache WHERE namespace = ?', (self.namespace,))
+        conn.commit()
+
+    def evict(self):
+        """Supprime les entrées expirées puis les moins récemment lues au-delà de max_entries"""
+        conn = self._conn()
+        expired = 0
+        if self.ttl_seconds is not None:
+            expired = conn.execute(
+                'DELETE FROM cache WHERE namespace = ? AND created_at < ?',
+                (self.namespace, time.time() - self.ttl_seconds)
+            ).rowcount
+
+        count = conn.execute(
+            'SELECT COUNT(*) FROM cache WHERE namespace = ?', (self.namespace,)
+        ).fetchone()[0]
+
+        evicted = 0
+        if self.max_entries and count > self.max_entries:
+            evicted = conn.execute(
+                'DELETE FROM cache WHERE namespace = ? AND key IN ('
+                'SELECT key FROM cache WHERE namespace = ? ORDER BY last_access ASC LIMIT ?)',
+                (self.namespace, self.namespace, count - self.max_entries)
+            ).rowcount
+        conn.commit()
+
+        if expired or evicted:
+            log_event('cache_evicted', {
+                'namespace': self.namespace,
+                'expired': expired,
+                'evicted': evicted
+            })
+
+    def stats(self):
+        """Retourne les compteurs du cache"""
+        entries = self._conn().execute(
+            'SELECT COUNT(*) FROM cache WHERE namespace = ?', (self.namespace,)
+        ).fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'namespace': self.namespace,
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0
+        }
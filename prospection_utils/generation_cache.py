@@ -0,0 +1,135 @@
+"""
+Cache des générations de séquences Claude
+Clé canonique sur les entrées du prompt hors identité du prospect (fiche, posts,
+web, titre LinkedIn, version du template) : le prénom est remis à la lecture
+Version: 1.0
+"""
+
+import re
+import threading
+from contextlib import contextmanager
+
+from prospection_utils.disk_cache import DiskCache, make_key
+from prospection_utils.logger import log_event
+
+# À incrémenter si le format des entrées en cache change
+CACHE_FORMAT_VERSION = 1
+
+FIRST_NAME_PLACEHOLDER = '{{PRENOM}}'
+
+DEFAULT_TTL_HOURS = 24 * 7
+
+generation_cache = DiskCache('sequence_generations', ttl_seconds=DEFAULT_TTL_HOURS * 3600, max_entries=2000)
+_enabled = True
+
+# Générations en cours par clé : les prospects identiques attendent le premier
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def configure(enabled=None, ttl_hours=None, max_entries=None):
+    """
+    Applique la configuration (config.GENERATION_CACHE_*)
+
+    Args:
+        enabled (bool): Active / désactive le cache
+        ttl_hours (float): Durée de vie d'une génération en cache
+        max_entries (int): Nombre max d'entrées (éviction LRU)
+    """
+    global _enabled
+    if enabled is not None:
+        _enabled = enabled
+    generation_cache.configure(
+        ttl_seconds=ttl_hours * 3600 if ttl_hours is not None else None,
+        max_entries=max_entries
+    )
+
+
+def canonical_text(value):
+    """Texte normalisé pour la clé (espaces et sauts de ligne sans effet sur la clé)"""
+    return ' '.join(str(value or '').split())
+
+
+def generation_key(template, **inputs):
+    """
+    Clé de cache d'une génération
+
+    Args:
+        template: Ce qui définit le prompt hors données (consignes, modèle, version)
+        **inputs: Entrées du prompt, sans le nom du prospect (fiche, posts, web, titre...)
+
+    Returns:
+        str: Clé (voir make_key)
+    """
+    canonical = {name: canonical_text(value) for name, value in inputs.items()}
+    return make_key(CACHE_FORMAT_VERSION, template, canonical)
+
+
+def _name_pattern(name):
+    # Pas de \b : le prénom par défaut "[Prénom]" commence par un non-alphanumérique
+    return re.compile(rf'(?<!\w){re.escape(name)}(?!\w)')
+
+
+def lookup_generation(key, first_name):
+    """
+    Réponse Claude en cache, personnalisée avec le prénom du prospect
+
+    Returns:
+        str: Texte de la réponse, ou None
+    """
+    if not _enabled or not key:
+        return None
+    entry = generation_cache.get(key)
+    if entry is None:
+        return None
+
+    log_event('generation_cache_hit', {'key': key[:16], 'hits': generation_cache.entry_hits(key)})
+    return entry['text'].replace(FIRST_NAME_PLACEHOLDER, first_name)
+
+
+def store_generation(key, response_text, first_name, full_name=''):
+    """
+    Met une réponse Claude en cache avec le prénom remplacé par un marqueur
+
+    Une réponse qui cite une autre partie du nom (nom de famille) n'est pas
+    réutilisable pour un autre prospect : elle n'est pas mise en cache.
+
+    Returns:
+        bool: True si la réponse a été mise en cache
+    """
+    if not _enabled or not key or not response_text:
+        return False
+
+    other_names = [part for part in str(full_name).split() if len(part) > 2 and part.lower() != first_name.lower()]
+    if any(_name_pattern(part).search(response_text) for part in other_names):
+        log_event('generation_cache_skipped', {'key': key[:16], 'reason': 'nom de famille dans la réponse'})
+        return False
+
+    templated = _name_pattern(first_name).sub(FIRST_NAME_PLACEHOLDER, response_text) if first_name else response_text
+    generation_cache.set(key, {'text': templated})
+    return True
+
+
+@contextmanager
+def generation_lock(key):
+    """
+    Sérialise les générations d'une même clé : le second prospect identique
+    attend le premier puis lit sa réponse en cache au lieu de payer un appel
+    """
+    if not _enabled or not key:
+        yield
+        return
+
+    with _inflight_lock:
+        lock, users = _inflight.get(key, (threading.Lock(), 0))
+        _inflight[key] = (lock, users + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _inflight_lock:
+            lock, users = _inflight[key]
+            if users == 1:
+                del _inflight[key]
+            else:
+                _inflight[key] = (lock, users - 1)
@@ -0,0 +1,177 @@
+"""
+Extraction rapide des fiches de poste (lxml + XPath précompilés)
+Chaque job board déclare ses règles (XPath par champ, dans l'ordre de
+priorité) compilées une seule fois ; le parseur C de lxml remplace la
+construction d'un arbre BeautifulSoup complet. Si un champ requis manque
+(page atypique, lxml absent, page indécodable), parse() retourne None et
+l'appelant garde sa logique BeautifulSoup d'origine.
+Benchmark : benchmark_job_parsing.py
+Version: 1.0
+"""
+
+import re
+
+try:
+    import lxml.html
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Espace de noms EXSLT des expressions régulières (re:test dans les XPath)
+XPATH_NAMESPACES = {'re': 'http://exslt.org/regular-expressions'}
+
+# Balises dont le texte n'est jamais extrait (comme get_text de BeautifulSoup)
+SKIPPED_TAGS = ('script', 'style', 'noscript', 'template')
+
+# Décodage fait ici (lxml supposerait latin-1 sans <meta charset>) : charset de
+# l'en-tête HTTP, puis <meta charset>, puis les encodages les plus courants ;
+# le premier qui décode toute la page l'emporte (comme UnicodeDammit, sans chardet)
+FALLBACK_ENCODINGS = ('utf-8', 'windows-1252')
+
+_HEADER_CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+_CHARSET_SCAN_BYTES = 4096
+
+# lxml refuse une chaîne qui commence par une déclaration XML avec encodage
+_XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+
+def has_class(name):
+    """Prédicat XPath équivalent au sélecteur CSS .name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def response_charset(response):
+    """Charset déclaré dans l'en-tête Content-Type de la réponse HTTP, ou None"""
+    headers = getattr(response, 'headers', None) or {}
+    declared = _HEADER_CHARSET.search(headers.get('Content-Type') or '')
+    return declared.group(1) if declared else None
+
+
+def decode_page(content, encoding=None):
+    """
+    Texte d'une page
+
+    Args:
+        content (bytes | str): HTML brut
+        encoding (str): Charset de l'en-tête HTTP (prioritaire), ou None
+
+    Returns:
+        str
+    """
+    if isinstance(content, str):
+        return content
+    candidates = [encoding] if encoding else []
+    declared = _META_CHARSET.search(content[:_CHARSET_SCAN_BYTES])
+    if declared:
+        candidates.append(declared.group(1).decode('ascii'))
+    for candidate in candidates + list(FALLBACK_ENCODINGS):
+        try:
+            return content.decode(candidate)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    # latin-1 décode n'importe quels octets
+    return content.decode('latin-1')
+
+
+def parse_document(content, encoding=None):
+    """
+    Arbre lxml d'une page (octets ou texte)
+
+    Returns:
+        lxml.html.HtmlElement, ou None si lxml est absent ou la page illisible
+    """
+    if not LXML_AVAILABLE or not content:
+        return None
+    try:
+        text = decode_page(content, encoding)
+        if text.lstrip().startswith('<?xml'):
+            text = _XML_DECLARATION.sub('', text, count=1)
+        return lxml.html.document_fromstring(text)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+class JobPageParser:
+    """
+    Règles d'extraction d'un job board
+
+    fields : {nom: {
+        'xpaths': [...],        # essayés dans l'ordre jusqu'au premier qui trouve un élément
+        'separator': '\\n',     # séparateur des morceaux de texte ('' pour un titre)
+        'select': 'first',      # 'first' : premier élément, 'longest' : texte le plus
+                                # long, 'all' : textes de tous les éléments, une ligne chacun
+        'min_chars': 0          # texte plus court : on essaie l'XPath suivant
+    }}
+    required : champs sans lesquels la page est un échec (retour None)
+    excluded_tags : balises ignorées en plus de SKIPPED_TAGS (nav, footer...)
+    """
+
+    def __init__(self, fields, required=('title', 'description'), excluded_tags=()):
+        self.required = required
+        skipped = ' or '.join(f'ancestor::{tag}' for tag in SKIPPED_TAGS + tuple(excluded_tags))
+        self._text = etree.XPath(f'.//text()[not({skipped})]') if LXML_AVAILABLE else None
+        self._excluded = tuple(excluded_tags)
+        self.fields = {}
+        for name, spec in fields.items():
+            self.fields[name] = dict(
+                spec,
+                compiled=[self._compile(xpath) for xpath in spec['xpaths']] if LXML_AVAILABLE else []
+            )
+
+    def _compile(self, xpath):
+        if self._excluded:
+            # Éléments situés dans une zone exclue ignorés (BeautifulSoup : decompose)
+            outside = ' or '.join(f'ancestor::{tag}' for tag in self._excluded)
+            xpath = f'({xpath})[not({outside})]'
+        return etree.XPath(xpath, namespaces=XPATH_NAMESPACES)
+
+    def element_text(self, element, separator='\n'):
+        """Texte d'un élément, morceaux nettoyés (get_text(separator, strip=True))"""
+        pieces = (piece.strip() for piece in self._text(element))
+        return separator.join(piece for piece in pieces if piece)
+
+    def _extract(self, document, spec):
+        separator = spec.get('separator', '\n')
+        min_chars = spec.get('min_chars', 0)
+        text = ''
+        for xpath in spec['compiled']:
+            elements = xpath(document)
+            if not elements:
+                continue
+            select = spec.get('select', 'first')
+            if select == 'longest':
+                text = max((self.element_text(element, separator) for element in elements), key=len)
+            elif select == 'all':
+                text = '\n'.join(self.element_text(element, separator) for element in elements)
+            else:
+                text = self.element_text(elements[0], separator)
+            if len(text) >= min_chars:
+                return text
+        return text
+
+    def parse(self, content, encoding=None):
+        """
+        Champs de la page
+
+        Args:
+            content (bytes | str): HTML brut (response.content)
+            encoding (str): Charset de l'en-tête HTTP (response_charset), ou None
+
+        Returns:
+            dict: {champ: texte}, ou None si un champ requis manque ou si la
+            page est illisible (l'appelant passe alors à BeautifulSoup)
+        """
+        document = parse_document(content, encoding)
+        if document is None:
+            return None
+
+        try:
+            result = {name: self._extract(document, spec) for name, spec in self.fields.items()}
+        except (UnicodeDecodeError, ValueError):
+            return None
+        for name in self.required:
+            if len(result.get(name, '')) < max(1, self.fields[name].get('min_chars', 0)):
+                return None
+        return result
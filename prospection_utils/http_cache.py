@@ -0,0 +1,197 @@
+"""
+Cache HTTP des fiches de poste
+Requêtes conditionnelles (ETag / Last-Modified), fiche parsée stockée avec le HTML,
+déduplication des URLs identiques pendant un run
+Version: 1.0
+"""
+
+import base64
+import threading
+import time
+from concurrent.futures import Future
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from prospection_utils.disk_cache import DiskCache, make_key
+from prospection_utils.http_client import http
+from prospection_utils.logger import log_event
+
+DEFAULT_TTL_HOURS = 24
+
+# Une entrée par URL : {'etag', 'last_modified', 'body', 'content_type', 'fetched_at', 'job_data'}
+# body : octets bruts de la page en base64 (le cache est en JSON) ; le décodage
+# reste à la charge des parseurs (<meta charset>, en-tête Content-Type)
+page_cache = DiskCache('job_pages', max_entries=2000)
+_ttl_seconds = DEFAULT_TTL_HOURS * 3600
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+class CachedPage:
+    """
+    Réponse HTTP minimale (interface compatible requests.Response pour les scrapers)
+    content : octets bruts ; text : décodé comme le ferait requests
+    """
+
+    def __init__(self, status_code, content, content_type=None, not_modified=False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict({'Content-Type': content_type} if content_type else {})
+        self.encoding = get_encoding_from_headers(self.headers)
+        self.not_modified = not_modified
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+def _encode_body(content):
+    return base64.b64encode(content or b'').decode('ascii')
+
+
+def _decode_body(entry):
+    return base64.b64decode(entry['body'])
+
+
+def configure(ttl_hours=None, max_entries=None):
+    """
+    Applique la configuration (config.JOB_POSTING_CACHE_TTL_HOURS)
+
+    Args:
+        ttl_hours (float): Durée pendant laquelle une fiche parsée est réutilisée sans requête
+        max_entries (int): Nombre max de pages en cache (éviction LRU)
+    """
+    global _ttl_seconds
+    if ttl_hours is not None:
+        _ttl_seconds = ttl_hours * 3600
+    page_cache.configure(max_entries=max_entries)
+
+
+def _page_key(url):
+    return make_key('job_page', url.strip())
+
+
+def fetch_page(url, headers=None, timeout=15):
+    """
+    GET conditionnel : revalide la page en cache (If-None-Match / If-Modified-Since)
+
+    Args:
+        url (str): URL de la fiche
+        headers (dict): En-têtes HTTP
+        timeout (int): Timeout en secondes
+
+    Returns:
+        CachedPage: status_code 200 + contenu (depuis le cache si 304)
+    """
+    key = _page_key(url)
+    entry = page_cache.get(key)
+    if entry and 'body' not in entry:
+        # Entrée d'un ancien format (HTML déjà décodé) : refetch complet
+        entry = None
+
+    request_headers = dict(headers or {})
+    if entry:
+        if entry.get('etag'):
+            request_headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+    response = http.get(url, headers=request_headers, timeout=timeout)
+
+    if response.status_code == 304 and entry:
+        entry['fetched_at'] = time.time()
+        page_cache.set(key, entry)
+        log_event('job_page_not_modified', {'url': url})
+        return CachedPage(200, _decode_body(entry), entry.get('content_type'), not_modified=True)
+
+    if response.status_code == 200:
+        page_cache.set(key, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body': _encode_body(response.content),
+            'content_type': response.headers.get('Content-Type'),
+            'fetched_at': time.time(),
+            'job_data': None
+        })
+
+    return CachedPage(response.status_code, response.content, response.headers.get('Content-Type'))
+
+
+def get_fresh_job_data(url):
+    """Retourne la fiche parsée si elle a été (re)validée il y a moins de TTL, sinon None"""
+    entry = page_cache.get(_page_key(url))
+    if entry and entry.get('job_data') and time.time() - entry.get('fetched_at', 0) < _ttl_seconds:
+        return entry['job_data']
+    return None
+
+
+def store_job_data(url, job_data):
+    """Enregistre la fiche parsée à côté du HTML brut"""
+    key = _page_key(url)
+    entry = page_cache.get(key) or {
+        'etag': None,
+        'last_modified': None,
+        'body': '',
+        'content_type': None,
+        'fetched_at': time.time()
+    }
+    entry['job_data'] = job_data
+    page_cache.set(key, entry)
+
+
+def single_flight(key, fn):
+    """
+    Exécute fn() une seule fois pour des appels simultanés avec la même clé
+    Les appels concurrents attendent et reçoivent le même résultat.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+
+    if not owner:
+        return future.result()
+
+    try:
+        result = fn()
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def cached_job_posting(url, scrape_fn):
+    """
+    Fiche de poste via le cache : une requête + un parsing par URL et par TTL
+
+    Args:
+        url (str): URL de la fiche
+        scrape_fn (callable): scrape_fn(url) -> job_data dict ou None
+
+    Returns:
+        dict: job_data ou None
+    """
+    job_data = get_fresh_job_data(url)
+    if job_data:
+        log_event('job_posting_cache_hit', {'url': url})
+        return job_data
+
+    def scrape():
+        # Revérifier : un autre worker vient peut-être de la scraper
+        fresh = get_fresh_job_data(url)
+        if fresh:
+            return fresh
+        scraped = scrape_fn(url)
+        if scraped:
+            store_job_data(url, scraped)
+        return scraped
+
+    return single_flight(_page_key(url), scrape)
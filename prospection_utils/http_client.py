@@ -0,0 +1,110 @@
+"""
+Client HTTP partagé
+Sessions requests poolées par hôte (keep-alive), retries avec jitter, timeouts par hôte
+Version: 1.0
+"""
+
+import random
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Timeouts (secondes) par hôte - défaut pour les job boards et sites inconnus
+HOST_TIMEOUTS = {
+    'dashboard.leonar.app': 15,
+    'google.serper.dev': 10
+}
+DEFAULT_TIMEOUT = 15
+
+# Taille des pools : >= nombre de workers qui appellent le même hôte en parallèle
+POOL_MAXSIZE = 16
+
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_FORCELIST = (500, 502, 503, 504)
+
+
+class JitterRetry(Retry):
+    """Retry urllib3 avec jitter aléatoire sur le backoff (évite les retries synchronisés)"""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return backoff + random.uniform(0, backoff)
+
+
+class HttpClient:
+    """Une session poolée par hôte, partagée par tous les threads"""
+
+    def __init__(self, pool_maxsize=POOL_MAXSIZE):
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _build_session(self):
+        retry = JitterRetry(
+            total=RETRY_TOTAL,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUS_FORCELIST,
+            # POST non rejoué sur erreur de lecture/statut (non idempotent),
+            # seulement sur erreur de connexion
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | frozenset(['PATCH']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def session_for(self, url):
+        """Retourne la session de l'hôte de l'URL (créée au premier appel)"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._sessions:
+                self._sessions[host] = self._build_session()
+            return self._sessions[host]
+
+    def request(self, method, url, **kwargs):
+        """
+        Requête HTTP via la session poolée de l'hôte
+
+        Args:
+            method (str): 'GET', 'POST', 'PATCH'...
+            url (str): URL
+            **kwargs: Arguments requests (headers, json, timeout...)
+
+        Returns:
+            requests.Response
+        """
+        host = urlparse(url).netloc.lower()
+        kwargs.setdefault('timeout', HOST_TIMEOUTS.get(host, DEFAULT_TIMEOUT))
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+# Instance globale partagée
+http = HttpClient()
@@ -0,0 +1,145 @@
+"""
+Détection de la catégorie métier par table de règles
+Règles déclaratives (titre > description nettoyée > headline du prospect)
+compilées une fois en expressions combinées, résultat mémorisé par fiche
+Évaluation hors ligne : evaluate_job_categories.py
+Version: 1.0
+"""
+
+import re
+from functools import lru_cache
+
+# Ordre significatif : dans chaque étape, la première règle qui correspond l'emporte.
+# Les mots-clés sont cherchés en sous-chaîne (texte en minuscules), comme en V27.4.
+#   override     : {'keywords', 'category'} -> catégorie prioritaire si le même texte les contient
+#   unless_title : règle ignorée si le titre contient un de ces mots
+JOB_CATEGORY_RULES = {
+    # DÉTECTION SUR TITRE UNIQUEMENT (PRIORITÉ ABSOLUE)
+    'title': [
+        {'category': 'comptabilite', 'keywords': ['comptable', 'accountant', 'accounting'],
+         # "comptable" dans le titre mais "consolidation" aussi → consolidation
+         'override': {'keywords': ['consolidation', 'consolidateur'], 'category': 'consolidation'}},
+        {'category': 'audit', 'keywords': ['audit', 'auditeur', 'auditor']},
+        {'category': 'consolidation', 'keywords': ['consolidation', 'consolidateur', 'consolidator']},
+        {'category': 'controle_gestion', 'keywords': ['contrôle de gestion', 'controle de gestion', 'contrôleur de gestion', 'controller', 'business controller']},
+        {'category': 'fpna', 'keywords': ['fp&a', 'fpa', 'financial planning', 'fpna']},
+        {'category': 'daf', 'keywords': ['daf', 'directeur administratif', 'cfo', 'chief financial', 'directeur financier']},
+        {'category': 'raf', 'keywords': ['raf', 'responsable administratif']},
+        {'category': 'data_ia', 'keywords': ['data officer', 'ia officer', 'ai officer', 'data & ia', 'chief data', 'cdo']},
+        {'category': 'epm', 'keywords': ['epm', 'anaplan', 'hyperion', 'tagetik']},
+        {'category': 'bi_data', 'keywords': ['bi ', 'business intelligence', ' data ', 'analytics']}
+    ],
+    # Mentions de contexte retirées de la description avant recherche
+    'description_exclusions': [
+        r'\bou audit\b',
+        r'\baudit externe\b',  # Souvent mentionné comme "en lien avec audit externe"
+        r'\bcontrôles? de niveau \d\b',
+        r'\brelation avec.*audit\b',
+        r'\ben collaboration avec.*audit\b',
+        r'\baudit interne et externe\b'  # Contexte, pas le poste
+    ],
+    # SI TITRE NON CONCLUANT → DESCRIPTION NETTOYÉE
+    'description': [
+        {'category': 'comptabilite', 'keywords': ['comptable', 'comptabilité', 'accounting'], 'unless_title': ['audit']},
+        {'category': 'audit', 'keywords': ['auditeur', 'audit interne', 'internal audit']},
+        {'category': 'consolidation', 'keywords': ['consolidation', 'ifrs 10', 'normes ifrs']},
+        {'category': 'controle_gestion', 'keywords': ['contrôle de gestion', 'business controller']}
+    ],
+    # FALLBACK : HEADLINE PROSPECT
+    'headline': [
+        {'category': 'daf', 'keywords': ['daf', 'cfo', 'directeur financier']},
+        {'category': 'audit', 'keywords': ['audit']},
+        {'category': 'comptabilite', 'keywords': ['comptab']},
+        {'category': 'controle_gestion', 'keywords': ['contrôl']}
+    ]
+}
+
+DEFAULT_CATEGORY = 'general'
+
+# Fiches mémorisées (une campagne réutilise souvent la même fiche)
+MEMO_SIZE = 1024
+
+
+def _contains_any(text, keywords):
+    return any(keyword in text for keyword in keywords)
+
+
+class RuleStage:
+    """
+    Règles d'une étape compilées en une alternance : un seul parcours du texte
+    donne toutes les règles qui y correspondent (sous-chaînes, chevauchements compris)
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        words = sorted({keyword for rule in rules for keyword in rule['keywords']}, key=len, reverse=True)
+        # Lookahead de largeur nulle : le mot-clé le plus long à chaque position ;
+        # les plus courts qui y commencent sont ses préfixes (voir _rules_for_word)
+        self._pattern = re.compile('(?=(' + '|'.join(re.escape(word) for word in words) + '))')
+        self._rules_for_word = {
+            word: {
+                index for index, rule in enumerate(rules)
+                if any(word.startswith(keyword) for keyword in rule['keywords'])
+            }
+            for word in words
+        }
+
+    def matching_rules(self, text):
+        """Indices des règles dont un mot-clé apparaît dans le texte"""
+        matched = set()
+        for word in self._pattern.findall(text):
+            matched |= self._rules_for_word[word]
+        return matched
+
+    def first_category(self, text, title=''):
+        """Catégorie de la première règle applicable, None sinon"""
+        matched = self.matching_rules(text)
+        for index in sorted(matched):
+            rule = self.rules[index]
+            if rule.get('unless_title') and _contains_any(title, rule['unless_title']):
+                continue
+            override = rule.get('override')
+            if override and _contains_any(text, override['keywords']):
+                return override['category']
+            return rule['category']
+        return None
+
+
+class JobCategoryClassifier:
+    """Table de règles compilée (voir JOB_CATEGORY_RULES)"""
+
+    def __init__(self, rules):
+        self.title_stage = RuleStage(rules['title'])
+        self.description_stage = RuleStage(rules['description'])
+        self.headline_stage = RuleStage(rules['headline'])
+        # Exclusions appliquées dans l'ordre de la table, chacune compilée une fois
+        self.exclusions = [re.compile(pattern, re.IGNORECASE) for pattern in rules['description_exclusions']]
+        self.classify = lru_cache(maxsize=MEMO_SIZE)(self._classify)
+
+    def clean_description(self, description):
+        for pattern in self.exclusions:
+            description = pattern.sub('', description)
+        return description
+
+    def _classify(self, title, description, headline):
+        return (
+            self.title_stage.first_category(title)
+            or self.description_stage.first_category(self.clean_description(description), title)
+            or self.headline_stage.first_category(headline)
+            or DEFAULT_CATEGORY
+        )
+
+
+job_category_classifier = JobCategoryClassifier(JOB_CATEGORY_RULES)
+
+
+def detect_category(title, description, headline):
+    """
+    Catégorie métier (textes bruts, mis en minuscules ici)
+
+    Returns:
+        str: 'comptabilite', 'audit', ..., ou DEFAULT_CATEGORY
+    """
+    return job_category_classifier.classify(
+        str(title or '').lower(), str(description or '').lower(), str(headline or '').lower()
+    )
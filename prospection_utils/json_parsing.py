@@ -0,0 +1,225 @@
+"""
+Lecture tolérante du JSON renvoyé par Claude
+Scanner incrémental à équilibrage de crochets : blocs ```json, texte avant ou
+après le JSON, crochets dans les chaînes et sortie tronquée (max_tokens)
+Version: 1.0
+"""
+
+import json
+import re
+
+OPENERS = {'[': ']', '{': '}'}
+
+# Nombre max de points de départ essayés par extract_json
+MAX_RESCANS = 20
+
+# Virgule finale avant ] ou } (hors chaîne, voir _strip_trailing_commas)
+_TRAILING_COMMA = re.compile(r',(\s*[\]}])')
+
+
+class JsonScanner:
+    """
+    Alimenté par fragments (feed), dans l'ordre : repère les valeurs JSON de
+    premier niveau ([...] ou {...}) sans se laisser tromper par les crochets
+    ou guillemets échappés à l'intérieur des chaînes
+    """
+
+    def __init__(self):
+        self.text = ''
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._start = None
+        # Fins des éléments complets du tableau de premier niveau en cours
+        self._element_ends = []
+        self.values = []  # [(début, fin)] des valeurs complètes
+
+    def feed(self, fragment):
+        """
+        Ajoute un fragment
+
+        Returns:
+            list: Textes des valeurs de premier niveau complétées par ce fragment
+        """
+        self.text += fragment
+        completed = []
+        text = self.text
+
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if not self._stack:
+                # Hors JSON : texte libre, seule une ouverture compte
+                if char in OPENERS:
+                    self._stack.append(OPENERS[char])
+                    self._start = pos
+                    self._element_ends = []
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in OPENERS:
+                self._stack.append(OPENERS[char])
+            elif char == ',' and len(self._stack) == 1:
+                self._element_ends.append(pos)
+            elif char == self._stack[-1]:
+                self._stack.pop()
+                if not self._stack:
+                    self.values.append((self._start, pos + 1))
+                    completed.append(text[self._start:pos + 1])
+                    self._start = None
+            elif char in ']}':
+                # Fermeture inattendue : ce n'était pas du JSON, on repart de zéro
+                self._stack = []
+                self._start = None
+
+        self._pos = len(text)
+        return completed
+
+    def partial(self):
+        """
+        Valeur de premier niveau non terminée (sortie tronquée)
+
+        Returns:
+            tuple: (caractère ouvrant, texte jusqu'au dernier élément complet), ou None
+        """
+        if self._start is None:
+            return None
+        if not self._element_ends:
+            return None
+        return self.text[self._start], self.text[self._start:self._element_ends[-1]]
+
+
+def _strip_trailing_commas(text):
+    """Supprime les virgules finales hors chaînes ([1, 2,] -> [1, 2])"""
+    parts = re.split(r'("(?:[^"\\]|\\.)*")', text)
+    return ''.join(part if index % 2 else _TRAILING_COMMA.sub(r'\1', part) for index, part in enumerate(parts))
+
+
+def loads_tolerant(text):
+    """
+    json.loads, puis nouvel essai sans virgules finales
+
+    Raises:
+        json.JSONDecodeError
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        cleaned = _strip_trailing_commas(text)
+        if cleaned == text:
+            raise
+        return json.loads(cleaned)
+
+
+# Début d'élément JSON après la dernière virgule d'une valeur tronquée
+_ELEMENT_START = re.compile(r'\s*[\[{"\d\-tfn]')
+
+
+def _is_truncated_json(scanner, partial):
+    """
+    Valeur ouverte par un vrai JSON coupé (et non par un crochet isolé du texte
+    libre) : éléments complets lisibles, puis début d'élément après la virgule
+    """
+    if not partial:
+        return False
+    opener, head = partial
+    try:
+        loads_tolerant(head + OPENERS[opener])
+    except json.JSONDecodeError:
+        return False
+    return bool(_ELEMENT_START.match(scanner.text, scanner._element_ends[-1] + 1))
+
+
+def _matches(value, expect):
+    return expect is None or isinstance(value, expect)
+
+
+def extract_json(text, expect=None, allow_partial=True):
+    """
+    Première valeur JSON valide du texte (du type attendu)
+
+    Args:
+        text (str): Réponse brute de Claude
+        expect (type): list ou dict (None = n'importe lequel)
+        allow_partial (bool): Récupère les éléments complets d'un tableau tronqué
+
+    Returns:
+        tuple: (valeur, complet bool) ; (None, False) si aucune valeur lisible
+    """
+    text = text or ''
+    # Un crochet isolé dans le texte libre ("[PRÉNOM" non fermé) peut masquer
+    # le JSON qui suit : on relance le scan depuis les ouvertures suivantes
+    starts = [index for index, char in enumerate(text) if char in OPENERS][:MAX_RESCANS]
+
+    partials = []
+    scanned_until = 0
+    for start in starts or [0]:
+        if start < scanned_until:
+            # Ouverture imbriquée dans une valeur déjà lue : pas un nouveau départ
+            continue
+        scanner = JsonScanner()
+        for candidate in scanner.feed(text[start:]):
+            try:
+                value = loads_tolerant(candidate)
+            except json.JSONDecodeError:
+                continue
+            if _matches(value, expect):
+                return value, True
+        partial = scanner.partial()
+        if _is_truncated_json(scanner, partial):
+            # Valeur tronquée jusqu'à la fin du texte : ses ouvertures internes
+            # sont ses propres éléments, pas des valeurs de premier niveau
+            scanned_until = len(text)
+        else:
+            scanned_until = start + max((end for _, end in scanner.values), default=0)
+        partials.append(partial)
+
+    # Aucune valeur complète : éléments terminés d'un tableau tronqué
+    if allow_partial and expect in (None, list):
+        for partial in partials:
+            if not partial or partial[0] != '[':
+                continue
+            try:
+                return loads_tolerant(partial[1] + ']'), False
+            except json.JSONDecodeError:
+                continue
+
+    return None, False
+
+
+# ========================================
+# MODE TOOL USE (SORTIE CONTRAINTE PAR SCHÉMA)
+# ========================================
+
+def tool_spec(name, description, input_schema):
+    """Outil unique à passer dans tools=[...] avec tool_choice=forced_tool(name)"""
+    return {'name': name, 'description': description, 'input_schema': input_schema}
+
+
+def forced_tool(name):
+    """tool_choice qui impose l'appel de l'outil (réponse = JSON conforme au schéma)"""
+    return {'type': 'tool', 'name': name}
+
+
+def tool_input(message, name):
+    """
+    Arguments de l'appel d'outil `name` dans une réponse Claude
+
+    Returns:
+        dict: input du bloc tool_use, ou None
+    """
+    for block in getattr(message, 'content', None) or []:
+        if getattr(block, 'type', None) == 'tool_use' and getattr(block, 'name', None) == name:
+            return block.input
+    return None
@@ -0,0 +1,69 @@
+"""
+Recherche de mots-clés en une passe
+Automate (trie sur les mots) construit une fois, qui remplace les boucles
+`kw in texte` : respect des limites de mots ('r', 'ia', 'ai' ne correspondent
+plus à l'intérieur des mots) et texte parcouru une seule fois
+Version: 1.0
+"""
+
+import re
+
+# Apostrophes typographiques des posts LinkedIn ramenées à l'apostrophe simple
+_APOSTROPHES = ('’', '‘', 'ʼ')
+
+# Mots et signes isolés ("s/4hana" -> s, /, 4hana ; "fp&a" -> fp, &, a)
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+_END = None  # Clé du trie marquant la fin d'un mot-clé
+
+
+def normalize_text(text):
+    """Minuscules et apostrophes unifiées (les mots-clés sont écrits ainsi)"""
+    text = str(text or '').lower()
+    # str.replace est bien plus rapide que str.translate sur des textes courts
+    for apostrophe in _APOSTROPHES:
+        if apostrophe in text:
+            text = text.replace(apostrophe, "'")
+    return text
+
+
+def tokenize(text):
+    return _TOKEN.findall(normalize_text(text))
+
+
+class KeywordMatcher:
+    """
+    Ensemble de mots-clés compilé en trie de mots. find(texte) retourne les
+    mots-clés présents en mots entiers, y compris ceux imbriqués dans un autre
+    mot-clé trouvé ('sap bfc' -> aussi 'sap') ou qui se chevauchent.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({normalize_text(keyword) for keyword in keywords if keyword})
+        self._trie = {}
+        for keyword in self.keywords:
+            node = self._trie
+            for token in tokenize(keyword):
+                node = node.setdefault(token, {})
+            node[_END] = keyword
+
+    def find(self, text):
+        """
+        Mots-clés présents dans le texte
+
+        Returns:
+            set: Mots-clés (normalisés) trouvés
+        """
+        tokens = tokenize(text)
+        found = set()
+        for start, token in enumerate(tokens):
+            node = self._trie.get(token)
+            position = start
+            while node is not None:
+                if _END in node:
+                    found.add(node[_END])
+                position += 1
+                if position == len(tokens):
+                    break
+                node = node.get(tokens[position])
+        return found
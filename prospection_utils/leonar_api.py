@@ -0,0 +1,147 @@
+"""
+API Leonar (Bubble Data API)
+Pagination parallèle des prospects d'une campagne, pages livrées au fil de l'eau
+Version: 1.0
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from prospection_utils.http_client import http
+from prospection_utils.logger import log_event, log_error
+from prospection_utils.pipeline import limiter
+
+LEONAR_API_URL = 'https://dashboard.leonar.app/api/1.1'
+
+# Taille de page max acceptée par la Data API Bubble
+PAGE_SIZE = 100
+
+
+class LeonarAPIError(Exception):
+    """Réponse HTTP non-200 de l'API Leonar"""
+
+    def __init__(self, status_code, message=''):
+        self.status_code = status_code
+        super().__init__(f"Leonar API erreur: status {status_code} {message}".strip())
+
+
+def fetch_matching_page(token, campaign_id, cursor=0, limit=PAGE_SIZE):
+    """
+    Récupère une page des prospects (objets 'matching') d'une campagne
+
+    Args:
+        token (str): Token Leonar
+        campaign_id (str): ID de la campagne
+        cursor (int): Position du premier prospect de la page
+        limit (int): Taille de la page
+
+    Returns:
+        tuple: (results list, remaining int)
+
+    Raises:
+        LeonarAPIError: Si le statut HTTP n'est pas 200
+    """
+    constraints = json.dumps([{"key": "campaign", "constraint_type": "equals", "value": campaign_id}])
+
+    with limiter.slot('leonar'):
+        r = http.get(
+            f'{LEONAR_API_URL}/obj/matching',
+            params={'constraints': constraints, 'cursor': cursor, 'limit': limit},
+            headers={'Authorization': f'Bearer {token}'},
+            timeout=15
+        )
+
+    if r.status_code != 200:
+        raise LeonarAPIError(r.status_code)
+
+    response = r.json().get('response', {})
+    return response.get('results', []), response.get('remaining', 0)
+
+
+def iter_matching_pages(token, campaign_id, page_size=PAGE_SIZE, max_workers=4):
+    """
+    Parcourt toutes les pages d'une campagne, sans limite de nombre de pages
+
+    La première page donne 'remaining' : les curseurs des pages suivantes sont
+    connus d'avance et les pages sont récupérées en parallèle (dans la limite
+    du slot 'leonar'). Chaque page est livrée dès réception, dans l'ordre de
+    complétion, pour que le traitement démarre avant la fin de la pagination.
+
+    Args:
+        token (str): Token Leonar
+        campaign_id (str): ID de la campagne
+        page_size (int): Taille des pages
+        max_workers (int): Pages récupérées simultanément
+
+    Yields:
+        tuple: (numéro de page, results list, total prospects de la campagne)
+
+    Raises:
+        LeonarAPIError: Si la première page échoue (les pages suivantes en échec
+            sont journalisées et ignorées)
+    """
+    first, remaining = fetch_matching_page(token, campaign_id, 0, page_size)
+    total = len(first) + remaining
+
+    cursors = list(range(len(first), total, page_size)) if first else []
+
+    log_event('leonar_pagination_start', {'total': total, 'pages': len(cursors) + 1})
+
+    if not cursors:
+        yield 1, first, total
+        return
+
+    failed = 0
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(int(max_workers), len(cursors))),
+        thread_name_prefix='leonar_page'
+    )
+    try:
+        # Pages suivantes lancées avant de livrer la première
+        futures = {
+            executor.submit(fetch_matching_page, token, campaign_id, cursor, page_size): page
+            for page, cursor in enumerate(cursors, start=2)
+        }
+        yield 1, first, total
+
+        for future in as_completed(futures):
+            page = futures[future]
+            try:
+                results, _ = future.result()
+            except Exception as e:
+                failed += 1
+                log_error('leonar_page_error', str(e), {'page': page})
+                continue
+            yield page, results, total
+    finally:
+        # Consommateur arrêté en cours de route : ne pas récupérer les pages restantes
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    log_event('leonar_pagination_done', {'total': total, 'pages': len(cursors) + 1, 'failed_pages': failed})
+
+
+def update_matching(token, prospect_id, fields):
+    """
+    Met à jour les champs d'un prospect (objet 'matching')
+
+    La Data API Bubble n'a pas d'endpoint bulk pour les mises à jour
+    (/bulk ne fait que des créations) : un PATCH par prospect.
+
+    Args:
+        token (str): Token Leonar
+        prospect_id (str): ID du prospect
+        fields (dict): Champs à mettre à jour
+
+    Raises:
+        LeonarAPIError: Si le statut HTTP n'est pas 200/204
+    """
+    with limiter.slot('leonar'):
+        r = http.patch(
+            f'{LEONAR_API_URL}/obj/matching/{prospect_id}',
+            headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+            json=fields,
+            timeout=10
+        )
+
+    if r.status_code not in (200, 204):
+        raise LeonarAPIError(r.status_code, r.text[:200])
@@ -0,0 +1,150 @@
+"""
+Gestion du token d'authentification Leonar
+Token en mémoire (+ disque optionnel), suivi de l'expiration, rafraîchissement anticipé
+Version: 1.0
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from prospection_utils.http_client import http
+from prospection_utils.logger import log_event, log_error
+
+LEONAR_AUTH_URL = 'https://dashboard.leonar.app/api/1.1/wf/auth'
+TOKEN_CACHE_FILE = '.leonar_token.json'
+
+# Durée de vie si Leonar ne renvoie pas 'expires' (secondes)
+DEFAULT_TOKEN_TTL = 12 * 3600
+# Rafraîchir le token quand il reste moins de REFRESH_MARGIN secondes
+REFRESH_MARGIN = 15 * 60
+
+
+class LeonarTokenManager:
+    """Token Leonar partagé (thread-safe), ré-authentifie seulement si nécessaire"""
+
+    def __init__(self, email, password, cache_file=TOKEN_CACHE_FILE):
+        """
+        Args:
+            email (str): Email du compte Leonar
+            password (str): Mot de passe
+            cache_file (str): Fichier de cache disque (None = mémoire uniquement)
+        """
+        self.email = email
+        self.password = password
+        self.cache_file = cache_file
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+        # Identifie le compte dans le fichier sans y écrire l'email en clair
+        self._account_key = hashlib.sha256(f"{email}".encode('utf-8')).hexdigest()[:16]
+        self._load_from_disk()
+
+    def get_token(self, force_refresh=False):
+        """
+        Retourne un token valide (login seulement si absent, expiré ou bientôt expiré)
+
+        Args:
+            force_refresh (bool): Forcer une ré-authentification
+
+        Returns:
+            str: Token, ou None si l'authentification échoue
+        """
+        if not self.email or not self.password:
+            return None
+
+        with self._lock:
+            if force_refresh or time.time() > self._expires_at - REFRESH_MARGIN:
+                self._login()
+            return self._token
+
+    def invalidate(self):
+        """Oublie le token (ex: après un 401) - le prochain get_token() se ré-authentifie"""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0
+            self._save_to_disk()
+
+    def seconds_left(self):
+        """Durée de validité restante du token (secondes)"""
+        return max(0, int(self._expires_at - time.time())) if self._token else 0
+
+    def _login(self):
+        try:
+            r = http.post(
+                LEONAR_AUTH_URL,
+                json={"email": self.email, "password": self.password},
+                timeout=10
+            )
+            if r.status_code != 200:
+                log_error('leonar_auth_error', f"status {r.status_code}", {})
+                # Garder un token encore valide plutôt que de le perdre
+                if time.time() >= self._expires_at:
+                    self._token = None
+                return
+
+            response = r.json()['response']
+            self._token = response['token']
+            self._expires_at = time.time() + float(response.get('expires') or DEFAULT_TOKEN_TTL)
+            self._save_to_disk()
+            log_event('leonar_token_refreshed', {'expires_in': self.seconds_left()})
+
+        except Exception as e:
+            log_error('leonar_auth_error', str(e), {})
+            if time.time() >= self._expires_at:
+                self._token = None
+
+    def _load_from_disk(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f).get(self._account_key)
+            if data and data.get('expires_at', 0) > time.time():
+                self._token = data['token']
+                self._expires_at = data['expires_at']
+        except (OSError, ValueError):
+            pass
+
+    def _save_to_disk(self):
+        if not self.cache_file:
+            return
+        try:
+            data = {}
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            data[self._account_key] = {'token': self._token, 'expires_at': self._expires_at}
+
+            # Fichier lisible uniquement par l'utilisateur courant
+            fd = os.open(self.cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+        except (OSError, ValueError) as e:
+            log_error('leonar_token_cache_error', str(e), {})
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_token_manager(email, password, cache_file=TOKEN_CACHE_FILE):
+    """
+    Retourne le gestionnaire de token du compte (un seul par process)
+
+    Args:
+        email (str): Email Leonar
+        password (str): Mot de passe Leonar
+        cache_file (str): Fichier de cache disque (None = mémoire uniquement)
+
+    Returns:
+        LeonarTokenManager
+    """
+    with _managers_lock:
+        manager = _managers.get(email)
+        if manager is None or manager.password != password:
+            manager = LeonarTokenManager(email, password, cache_file=cache_file)
+            _managers[email] = manager
+        return manager
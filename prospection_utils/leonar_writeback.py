@@ -0,0 +1,220 @@
+"""
+Export des séquences vers Leonar en arrière-plan
+File d'export à concurrence bornée, statuts HTTP vérifiés, file de retry
+persistante rejouée au run suivant
+Version: 1.0
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from prospection_utils.disk_cache import CACHE_DIR
+from prospection_utils.leonar_api import update_matching, LeonarAPIError
+from prospection_utils.logger import log_event, log_error
+
+RETRY_QUEUE_FILE = os.path.join(CACHE_DIR, 'leonar_retry_queue.jsonl')
+
+# Au-delà, l'entrée reste dans la file mais n'est plus rejouée automatiquement
+MAX_ATTEMPTS = 10
+
+
+class LeonarWriteback:
+    """
+    Exporte les séquences générées sans bloquer les workers de génération
+
+    Chaque export est un PATCH (statut vérifié). Un export en échec est écrit
+    dans la file de retry sur disque : aucune séquence générée n'est perdue.
+    """
+
+    def __init__(self, token_manager, max_workers=4, queue_file=RETRY_QUEUE_FILE):
+        """
+        Args:
+            token_manager (LeonarTokenManager): Fournit le token (rafraîchi si besoin)
+            max_workers (int): Exports simultanés (le slot 'leonar' s'applique en plus)
+            queue_file (str): Fichier JSONL de la file de retry
+        """
+        self.token_manager = token_manager
+        self.queue_file = queue_file
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix='leonar_export')
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self.stats = {'ok': 0, 'queued_for_retry': 0}
+
+    def submit(self, prospect_id, fields, on_done=None, attempts=0):
+        """
+        Met un export en file (retour immédiat)
+
+        Args:
+            prospect_id (str): ID du prospect Leonar
+            fields (dict): Champs à écrire
+            on_done (callable): on_done(prospect_id, status, fields) appelé dans
+                le thread d'export - status : 'ok', 'queued_for_retry' ou 'lost'
+            attempts (int): Tentatives déjà effectuées (rejeu de la file)
+
+        Returns:
+            Future
+        """
+        future = self._executor.submit(self._export, prospect_id, fields, on_done, attempts)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _export(self, prospect_id, fields, on_done, attempts):
+        try:
+            self._patch(prospect_id, fields)
+            status = 'ok'
+        except Exception as e:
+            log_error('leonar_export_error', str(e), {'prospect_id': prospect_id, 'attempts': attempts + 1})
+            status = 'queued_for_retry' if self._enqueue(prospect_id, fields, attempts + 1, str(e)) else 'lost'
+
+        with self._lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+        if on_done:
+            on_done(prospect_id, status, fields)
+        return status
+
+    def _patch(self, prospect_id, fields):
+        token = self.token_manager.get_token()
+        if not token:
+            raise LeonarAPIError(401, 'pas de token')
+        try:
+            update_matching(token, prospect_id, fields)
+        except LeonarAPIError as e:
+            if e.status_code != 401:
+                raise
+            # Token révoqué : une seule nouvelle tentative avec un token neuf
+            self.token_manager.invalidate()
+            update_matching(self.token_manager.get_token(), prospect_id, fields)
+
+    def _enqueue(self, prospect_id, fields, attempts, error):
+        entry = {
+            'prospect_id': prospect_id,
+            'fields': fields,
+            'attempts': attempts,
+            'last_error': error[:300],
+            'queued_at': time.time()
+        }
+        try:
+            with self._file_lock:
+                os.makedirs(os.path.dirname(self.queue_file) or '.', exist_ok=True)
+                with open(self.queue_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            return True
+        except OSError as e:
+            log_error('leonar_retry_queue_error', str(e), {'prospect_id': prospect_id})
+            return False
+
+    def flush(self, timeout=None):
+        """
+        Attend la fin des exports en cours
+
+        Returns:
+            dict: Compteurs {'ok', 'queued_for_retry', ...} depuis la création
+        """
+        with self._lock:
+            pending = set(self._futures)
+        if pending:
+            wait(pending, timeout=timeout)
+
+        log_event('leonar_export_flush', dict(self.stats))
+        return dict(self.stats)
+
+    def pending_retries(self):
+        """Nombre d'exports en attente dans la file de retry"""
+        return len(self._read_queue(self.queue_file)) + len(self._read_queue(self._replaying_file))
+
+    @property
+    def _replaying_file(self):
+        return f"{self.queue_file}.replaying"
+
+    def _read_queue(self, path):
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with self._file_lock:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        log_error('leonar_retry_queue_error', 'ligne illisible', {'file': path})
+        return entries
+
+    def _write_queue(self, path, entries):
+        # Écriture atomique (fichier temporaire + rename)
+        with self._file_lock:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_file = f"{path}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp_file, path)
+
+    def replay_queue(self, on_done=None):
+        """
+        Rejoue la file de retry (à appeler au début d'un run)
+
+        Les entrées rejouées sont déplacées dans un fichier '.replaying' supprimé
+        une fois tous les exports terminés : un arrêt en cours de rejeu ne perd
+        rien (elles seront rejouées au run suivant, le PATCH est idempotent).
+        Les échecs sont réécrits dans la file par _export. Les entrées au-delà
+        de MAX_ATTEMPTS restent dans la file sans être rejouées.
+
+        Returns:
+            int: Nombre d'exports resoumis
+        """
+        entries = self._read_queue(self._replaying_file) + self._read_queue(self.queue_file)
+        if not entries:
+            return 0
+
+        # Dernière version par prospect (une séquence régénérée remplace l'ancienne)
+        latest = {}
+        for entry in entries:
+            latest[entry['prospect_id']] = entry
+
+        to_replay = [e for e in latest.values() if e.get('attempts', 0) < MAX_ATTEMPTS]
+        kept = [e for e in latest.values() if e.get('attempts', 0) >= MAX_ATTEMPTS]
+
+        self._write_queue(self._replaying_file, to_replay)
+        self._write_queue(self.queue_file, kept)
+
+        futures = [
+            self.submit(entry['prospect_id'], entry['fields'], on_done=on_done, attempts=entry.get('attempts', 0))
+            for entry in to_replay
+        ]
+
+        remaining = [len(futures)]
+        remaining_lock = threading.Lock()
+
+        def remove_replaying_file():
+            with self._file_lock:
+                if os.path.exists(self._replaying_file):
+                    os.remove(self._replaying_file)
+
+        def on_replayed(future):
+            with remaining_lock:
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                remove_replaying_file()
+
+        if not futures:
+            remove_replaying_file()
+        for future in futures:
+            future.add_done_callback(on_replayed)
+
+        log_event('leonar_retry_queue_replay', {'replayed': len(to_replay), 'abandoned': len(kept)})
+        return len(to_replay)
@@ -0,0 +1,187 @@
+"""
+Génération par lots via l'API Message Batches d'Anthropic
+Soumission d'une campagne en un batch, suivi, lecture des résultats, reprise
+d'un batch en cours après redémarrage
+Version: 1.0
+"""
+
+import json
+import os
+import re
+import time
+
+from prospection_utils.disk_cache import CACHE_DIR
+from prospection_utils.logger import log_event, log_error
+
+# Limite de l'API par batch (un batch plus gros est découpé)
+MAX_BATCH_REQUESTS = 10000
+
+DEFAULT_POLL_INTERVAL = 60  # secondes
+
+# Batchs soumis mais pas encore exportés (reprise après redémarrage de l'app)
+MANIFEST_DIR = os.path.join(CACHE_DIR, 'message_batches')
+
+# custom_id : 1 à 64 caractères [a-zA-Z0-9_-]
+_CUSTOM_ID_INVALID = re.compile(r'[^a-zA-Z0-9_-]')
+
+# Tests : ANTHROPIC_BASE_URL=http://127.0.0.1:8765 (voir stub_anthropic_batches.py),
+# lu directement par anthropic.Anthropic()
+
+
+def batches_api(client):
+    """
+    Ressource batches du client (GA si disponible, sinon beta selon la version du SDK)
+
+    Args:
+        client: anthropic.Anthropic
+
+    Returns:
+        Ressource avec create / retrieve / results
+    """
+    messages = client.messages
+    if hasattr(messages, 'batches'):
+        return messages.batches
+    return client.beta.messages.batches
+
+
+def make_custom_id(value):
+    """custom_id valide pour l'API à partir d'un ID prospect"""
+    return _CUSTOM_ID_INVALID.sub('_', str(value))[:64] or 'request'
+
+
+def submit_batches(client, requests):
+    """
+    Soumet des requêtes messages.create en un ou plusieurs batchs
+
+    Args:
+        client: anthropic.Anthropic
+        requests (list): [{'custom_id': str, 'params': dict messages.create}]
+
+    Returns:
+        list: [(batch_id, [custom_id du batch])]
+    """
+    api = batches_api(client)
+    submitted = []
+
+    for i in range(0, len(requests), MAX_BATCH_REQUESTS):
+        chunk = requests[i:i + MAX_BATCH_REQUESTS]
+        batch = api.create(requests=chunk)
+        submitted.append((batch.id, [request['custom_id'] for request in chunk]))
+        log_event('message_batch_submitted', {'batch_id': batch.id, 'requests': len(chunk)})
+
+    return submitted
+
+
+def wait_for_batch(client, batch_id, poll_interval=DEFAULT_POLL_INTERVAL, timeout=None, on_poll=None):
+    """
+    Attend la fin d'un batch (processing_status == 'ended')
+
+    Args:
+        client: anthropic.Anthropic
+        batch_id (str): ID du batch
+        poll_interval (float): Intervalle entre deux vérifications (secondes)
+        timeout (float): Délai max (None = pas de limite)
+        on_poll (callable): on_poll(batch) après chaque vérification
+
+    Returns:
+        Batch terminé, ou None si le délai est dépassé
+    """
+    api = batches_api(client)
+    start = time.time()
+
+    while True:
+        batch = api.retrieve(batch_id)
+        if on_poll:
+            on_poll(batch)
+        if batch.processing_status == 'ended':
+            log_event('message_batch_ended', {
+                'batch_id': batch_id,
+                'counts': _counts(batch),
+                'wait_seconds': round(time.time() - start)
+            })
+            return batch
+        if timeout is not None and time.time() - start > timeout:
+            log_event('message_batch_wait_timeout', {'batch_id': batch_id})
+            return None
+        time.sleep(poll_interval)
+
+
+def _counts(batch):
+    counts = getattr(batch, 'request_counts', None)
+    if counts is None:
+        return {}
+    return {
+        name: getattr(counts, name, 0)
+        for name in ('processing', 'succeeded', 'errored', 'canceled', 'expired')
+    }
+
+
+def iter_batch_results(client, batch_id):
+    """
+    Résultats d'un batch terminé
+
+    Yields:
+        tuple: (custom_id, message ou None, erreur str ou None)
+    """
+    api = batches_api(client)
+    for entry in api.results(batch_id):
+        result = entry.result
+        if result.type == 'succeeded':
+            yield entry.custom_id, result.message, None
+        else:
+            error = getattr(result, 'error', None)
+            detail = getattr(getattr(error, 'error', None), 'message', None) or str(error or result.type)
+            log_error('message_batch_request_failed', detail, {'custom_id': entry.custom_id, 'type': result.type})
+            yield entry.custom_id, None, f"{result.type}: {detail}"
+
+
+# ========================================
+# MANIFESTES (REPRISE APRÈS REDÉMARRAGE)
+# ========================================
+
+def _manifest_path(batch_id):
+    return os.path.join(MANIFEST_DIR, f"{make_custom_id(batch_id)}.json")
+
+
+def save_manifest(batch_id, contexts, meta=None):
+    """
+    Enregistre ce qu'il faut pour exploiter les résultats d'un batch plus tard
+
+    Args:
+        batch_id (str): ID du batch
+        contexts (dict): {custom_id: contexte JSON de finalisation}
+        meta (dict): Informations libres (campagne, date...)
+    """
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    tmp_file = f"{_manifest_path(batch_id)}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'batch_id': batch_id,
+            'submitted_at': time.time(),
+            'meta': meta or {},
+            'contexts': contexts
+        }, f, ensure_ascii=False)
+    os.replace(tmp_file, _manifest_path(batch_id))
+
+
+def load_pending_manifests():
+    """Batchs soumis dont les résultats n'ont pas encore été exportés"""
+    if not os.path.isdir(MANIFEST_DIR):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(MANIFEST_DIR)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(MANIFEST_DIR, name), 'r', encoding='utf-8') as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError) as e:
+            log_error('message_batch_manifest_error', str(e), {'file': name})
+    return manifests
+
+
+def remove_manifest(batch_id):
+    """Supprime le manifeste d'un batch entièrement exporté"""
+    path = _manifest_path(batch_id)
+    if os.path.exists(path):
+        os.remove(path)
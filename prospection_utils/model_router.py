@@ -0,0 +1,132 @@
+"""
+Routage des appels Claude par niveau de modèle
+Les cas simples (extraction de hooks, CAS C sans hook, prospect sans posts ni
+actualités) vont au petit modèle, les cas riches au grand modèle
+Version: 1.0
+"""
+
+from prospection_utils.logger import log_event
+
+# Niveau utilisé quand le routage est désactivé (comportement historique)
+DEFAULT_TIER = 'large'
+
+DEFAULT_MODEL_TIERS = {
+    'small': "claude-3-5-haiku-20241022",
+    'large': "claude-sonnet-4-20250514"
+}
+
+# Seuils à partir desquels un cas part au grand modèle
+DEFAULT_THRESHOLDS = {
+    'hook_score': 3,   # Icebreaker : hook pertinent (CAS A)
+    'posts': 1,        # Séquence : posts LinkedIn récents
+    'web_results': 1   # Séquence : actualités web récentes
+}
+
+# Tokens de sortie max par famille de modèle (préfixe du nom, le plus long l'emporte)
+MODEL_MAX_OUTPUT_TOKENS = {
+    'claude-3-haiku': 4096,
+    'claude-3-5-haiku': 8192,
+    'claude-3-5-sonnet': 8192,
+    'claude-3-7-sonnet': 64000,
+    'claude-sonnet-4': 64000,
+    'claude-opus-4': 32000
+}
+# Modèle inconnu : plafond prudent
+DEFAULT_MAX_OUTPUT_TOKENS = 8192
+
+_model_tiers = dict(DEFAULT_MODEL_TIERS)
+_thresholds = dict(DEFAULT_THRESHOLDS)
+_enabled = True
+
+
+def configure(model_tiers=None, enabled=None, thresholds=None):
+    """
+    Applique la configuration (config.CLAUDE_MODEL_TIERS / MODEL_ROUTING_*)
+
+    Args:
+        model_tiers (dict): {'small': modèle, 'large': modèle}
+        enabled (bool): False = tout au grand modèle
+        thresholds (dict): Seuils 'hook_score', 'posts', 'web_results'
+    """
+    global _enabled
+    if model_tiers:
+        _model_tiers.update(model_tiers)
+    if enabled is not None:
+        _enabled = enabled
+    if thresholds:
+        _thresholds.update(thresholds)
+
+
+def tier_model(tier):
+    """Modèle configuré pour un niveau ('small' / 'large')"""
+    return _model_tiers.get(tier) or _model_tiers[DEFAULT_TIER]
+
+
+def max_output_tokens(model):
+    """max_tokens maximal accepté par le modèle (400 au-delà)"""
+    prefixes = [prefix for prefix in MODEL_MAX_OUTPUT_TOKENS if (model or '').startswith(prefix)]
+    if not prefixes:
+        return DEFAULT_MAX_OUTPUT_TOKENS
+    return MODEL_MAX_OUTPUT_TOKENS[max(prefixes, key=len)]
+
+
+def _choose_tier(task, posts_count, web_count, hook_score, has_job_description):
+    """Retourne (niveau, raison)"""
+    if task == 'extract_hooks':
+        # Extraction structurée (JSON) : pas de rédaction
+        return 'small', 'extraction'
+
+    if task == 'hooks_and_icebreaker':
+        # Hooks + rédaction en un appel : le message s'appuie sur les posts
+        if posts_count >= _thresholds['posts']:
+            return 'large', 'posts récents'
+        return 'small', 'pas de posts'
+
+    if task == 'icebreaker':
+        if hook_score is not None and hook_score >= _thresholds['hook_score']:
+            return 'large', 'hook pertinent'
+        return 'small', 'hook faible ou absent'
+
+    # Séquence : rédaction personnalisée seulement si le prospect a de la matière
+    if posts_count >= _thresholds['posts']:
+        return 'large', 'posts récents'
+    if web_count >= _thresholds['web_results']:
+        return 'large', 'actualités web'
+    if not has_job_description:
+        return 'small', 'ni posts, ni actualités, ni fiche'
+    return 'small', 'fiche seule'
+
+
+def route_model(task, posts_count=0, web_count=0, hook_score=None, has_job_description=True, prospect=None):
+    """
+    Choisit le modèle d'un appel selon la richesse des données disponibles
+
+    Args:
+        task (str): 'extract_hooks', 'icebreaker', 'hooks_and_icebreaker' ou 'sequence'
+        posts_count (int): Posts LinkedIn récents
+        web_count (int): Résultats web récents
+        hook_score (float): Score du meilleur hook (select_best_hook)
+        has_job_description (bool): Fiche de poste disponible
+        prospect (str): Identifiant pour les logs
+
+    Returns:
+        str: Modèle Claude
+    """
+    if _enabled:
+        tier, reason = _choose_tier(task, posts_count, web_count, hook_score, has_job_description)
+    else:
+        tier, reason = DEFAULT_TIER, 'routage désactivé'
+
+    model = tier_model(tier)
+    log_event('model_routed', {
+        'task': task,
+        'tier': tier,
+        'model': model,
+        'reason': reason,
+        'posts': posts_count,
+        'web': web_count,
+        'hook_score': hook_score,
+        'has_job_description': has_job_description,
+        'prospect': prospect
+    })
+    return model
@@ -0,0 +1,199 @@
+"""
+Pipeline concurrent pour le traitement des prospects
+Plusieurs prospects en vol + limites de concurrence par service externe
+Version: 1.0
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+from prospection_utils.logger import log_event, log_error
+
+# Limites par défaut (surchargées par config.CONCURRENCY_LIMITS)
+DEFAULT_SERVICE_LIMITS = {
+    'apify': 3,
+    'serper': 5,
+    'job_boards': 4,
+    'anthropic': 2,
+    'leonar': 4
+}
+
+
+class ServiceLimiter:
+    """Limite le nombre d'appels simultanés vers chaque service externe"""
+
+    def __init__(self, limits=None):
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self.limits = dict(DEFAULT_SERVICE_LIMITS)
+        if limits:
+            self.limits.update(limits)
+
+    def configure(self, limits):
+        """
+        Met à jour les limites par service
+
+        Args:
+            limits (dict): {nom_service: nb_appels_simultanés}
+        """
+        with self._lock:
+            for service, limit in limits.items():
+                if self.limits.get(service) != limit:
+                    self.limits[service] = limit
+                    # Le prochain slot() utilisera le nouveau sémaphore
+                    self._semaphores.pop(service, None)
+
+    def _get_semaphore(self, service):
+        with self._lock:
+            if service not in self._semaphores:
+                limit = max(1, int(self.limits.get(service, 1)))
+                self._semaphores[service] = threading.BoundedSemaphore(limit)
+            return self._semaphores[service]
+
+    @contextmanager
+    def slot(self, service):
+        """
+        Réserve un slot pour un appel au service (bloque si la limite est atteinte)
+
+        Args:
+            service (str): 'apify', 'serper', 'job_boards', 'anthropic', 'leonar'
+        """
+        semaphore = self._get_semaphore(service)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+# Instance globale partagée par tous les workers
+limiter = ServiceLimiter()
+
+# Pool dédié aux étapes I/O d'un prospect (séparé du pool des prospects
+# pour éviter qu'un worker attende un thread de son propre pool)
+_stage_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='stage')
+
+
+def run_concurrent(items, worker, max_workers=4, on_result=None, thread_initializer=None):
+    """
+    Exécute worker(index, item) sur chaque item avec au plus max_workers en vol
+
+    Les items sont consommés au fil de l'eau : un générateur peut alimenter
+    le pipeline pendant que les premiers items sont déjà traités.
+
+    Args:
+        items (iterable): Items à traiter (liste ou générateur)
+        worker (callable): Fonction worker(index, item) -> résultat
+        max_workers (int): Nombre d'items traités en parallèle (1 = séquentiel)
+        on_result (callable): Callback on_result(index, result, error) appelé
+            dans le thread appelant, dans l'ordre de complétion
+        thread_initializer (callable): Initialisation de chaque thread worker
+
+    Returns:
+        list: Résultats dans l'ordre des items (None si le worker a levé une exception)
+    """
+    max_workers = max(1, int(max_workers))
+    results = {}
+    iterator = enumerate(items)
+    pending = {}
+
+    log_event('pipeline_start', {'max_workers': max_workers})
+
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=thread_initializer) as executor:
+
+        def submit_next():
+            # Garder au plus max_workers items en vol
+            while len(pending) < max_workers:
+                try:
+                    index, item = next(iterator)
+                except StopIteration:
+                    return
+                pending[executor.submit(worker, index, item)] = index
+
+        submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index = pending.pop(future)
+                error = future.exception()
+                result = None if error else future.result()
+
+                if error:
+                    log_error('pipeline_worker_error', str(error), {'index': index})
+
+                results[index] = result
+                if on_result:
+                    on_result(index, result, error)
+
+            submit_next()
+
+    log_event('pipeline_done', {'items': len(results)})
+
+    return [results[i] for i in sorted(results)]
+
+
+def fan_out(tasks, timeout=None, defaults=None):
+    """
+    Lance plusieurs étapes indépendantes en parallèle et attend qu'elles
+    terminent (ou expirent)
+
+    Args:
+        tasks (dict): {nom_étape: callable sans argument}
+        timeout (float): Délai max global en secondes (None = pas de limite)
+        defaults (dict): {nom_étape: valeur} utilisée si l'étape expire ou échoue
+
+    Returns:
+        tuple: (results dict, timings dict en secondes)
+    """
+    defaults = defaults or {}
+    results = {}
+    timings = {}
+    start = time.perf_counter()
+
+    futures = {}
+    for name, fn in tasks.items():
+        futures[_stage_executor.submit(_run_timed, fn)] = name
+
+    done, not_done = wait(futures, timeout=timeout)
+
+    for future in done:
+        name = futures[future]
+        error = future.exception()
+        if error:
+            log_error('stage_error', str(error), {'stage': name})
+            results[name] = defaults.get(name)
+            timings[name] = round(time.perf_counter() - start, 2)
+        else:
+            value, elapsed = future.result()
+            results[name] = value
+            timings[name] = round(elapsed, 2)
+
+    timed_out = []
+    for future in not_done:
+        name = futures[future]
+        # Le thread continue en arrière-plan, son résultat est ignoré
+        future.cancel()
+        results[name] = defaults.get(name)
+        timings[name] = round(time.perf_counter() - start, 2)
+        timed_out.append(name)
+
+    if timings:
+        log_event('prospect_stage_timings', {
+            'timings': timings,
+            'critical_path': max(timings, key=timings.get),
+            'timed_out': timed_out,
+            'wall_time': round(time.perf_counter() - start, 2)
+        })
+
+    return results, timings
+
+
+def _run_timed(fn):
+    """Exécute fn et retourne (résultat, durée en secondes)"""
+    t0 = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - t0
@@ -0,0 +1,186 @@
+"""
+Registre des prospects traités (SQLite, WAL)
+Recherche indexée, écritures concurrentes sûres (threads et instances),
+import unique de l'ancien processed_prospects.txt
+Version: 1.0
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from prospection_utils.disk_cache import make_key
+from prospection_utils.logger import log_event
+
+STORE_FILE = os.getenv('PROSPECTION_PROCESSED_DB', 'processed_prospects.sqlite3')
+LEGACY_FILE = 'processed_prospects.txt'
+
+# Limite SQLite du nombre de paramètres d'une requête (IN (...))
+_MAX_SQL_PARAMS = 900
+
+
+def sequence_hash(fields):
+    """Empreinte de la séquence exportée (détecte une régénération différente)"""
+    return make_key(fields)[:16]
+
+
+class ProcessedStore:
+    """Prospects déjà traités : id, campagne, date, empreinte de séquence, statut"""
+
+    def __init__(self, path=STORE_FILE, legacy_file=LEGACY_FILE):
+        """
+        Args:
+            path (str): Fichier SQLite
+            legacy_file (str): Ancien fichier texte (un id par ligne) importé une fois
+        """
+        self.path = path
+        self.legacy_file = legacy_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self):
+        # Une connexion par thread (sqlite3 n'autorise pas le partage par défaut)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._init_schema(conn)
+        return conn
+
+    def _init_schema(self, conn):
+        with self._lock:
+            if self._initialized:
+                return
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS processed (
+                    prospect_id TEXT PRIMARY KEY,
+                    campaign TEXT,
+                    processed_at REAL NOT NULL,
+                    sequence_hash TEXT,
+                    status TEXT NOT NULL
+                )
+            """)
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_processed_campaign ON processed (campaign, processed_at)'
+            )
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._import_legacy(conn)
+            self._initialized = True
+
+    def _import_legacy(self, conn):
+        # BEGIN IMMEDIATE : une seule instance fait l'import si plusieurs démarrent ensemble
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            done = conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone()
+            imported = 0
+            if not done and self.legacy_file and os.path.exists(self.legacy_file):
+                with open(self.legacy_file, 'r') as f:
+                    ids = {line.strip() for line in f if line.strip()}
+                now = time.time()
+                conn.executemany(
+                    'INSERT OR IGNORE INTO processed (prospect_id, campaign, processed_at, sequence_hash, status) '
+                    "VALUES (?, NULL, ?, NULL, 'imported')",
+                    [(pid, now) for pid in ids]
+                )
+                imported = len(ids)
+            if not done:
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)",
+                    (str(time.time()),)
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if imported:
+            log_event('processed_store_legacy_import', {'file': self.legacy_file, 'count': imported})
+
+    def is_processed(self, prospect_id):
+        """Recherche indexée (clé primaire)"""
+        row = self._conn().execute(
+            'SELECT 1 FROM processed WHERE prospect_id = ?', (prospect_id,)
+        ).fetchone()
+        return row is not None
+
+    def processed_among(self, prospect_ids):
+        """
+        Retourne les ids déjà traités parmi prospect_ids (une requête par page)
+
+        Args:
+            prospect_ids (list): Ids à vérifier
+
+        Returns:
+            set: Ids déjà traités
+        """
+        prospect_ids = list(prospect_ids)
+        found = set()
+        conn = self._conn()
+        for i in range(0, len(prospect_ids), _MAX_SQL_PARAMS):
+            chunk = prospect_ids[i:i + _MAX_SQL_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT prospect_id FROM processed WHERE prospect_id IN ({placeholders})', chunk
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        return found
+
+    def mark(self, prospect_id, campaign=None, seq_hash=None, status='exported'):
+        """
+        Enregistre (ou met à jour) un prospect traité
+
+        Args:
+            prospect_id (str): ID Leonar
+            campaign (str): ID de la campagne
+            seq_hash (str): Empreinte de la séquence (voir sequence_hash)
+            status (str): 'exported', 'queued_for_retry', 'batch_pending', 'imported'...
+        """
+        self._conn().execute(
+            'INSERT INTO processed (prospect_id, campaign, processed_at, sequence_hash, status) '
+            'VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(prospect_id) DO UPDATE SET '
+            'campaign = COALESCE(excluded.campaign, campaign), processed_at = excluded.processed_at, '
+            'sequence_hash = COALESCE(excluded.sequence_hash, sequence_hash), status = excluded.status',
+            (prospect_id, campaign, time.time(), seq_hash, status)
+        )
+
+    def forget(self, prospect_id):
+        """Retire un prospect du registre (il sera retraité au prochain run)"""
+        self._conn().execute('DELETE FROM processed WHERE prospect_id = ?', (prospect_id,))
+
+    def count(self, campaign=None):
+        """Nombre de prospects traités (toutes campagnes si campaign=None)"""
+        if campaign is None:
+            row = self._conn().execute('SELECT COUNT(*) FROM processed').fetchone()
+        else:
+            row = self._conn().execute(
+                'SELECT COUNT(*) FROM processed WHERE campaign = ?', (campaign,)
+            ).fetchone()
+        return row[0]
+
+    def reset(self, campaign=None):
+        """
+        Oublie les prospects traités (tous, ou ceux d'une campagne)
+        L'ancien fichier texte n'est pas réimporté.
+
+        Returns:
+            int: Nombre de lignes supprimées
+        """
+        conn = self._conn()
+        if campaign is None:
+            cursor = conn.execute('DELETE FROM processed')
+        else:
+            cursor = conn.execute('DELETE FROM processed WHERE campaign = ?', (campaign,))
+        log_event('processed_store_reset', {'campaign': campaign, 'deleted': cursor.rowcount})
+        return cursor.rowcount
+
+
+# Instance globale partagée
+processed_store = ProcessedStore()
@@ -0,0 +1,235 @@
+"""
+Budget de tokens des entrées du prompt
+Estimation locale des tokens, sections de la fiche classées par pertinence
+(missions et profil avant présentation de l'entreprise et avantages) et
+coupe en fin de phrase pour tenir dans le budget configuré
+Version: 1.0
+"""
+
+import re
+
+from prospection_utils.rate_limiter import CHARS_PER_TOKEN
+
+# Budget total des données variables du prompt (fiche + posts + web), en tokens
+DEFAULT_INPUT_BUDGET = 1500
+
+# Répartition du budget ; la part non utilisée d'une entrée revient aux autres
+DEFAULT_SHARES = {
+    'job_description': 0.5,
+    'posts': 0.3,
+    'web': 0.2
+}
+
+# Plafond par post (un long post ne doit pas évincer les suivants)
+DEFAULT_MAX_TOKENS_PER_POST = 150
+
+_input_budget = DEFAULT_INPUT_BUDGET
+_shares = dict(DEFAULT_SHARES)
+_max_tokens_per_post = DEFAULT_MAX_TOKENS_PER_POST
+
+ELLIPSIS = ' […]'
+
+# Rang des sections de fiche (0 = gardée en priorité). Le premier motif qui
+# correspond au titre de la section l'emporte ; sans titre reconnu : DEFAULT_RANK
+SECTION_RANKS = [
+    (0, r'missions?|responsabilit|vos? r[ôo]les?|le poste|descriptif du poste|descriptif|activit[ée]s|t[âa]ches'),
+    (1, r'profil|comp[ée]tences|qualifications?|exp[ée]rience requise|pr[ée]requis|savoir[- ]faire|vous [êe]tes'),
+    (2, r'contexte|environnement|[ée]quipe|rattach|p[ée]rim[èe]tre|outils'),
+    (4, r'qui sommes[- ]nous|[àa] propos|l.entreprise|notre (soci[ée]t[ée]|groupe|cabinet|client)|pr[ée]sentation'),
+    (5, r'avantages|r[ée]mun[ée]ration|salaire|package|t[ée]l[ée]travail|mutuelle|tickets?[- ]resto|rtt'),
+    (5, r'processus de recrutement|process|[ée]tapes|entretiens?'),
+    (6, r'handicap|[ée]galit[ée]|diversit[ée]|rgpd|donn[ée]es personnelles|mentions? l[ée]gales|non[- ]discrimination')
+]
+DEFAULT_RANK = 3
+
+_SECTION_PATTERNS = [(rank, re.compile(pattern, re.IGNORECASE)) for rank, pattern in SECTION_RANKS]
+
+# Ligne de titre : courte, terminée par ":", "?" ou sans ponctuation finale
+_HEADING = re.compile(r'^\s*[#*•\-–]*\s*([^.!?\n]{2,60}?)\s*[:?]?\s*$')
+
+# Fins de phrase (coupe propre)
+_SENTENCE_END = re.compile(r'[.!?…](?=\s)|\n')
+
+
+def configure(input_budget=None, shares=None, max_tokens_per_post=None):
+    """
+    Applique la configuration (config.PROMPT_INPUT_TOKEN_BUDGET / PROMPT_BUDGET_*)
+
+    Args:
+        input_budget (int): Budget total fiche + posts + web (tokens)
+        shares (dict): Répartition {'job_description', 'posts', 'web'}
+        max_tokens_per_post (int): Plafond par post
+    """
+    global _input_budget, _max_tokens_per_post
+    if input_budget:
+        _input_budget = input_budget
+    if shares:
+        _shares.update(shares)
+    if max_tokens_per_post:
+        _max_tokens_per_post = max_tokens_per_post
+
+
+def max_tokens_per_post():
+    return _max_tokens_per_post
+
+
+def share_budget(name):
+    """Part fixe du budget d'une entrée (sans redistribution, voir allocate)"""
+    return int(_input_budget * (_shares.get(name, 0) or 0) / (sum(_shares.values()) or 1))
+
+
+def estimate_tokens(text):
+    """Estimation locale (même ratio que le limiteur de débit)"""
+    return int(len(text or '') / CHARS_PER_TOKEN) + 1 if text else 0
+
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Coupe un texte au budget, à la dernière fin de phrase (ou de mot) possible
+
+    Returns:
+        str: Texte entier s'il tient, sinon tronqué suivi de « […] »
+    """
+    text = (text or '').strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, int(max_tokens * CHARS_PER_TOKEN) - len(ELLIPSIS))
+    head = text[:max_chars]
+
+    ends = [match.end() for match in _SENTENCE_END.finditer(head)]
+    # Une fin de phrase trop tôt perdrait l'essentiel du budget : on coupe au mot
+    if ends and ends[-1] >= max_chars // 2:
+        head = head[:ends[-1]]
+    elif ' ' in head:
+        head = head.rsplit(' ', 1)[0]
+    head = head.rstrip()
+    return head + ELLIPSIS if head else ''
+
+
+def section_rank(heading):
+    """Rang de pertinence d'une section d'après son titre"""
+    for rank, pattern in _SECTION_PATTERNS:
+        if heading and pattern.search(heading):
+            return rank
+    return DEFAULT_RANK
+
+
+def split_sections(description):
+    """
+    Découpe une fiche de poste en sections (titre, texte)
+
+    Un titre est une ligne courte sans ponctuation finale dont le libellé est
+    reconnu (SECTION_RANKS) ; le texte avant le premier titre forme une section
+    sans titre.
+
+    Returns:
+        list: [(titre ou '', texte avec son titre)]
+    """
+    sections = []
+    heading, lines = '', []
+    for line in (description or '').splitlines():
+        match = _HEADING.match(line)
+        if match and section_rank(match.group(1)) != DEFAULT_RANK:
+            if any(existing.strip() for existing in lines):
+                sections.append((heading, '\n'.join(lines).strip()))
+            heading, lines = match.group(1), [line.strip()]
+        else:
+            lines.append(line)
+    if any(existing.strip() for existing in lines):
+        sections.append((heading, '\n'.join(lines).strip()))
+    return sections
+
+
+def fit_job_description(description, max_tokens):
+    """
+    Fiche de poste ramenée au budget : les sections les plus pertinentes sont
+    gardées en entier, la suivante est coupée en fin de phrase, le reste est
+    omis. L'ordre d'origine des sections est conservé.
+
+    Returns:
+        str
+    """
+    description = (description or '').strip()
+    if estimate_tokens(description) <= max_tokens:
+        return description
+
+    sections = split_sections(description)
+    by_rank = sorted(range(len(sections)), key=lambda index: (section_rank(sections[index][0]), index))
+
+    kept = {}
+    remaining = max_tokens
+    for index in by_rank:
+        text = sections[index][1]
+        cost = estimate_tokens(text) + 1
+        if cost <= remaining:
+            kept[index] = text
+            remaining -= cost
+        elif remaining >= 30:
+            # Section partielle : seulement si un morceau utile tient encore
+            kept[index] = truncate_to_tokens(text, remaining - 1)
+            remaining = 0
+        if remaining < 30:
+            break
+
+    return '\n\n'.join(kept[index] for index in sorted(kept) if kept[index])
+
+
+def fit_items(texts, max_tokens, max_tokens_per_item=None):
+    """
+    Textes (posts, résultats web) gardés dans l'ordre jusqu'au budget,
+    chacun plafonné à max_tokens_per_item et coupé en fin de phrase
+
+    Returns:
+        list: Premiers textes retenus, dans l'ordre (éventuellement tronqués)
+    """
+    kept = []
+    remaining = max_tokens
+    for text in texts:
+        if remaining < 30:
+            break
+        limit = min(remaining, max_tokens_per_item or remaining)
+        fitted = truncate_to_tokens(text, limit)
+        if not fitted:
+            break
+        kept.append(fitted)
+        remaining -= estimate_tokens(fitted)
+    return kept
+
+
+def allocate(demands, total=None, shares=None):
+    """
+    Répartit le budget entre les entrées selon leurs parts ; ce qu'une entrée
+    n'utilise pas (demande inférieure à sa part) est redistribué aux autres
+
+    Args:
+        demands (dict): {nom: tokens nécessaires pour tout envoyer}
+        total (int): Budget (défaut : configuré)
+        shares (dict): Parts (défaut : configurées)
+
+    Returns:
+        dict: {nom: budget en tokens}
+    """
+    total = _input_budget if total is None else total
+    shares = shares or _shares
+    budgets = {name: 0 for name in demands}
+    open_names = [name for name, demand in demands.items() if demand > 0]
+    remaining = total
+
+    while open_names and remaining > 0:
+        weight = sum(shares.get(name, 0) or 0 for name in open_names) or len(open_names)
+        satisfied = []
+        for name in open_names:
+            share = (shares.get(name, 0) or (weight / len(open_names))) / weight
+            budgets[name] += int(remaining * share)
+        remaining = total - sum(budgets.values())
+        for name in open_names:
+            if budgets[name] >= demands[name]:
+                satisfied.append(name)
+        if not satisfied:
+            break
+        for name in satisfied:
+            budgets[name] = demands[name]
+            open_names.remove(name)
+        remaining = total - sum(budgets.values())
+
+    return budgets
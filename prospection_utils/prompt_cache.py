@@ -0,0 +1,28 @@
+"""
+Prompt caching Anthropic
+Consignes statiques envoyées en préfixe système avec un marqueur de cache,
+seules les données du prospect changent d'un appel à l'autre
+Version: 1.0
+"""
+
+# Le préfixe doit être identique au caractère près d'un appel à l'autre (aucune
+# donnée prospect dedans). En dessous du minimum de l'API (1024 tokens pour
+# Sonnet / Opus, 2048 pour Haiku) le marqueur est ignoré sans erreur : l'appel
+# est simplement non caché. Vérification : champs cache_creation_tokens /
+# cache_read_tokens de l'événement 'claude_call' (tous deux à 0 = non caché).
+
+
+def cached_system(*texts):
+    """
+    Paramètre `system` avec un point de cache sur le dernier bloc
+
+    Args:
+        *texts (str): Blocs de consignes statiques (dans l'ordre)
+
+    Returns:
+        list: Blocs texte pour messages.create(system=...)
+    """
+    blocks = [{"type": "text", "text": text} for text in texts]
+    if blocks:
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
@@ -0,0 +1,371 @@
+"""
+Limiteur de débit adaptatif pour les appels Claude
+Seaux à jetons (requêtes, tokens d'entrée, tokens de sortie) recalés sur les
+en-têtes anthropic-ratelimit-* de chaque réponse, partagés par tous les threads
+Version: 1.0
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from prospection_utils.cost_tracker import usage_tokens, compute_cost
+from prospection_utils.logger import log_event
+
+# Estimation grossière pour le français (la vraie valeur arrive dans usage / les en-têtes)
+CHARS_PER_TOKEN = 3.5
+
+# Marge gardée sous la limite du compte (part de la capacité)
+SAFETY_MARGIN = 0.05
+
+# Pause si un 429 arrive sans en-tête retry-after (secondes)
+DEFAULT_RETRY_AFTER = 10
+
+MAX_RETRIES = 5
+
+# Erreurs passagères (surcharge, 5xx, coupure réseau) : relance locale avec
+# backoff, sans suspendre les autres threads (seul un 429 le fait)
+TRANSIENT_STATUS_CODES = (408, 409, 500, 502, 503, 504, 529)
+TRANSIENT_ERROR_NAMES = ('APIConnectionError', 'APITimeoutError')
+TRANSIENT_BACKOFF_SECONDS = 1
+MAX_TRANSIENT_BACKOFF_SECONDS = 16
+
+# Seaux suivis : nom -> préfixe des en-têtes
+BUCKET_HEADERS = {
+    'requests': 'anthropic-ratelimit-requests',
+    'input_tokens': 'anthropic-ratelimit-input-tokens',
+    'output_tokens': 'anthropic-ratelimit-output-tokens'
+}
+
+
+class StreamAborted(Exception):
+    """Levée par le callback on_text de stream_message pour interrompre le flux"""
+
+    partial_message = None  # Message partiel (usage des tokens déjà facturés), si disponible
+
+
+def _parse_reset(value):
+    """En-tête *-reset (RFC 3339) -> timestamp epoch, None si illisible"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Seau rempli en continu jusqu'à `capacity` sur une fenêtre d'une minute"""
+
+    def __init__(self, name):
+        self.name = name
+        self.capacity = None  # Inconnue tant qu'aucune réponse n'a été reçue
+        self.level = 0.0
+        self.updated_at = time.monotonic()
+
+    @property
+    def refill_rate(self):
+        return self.capacity / 60.0 if self.capacity else 0.0
+
+    def _refill(self, now):
+        if self.capacity is None:
+            return
+        usable = self.capacity * (1 - SAFETY_MARGIN)
+        self.level = min(usable, self.level + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def wait_time(self, amount, now):
+        """Secondes à attendre avant de pouvoir consommer `amount` (0 si disponible)"""
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        # Une demande plus grosse que le seau passe dès qu'il est plein
+        amount = min(amount, self.capacity * (1 - SAFETY_MARGIN))
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_rate
+
+    def consume(self, amount, now):
+        if self.capacity is None:
+            return
+        self._refill(now)
+        self.level -= amount
+
+    def update(self, limit, remaining, now):
+        """Recale le seau sur l'état annoncé par l'API"""
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None and self.capacity:
+            usable = self.capacity * (1 - SAFETY_MARGIN)
+            self.level = min(float(remaining) - self.capacity * SAFETY_MARGIN, usable)
+        self.updated_at = now
+
+
+class ClaudeRateLimiter:
+    """
+    Planifie les appels Claude pour rester juste sous les limites du compte
+
+    Avant l'appel, acquire() attend que les seaux requêtes / tokens d'entrée /
+    tokens de sortie aient assez de capacité. Après l'appel, les en-têtes
+    anthropic-ratelimit-* recalent les seaux. Un 429 suspend tous les appels
+    jusqu'à retry-after.
+    """
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._buckets = {name: TokenBucket(name) for name in BUCKET_HEADERS}
+        self._paused_until = 0.0
+        self.stats = {'calls': 0, 'waited_seconds': 0.0, 'rate_limited': 0}
+
+    def acquire(self, input_tokens, output_tokens):
+        """
+        Bloque jusqu'à ce que l'appel tienne dans les budgets, puis les réserve
+
+        Args:
+            input_tokens (int): Estimation des tokens d'entrée
+            output_tokens (int): max_tokens de l'appel
+        """
+        needs = {'requests': 1, 'input_tokens': input_tokens, 'output_tokens': output_tokens}
+        start = time.monotonic()
+
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                delay = max(
+                    [self._paused_until - now]
+                    + [self._buckets[name].wait_time(amount, now) for name, amount in needs.items()]
+                )
+                if delay <= 0:
+                    break
+                self._lock.wait(timeout=delay)
+
+            for name, amount in needs.items():
+                self._buckets[name].consume(amount, now)
+            waited = now - start
+            self.stats['calls'] += 1
+            self.stats['waited_seconds'] += waited
+
+        if waited >= 1:
+            log_event('claude_rate_limit_wait', {'seconds': round(waited, 1), 'input_tokens': input_tokens})
+
+    def update_from_headers(self, headers):
+        """Recale les seaux sur les en-têtes anthropic-ratelimit-* d'une réponse"""
+        if not headers:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for name, prefix in BUCKET_HEADERS.items():
+                limit = headers.get(f'{prefix}-limit')
+                remaining = headers.get(f'{prefix}-remaining')
+                if limit is None and remaining is None:
+                    continue
+                try:
+                    self._buckets[name].update(
+                        int(limit) if limit else None,
+                        int(remaining) if remaining is not None else None,
+                        now
+                    )
+                except ValueError:
+                    continue
+            self._lock.notify_all()
+
+    def on_rate_limited(self, headers=None):
+        """429 reçu : suspend tous les appels jusqu'à retry-after (ou la remise à zéro annoncée)"""
+        retry_after = None
+        if headers:
+            try:
+                retry_after = float(headers.get('retry-after'))
+            except (TypeError, ValueError):
+                resets = [
+                    _parse_reset(headers.get(f'{prefix}-reset'))
+                    for prefix in BUCKET_HEADERS.values()
+                ]
+                resets = [reset - time.time() for reset in resets if reset]
+                retry_after = max(resets) if resets else None
+        if retry_after is None or retry_after < 0:
+            retry_after = DEFAULT_RETRY_AFTER
+
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self.stats['rate_limited'] += 1
+        self.update_from_headers(headers)
+
+        log_event('claude_rate_limited', {'retry_after': round(retry_after, 1)})
+
+    def snapshot(self):
+        """État des seaux (affichage / debug)"""
+        with self._lock:
+            now = time.monotonic()
+            state = {}
+            for name, bucket in self._buckets.items():
+                bucket._refill(now)
+                state[name] = {
+                    'capacity': bucket.capacity,
+                    'available': round(bucket.level) if bucket.capacity else None
+                }
+            state['stats'] = dict(self.stats)
+            return state
+
+
+# Instance globale partagée par tous les threads
+claude_limiter = ClaudeRateLimiter()
+
+
+def estimate_input_tokens(params):
+    """Estimation des tokens d'entrée d'un appel messages.create"""
+    chars = 0
+    system = params.get('system')
+    if isinstance(system, str):
+        chars += len(system)
+    elif system:
+        chars += sum(len(block.get('text', '')) for block in system)
+
+    for message in params.get('messages', []):
+        content = message.get('content')
+        if isinstance(content, str):
+            chars += len(content)
+        elif content:
+            chars += sum(len(block.get('text', '')) for block in content if isinstance(block, dict))
+
+    return int(chars / CHARS_PER_TOKEN) + 1
+
+
+def _log_call(message, latency):
+    """Latence, tokens et coût de chaque appel, par modèle (mesure du routage)"""
+    usage = getattr(message, 'usage', None)
+    if usage is None:
+        return
+    tokens = usage_tokens(usage)
+    log_event('claude_call', {
+        'model': getattr(message, 'model', None),
+        'latency_s': round(latency, 2),
+        'input_tokens': tokens['input'] + tokens['cache_creation'] + tokens['cache_read'],
+        'output_tokens': tokens['output'],
+        # Tous deux à 0 : préfixe système non caché (sous le minimum du modèle)
+        'cache_creation_tokens': tokens['cache_creation'],
+        'cache_read_tokens': tokens['cache_read'],
+        'cost_usd': round(compute_cost(usage, model=getattr(message, 'model', None)), 5)
+    })
+
+
+def _without_sdk_retries(client):
+    """
+    Client sans relances internes du SDK (max_retries=2 par défaut) : chaque
+    429 remonte au limiteur partagé au lieu d'être relancé thread par thread
+    """
+    with_options = getattr(client, 'with_options', None)
+    return with_options(max_retries=0) if with_options else client
+
+
+def _is_transient(error):
+    return (
+        getattr(error, 'status_code', None) in TRANSIENT_STATUS_CODES
+        or type(error).__name__ in TRANSIENT_ERROR_NAMES
+    )
+
+
+def _handle_error(error, attempt, max_retries, limiter):
+    """
+    Décide de la relance après une erreur d'appel (lève l'erreur sinon)
+    429 : tous les threads suspendus jusqu'à retry-after ; erreur passagère : backoff local
+    """
+    if attempt == max_retries:
+        raise error
+    # anthropic.RateLimitError (sans dépendre de l'import du SDK ici)
+    if getattr(error, 'status_code', None) == 429:
+        response = getattr(error, 'response', None)
+        limiter.on_rate_limited(getattr(response, 'headers', None))
+    elif _is_transient(error):
+        delay = min(TRANSIENT_BACKOFF_SECONDS * 2 ** attempt, MAX_TRANSIENT_BACKOFF_SECONDS)
+        log_event('claude_transient_error', {'error': type(error).__name__, 'attempt': attempt + 1, 'retry_in_s': delay})
+        time.sleep(delay)
+    else:
+        raise error
+
+
+def create_message(client, limiter=None, max_retries=MAX_RETRIES, **params):
+    """
+    client.messages.create(**params) planifié par le limiteur partagé
+
+    Les en-têtes de chaque réponse recalent les budgets ; un 429 suspend
+    tous les threads jusqu'à retry-after puis l'appel est relancé. Les relances
+    internes du SDK sont désactivées : toutes passent par ici.
+
+    Args:
+        client: anthropic.Anthropic
+        limiter (ClaudeRateLimiter): Défaut : claude_limiter
+        max_retries (int): Nombre de relances (429 et erreurs passagères)
+        **params: Paramètres de messages.create
+
+    Returns:
+        Message
+    """
+    limiter = limiter or claude_limiter
+    client = _without_sdk_retries(client)
+    input_tokens = estimate_input_tokens(params)
+    output_tokens = params.get('max_tokens', 1024)
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire(input_tokens, output_tokens)
+        start = time.monotonic()
+        try:
+            raw = client.messages.with_raw_response.create(**params)
+        except Exception as e:
+            _handle_error(e, attempt, max_retries, limiter)
+            continue
+
+        limiter.update_from_headers(raw.headers)
+        message = raw.parse()
+        _log_call(message, time.monotonic() - start)
+        return message
+
+
+def stream_message(client, on_text=None, limiter=None, max_retries=MAX_RETRIES, **params):
+    """
+    Variante streaming de create_message (client.messages.stream)
+
+    on_text(fragment) reçoit chaque fragment de texte à son arrivée ; s'il lève
+    StreamAborted, la connexion est fermée (la suite n'est pas générée ni facturée)
+    et l'exception est propagée avec partial_message renseigné.
+
+    Args:
+        client: anthropic.Anthropic
+        on_text (callable): on_text(fragment)
+        limiter (ClaudeRateLimiter): Défaut : claude_limiter
+        max_retries (int): Nombre de relances (429 et erreurs passagères), tant
+            qu'aucun fragment n'a été transmis à on_text
+        **params: Paramètres de messages.create
+
+    Returns:
+        Message complet
+    """
+    limiter = limiter or claude_limiter
+    client = _without_sdk_retries(client)
+    input_tokens = estimate_input_tokens(params)
+    output_tokens = params.get('max_tokens', 1024)
+    delivered = False
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire(input_tokens, output_tokens)
+        start = time.monotonic()
+        try:
+            with client.messages.stream(**params) as stream:
+                limiter.update_from_headers(getattr(getattr(stream, 'response', None), 'headers', None))
+                try:
+                    for fragment in stream.text_stream:
+                        delivered = True
+                        if on_text:
+                            on_text(fragment)
+                except StreamAborted as abort:
+                    abort.partial_message = getattr(stream, 'current_message_snapshot', None)
+                    raise
+                message = stream.get_final_message()
+                _log_call(message, time.monotonic() - start)
+                return message
+        except StreamAborted:
+            raise
+        except Exception as e:
+            if delivered:
+                # Fragments déjà transmis : une relance les dupliquerait
+                raise
+            _handle_error(e, attempt, max_retries, limiter)
@@ -0,0 +1,83 @@
+"""
+Regroupement de requêtes entre workers
+Les workers qui soumettent une requête de même clé (ex : même fiche de poste)
+dans une courte fenêtre sont servis par un seul appel groupé
+Version: 1.0
+"""
+
+import threading
+
+from prospection_utils.logger import log_event
+
+
+class _Group:
+
+    def __init__(self):
+        self.items = []
+        self.results = None
+        self.error = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class RequestGrouper:
+    """
+    Le premier worker d'une clé devient meneur : il attend que le groupe soit
+    complet (max_group_size) ou que max_wait_seconds soit écoulé, exécute
+    execute_group(key, items) et distribue les résultats. Les autres workers
+    du groupe attendent leur résultat.
+    """
+
+    def __init__(self, execute_group, max_group_size=4, max_wait_seconds=3.0):
+        """
+        Args:
+            execute_group (callable): execute_group(key, items) -> résultats (même ordre que items)
+            max_group_size (int): Nombre max de requêtes par appel groupé
+            max_wait_seconds (float): Attente max du meneur avant d'exécuter un groupe incomplet
+        """
+        self.execute_group = execute_group
+        self.max_group_size = max_group_size
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._open = {}
+
+    def submit(self, key, item):
+        """
+        Soumet une requête et attend son résultat (bloquant)
+
+        Raises:
+            Exception levée par execute_group (propagée à tous les membres du groupe)
+        """
+        with self._lock:
+            group = self._open.get(key)
+            leader = group is None
+            if leader:
+                group = _Group()
+                self._open[key] = group
+            index = len(group.items)
+            group.items.append(item)
+            if len(group.items) >= self.max_group_size:
+                # Groupe complet : les suivants ouvrent un nouveau groupe
+                del self._open[key]
+                group.full.set()
+
+        if leader:
+            group.full.wait(self.max_wait_seconds)
+            with self._lock:
+                if self._open.get(key) is group:
+                    del self._open[key]
+                items = list(group.items)
+
+            log_event('request_group_executed', {'key': str(key)[:16], 'size': len(items)})
+            try:
+                group.results = self.execute_group(key, items)
+            except Exception as e:
+                group.error = e
+            finally:
+                group.done.set()
+        else:
+            group.done.wait()
+
+        if group.error is not None:
+            raise group.error
+        return group.results[index]
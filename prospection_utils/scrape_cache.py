@@ -0,0 +1,72 @@
+"""
+Cache des résultats de scraping LinkedIn (Apify)
+Évite de repayer un run d'acteur pour une URL déjà scrapée récemment
+Version: 1.0
+"""
+
+from prospection_utils.disk_cache import DiskCache, make_key
+
+# Les posts au-delà de la fenêtre de filter_recent_posts sont inutiles :
+# garder le TTL des posts bien en dessous de cette fenêtre
+DEFAULT_TTL_HOURS = {
+    'posts': 72,
+    'profile': 24 * 14
+}
+
+linkedin_cache = DiskCache('linkedin_scrapes', max_entries=5000)
+_ttl_hours = dict(DEFAULT_TTL_HOURS)
+
+
+def configure(ttl_hours=None, max_entries=None):
+    """
+    Applique la configuration (config.SCRAPE_CACHE_TTL_HOURS / SCRAPE_CACHE_MAX_ENTRIES)
+
+    Args:
+        ttl_hours (dict): {'posts': heures, 'profile': heures}
+        max_entries (int): Nombre max d'entrées (éviction LRU)
+    """
+    if ttl_hours:
+        _ttl_hours.update(ttl_hours)
+    linkedin_cache.configure(max_entries=max_entries)
+
+
+def scrape_key(actor, normalized_url, variant=None):
+    """Clé de cache : acteur + URL normalisée (+ variante d'input, ex: limitPerSource)"""
+    return make_key(actor, normalized_url, variant)
+
+
+def get_cached(kind, actor, normalized_url, variant=None):
+    """
+    Lit un résultat de scraping en cache
+
+    Args:
+        kind (str): 'posts' ou 'profile' (détermine le TTL)
+
+    Returns:
+        Items en cache, ou None
+    """
+    return linkedin_cache.get(
+        scrape_key(actor, normalized_url, variant),
+        ttl_seconds=_ttl_hours[kind] * 3600
+    )
+
+
+def set_cached(actor, normalized_url, value, variant=None):
+    """Enregistre un résultat de scraping"""
+    linkedin_cache.set(scrape_key(actor, normalized_url, variant), value)
+
+
+def cached_scrape(kind, actor, normalized_url, fetch, variant=None):
+    """
+    Retourne le résultat en cache ou appelle fetch() (non mis en cache si exception)
+    """
+    return linkedin_cache.get_or_fetch(
+        scrape_key(actor, normalized_url, variant),
+        fetch,
+        ttl_seconds=_ttl_hours[kind] * 3600
+    )
+
+
+def stats():
+    """Compteurs hit/miss du cache LinkedIn"""
+    return linkedin_cache.stats()
@@ -0,0 +1,104 @@
+"""
+Lecture incrémentale d'une séquence générée en streaming
+Détecte les délimiteurs ---MESSAGE_1--- / ---MESSAGE_2--- au fil des tokens,
+valide le message 1 dès qu'il est complet et interrompt une sortie mal formée
+Version: 1.0
+"""
+
+from prospection_utils.rate_limiter import StreamAborted
+
+MESSAGE_1_MARKER = '---MESSAGE_1---'
+MESSAGE_2_MARKER = '---MESSAGE_2---'
+
+# Texte toléré avant ---MESSAGE_1--- (au-delà, le format n'est pas respecté)
+MAX_PREAMBLE_CHARS = 200
+
+# Un message 1 plus long sans ---MESSAGE_2--- est une sortie qui dérape
+MAX_MESSAGE_1_CHARS = 3000
+
+
+class MalformedSequenceError(StreamAborted):
+    """Sortie hors format : la génération est interrompue avant la fin"""
+
+
+class SequenceStreamParser:
+    """
+    Alimenté par les fragments de texte du flux (feed), dans l'ordre
+
+    États : 'preamble' (avant MESSAGE_1), 'message_1', 'message_2'
+    """
+
+    def __init__(self, on_message_1=None, max_preamble_chars=MAX_PREAMBLE_CHARS,
+                 max_message_1_chars=MAX_MESSAGE_1_CHARS):
+        """
+        Args:
+            on_message_1 (callable): on_message_1(m1) dès que le message 1 est complet et valide
+            max_preamble_chars (int): Texte toléré avant ---MESSAGE_1---
+            max_message_1_chars (int): Longueur max du message 1
+        """
+        self.on_message_1 = on_message_1
+        self.max_preamble_chars = max_preamble_chars
+        self.max_message_1_chars = max_message_1_chars
+        self.text = ''
+        self.state = 'preamble'
+        self.message_1 = None
+        self._m1_start = None
+        self._m2_start = None
+
+    def feed(self, fragment):
+        """
+        Ajoute un fragment du flux
+
+        Raises:
+            MalformedSequenceError: Format non respecté (le flux doit être interrompu)
+        """
+        # Un délimiteur peut être coupé entre deux fragments : on recherche
+        # depuis la fin du texte précédent moins la longueur du délimiteur
+        search_from = max(0, len(self.text) - len(MESSAGE_2_MARKER) + 1)
+        self.text += fragment
+
+        if self.state == 'preamble':
+            index = self.text.find(MESSAGE_1_MARKER)
+            if index == -1:
+                if len(self.text.strip()) > self.max_preamble_chars:
+                    raise MalformedSequenceError(f"{MESSAGE_1_MARKER} absent en début de réponse")
+                return
+            self.state = 'message_1'
+            self._m1_start = index + len(MESSAGE_1_MARKER)
+            search_from = self._m1_start
+
+        if self.state == 'message_1':
+            index = self.text.find(MESSAGE_2_MARKER, max(search_from, self._m1_start))
+            if index == -1:
+                if len(self.text) - self._m1_start > self.max_message_1_chars:
+                    raise MalformedSequenceError(f"{MESSAGE_2_MARKER} absent après {self.max_message_1_chars} caractères")
+                return
+            self._complete_message_1(self.text[self._m1_start:index].strip())
+            self._m2_start = index + len(MESSAGE_2_MARKER)
+            self.state = 'message_2'
+
+    def _complete_message_1(self, message_1):
+        # Structure imposée par le prompt : "Bonjour [PRÉNOM]," ... "Bien à vous,"
+        if not message_1:
+            raise MalformedSequenceError("message 1 vide")
+        if not message_1.lower().startswith('bonjour'):
+            raise MalformedSequenceError("le message 1 ne commence pas par « Bonjour »")
+
+        self.message_1 = message_1
+        if self.on_message_1:
+            self.on_message_1(message_1)
+
+    def current(self):
+        """
+        Message en cours d'écriture (affichage)
+
+        Returns:
+            tuple: (1 ou 2, texte reçu pour ce message), (0, '') avant MESSAGE_1
+        """
+        if self.state == 'preamble':
+            return 0, ''
+        if self.state == 'message_1':
+            # Ne pas afficher un début de délimiteur encore incomplet
+            text = self.text[self._m1_start:]
+            return 1, text.split('---', 1)[0].strip()
+        return 2, self.text[self._m2_start:].strip()
@@ -3,12 +3,83 @@ Scraper universel pour annonces de poste
 Supporte : HelloWork, LinkedIn Jobs, Apec
 """
 
-import requests
+from prospection_utils.http_client import http
+from prospection_utils.html_parsing import JobPageParser, has_class, response_charset
 from bs4 import BeautifulSoup
 import re
 import time
 
 
+# Extraction rapide (lxml, XPath compilés une fois) : mêmes règles que la
+# logique BeautifulSoup de chaque scraper, qui ne tourne plus qu'en cas d'échec
+JOB_PAGE_PARSERS = {
+    'HelloWork': JobPageParser({
+        'title': {'xpaths': [f"//h1[{has_class('tw-text-3xl')}]", '//h1'], 'separator': ''},
+        'company': {'xpaths': [f"//p[{has_class('tw-text-xl')}]", f"//a[{has_class('company-name')}]"], 'separator': ''},
+        'location': {'xpaths': ["(//span[re:test(text(), 'Localisation')])[1]/..", f"(//div[{has_class('location')}])[1]/.."], 'separator': ''},
+        'contract_type': {'xpaths': ["(//span[re:test(text(), 'Type de contrat')])[1]/..", f"(//div[{has_class('contract-type')}])[1]/.."], 'separator': ''},
+        'description': {'xpaths': [f"//div[{has_class('job-description')}]", "//div[@id='description']"]},
+        'missions': {'xpaths': ["(//h2[re:test(text(), 'Missions|Vos missions')])[1]/following-sibling::*[1]"]},
+        'profile': {'xpaths': ["(//h2[re:test(text(), 'Profil|Profil recherché')])[1]/following-sibling::*[1]"]}
+    }, required=('description',)),
+    'LinkedIn Jobs': JobPageParser({
+        'title': {'xpaths': [f"//h1[{has_class('top-card-layout__title')}]", '//h1'], 'separator': ''},
+        'company': {'xpaths': [f"//a[{has_class('topcard__org-name-link')}]", f"//span[{has_class('topcard__flavor')}]"], 'separator': ''},
+        'location': {'xpaths': ["//span[@class='topcard__flavor topcard__flavor--bullet']"], 'separator': ''},
+        'description': {'xpaths': [f"//div[{has_class('show-more-less-html__markup')}]", f"//div[{has_class('description__text')}]"]}
+    }, required=('description',)),
+    'Apec': JobPageParser({
+        'title': {'xpaths': [f"//h1[{has_class('title')}]", '//h1'], 'separator': ''},
+        'company': {'xpaths': [f"//span[{has_class('company-name')}]", f"//h2[{has_class('company')}]"], 'separator': ''},
+        'location': {'xpaths': [f"//li[{has_class('location')}]", f"//span[{has_class('location')}]"], 'separator': ''},
+        'contract_type': {'xpaths': ["//li[re:test(text(), 'CDI|CDD|Intérim')]"], 'separator': ''},
+        'description': {'xpaths': [f"//div[{has_class('offre-description')}]", f"//div[{has_class('description')}]"]},
+        'missions': {'xpaths': ["(//h3[re:test(text(), 'Mission|Missions')])[1]/following-sibling::*[1]"]},
+        'profile': {'xpaths': ["(//h3[re:test(text(), 'Profil')])[1]/following-sibling::*[1]"]}
+    }, required=('description',)),
+    'Generic': JobPageParser({
+        'title': {'xpaths': ['//h1'], 'separator': ''},
+        # Dix premiers paragraphes, une ligne chacun
+        'description': {'xpaths': ['(//p)[position() <= 10]'], 'separator': '', 'select': 'all'}
+    }, required=('description',))
+}
+
+# Libellés retirés du texte du bloc parent (HelloWork)
+FIELD_LABELS = {'location': 'Localisation', 'contract_type': 'Type de contrat'}
+
+FIELD_MAX_CHARS = {'description': 3000, 'missions': 1500, 'profile': 1500}
+
+
+def parse_job_page(response, source, url):
+    """
+    Annonce extraite par le parseur lxml du job board
+
+    Returns:
+        dict: Données de l'annonce, ou None pour passer à la logique BeautifulSoup
+    """
+    parsed = JOB_PAGE_PARSERS[source].parse(response.content, response_charset(response))
+    if not parsed:
+        return None
+
+    job_data = {
+        'source': source,
+        'url': url,
+        'title': '',
+        'company': '',
+        'location': '',
+        'contract_type': '',
+        'description': '',
+        'missions': '',
+        'profile': '',
+        'benefits': ''
+    }
+    for field, text in parsed.items():
+        if source == 'HelloWork' and field in FIELD_LABELS:
+            text = text.replace(FIELD_LABELS[field], '').strip()
+        job_data[field] = text[:FIELD_MAX_CHARS[field]] if field in FIELD_MAX_CHARS else text
+    return job_data
+
+
 def scrape_job_posting(url):
     """
     Scrappe une annonce de poste depuis différents job boards
@@ -48,12 +119,17 @@ def scrape_hellowork(url):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http.get(url, headers=headers, timeout=10)
         
         if response.status_code != 200:
             print(f"   ❌ Erreur HTTP {response.status_code}")
             return None
         
+        job_data = parse_job_page(response, 'HelloWork', url)
+        if job_data:
+            print(f"   ✅ Annonce HelloWork extraite : {job_data['title'][:50]}...")
+            return job_data
+        
         soup = BeautifulSoup(response.content, 'html.parser')
         
         # Extraction HelloWork
@@ -130,12 +206,17 @@ def scrape_linkedin_job(url):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http.get(url, headers=headers, timeout=10)
         
         if response.status_code != 200:
             print(f"   ❌ Erreur HTTP {response.status_code}")
             return None
         
+        job_data = parse_job_page(response, 'LinkedIn Jobs', url)
+        if job_data:
+            print(f"   ✅ Annonce LinkedIn extraite : {job_data['title'][:50]}...")
+            return job_data
+        
         soup = BeautifulSoup(response.content, 'html.parser')
         
         job_data = {
@@ -188,12 +269,17 @@ def scrape_apec(url):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http.get(url, headers=headers, timeout=10)
         
         if response.status_code != 200:
             print(f"   ❌ Erreur HTTP {response.status_code}")
             return None
         
+        job_data = parse_job_page(response, 'Apec', url)
+        if job_data:
+            print(f"   ✅ Annonce Apec extraite : {job_data['title'][:50]}...")
+            return job_data
+        
         soup = BeautifulSoup(response.content, 'html.parser')
         
         job_data = {
@@ -268,12 +354,17 @@ def scrape_generic(url):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http.get(url, headers=headers, timeout=10)
         
         if response.status_code != 200:
             print(f"   ❌ Erreur HTTP {response.status_code}")
             return None
         
+        job_data = parse_job_page(response, 'Generic', url)
+        if job_data:
+            print(f"   ⚠️  Extraction générique (limitée)")
+            return job_data
+        
         soup = BeautifulSoup(response.content, 'html.parser')
         
         job_data = {
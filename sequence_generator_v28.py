@@ -14,7 +14,20 @@ import anthropic
 import os
 import re
 import json
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
+
+from prospection_utils.apify_batch import (
+    scrape_posts_batch, scrape_profiles_batch, scrape_posts_cached, scrape_profile_cached
+)
+from prospection_utils.prompt_cache import cached_system
+from prospection_utils.rate_limiter import create_message
+from prospection_utils.model_router import route_model
+from prospection_utils.cost_tracker import compute_cost
+from prospection_utils import date_parsing
+from prospection_utils.prompt_budget import (
+    estimate_tokens, allocate, fit_items, fit_job_description, max_tokens_per_post, share_budget
+)
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 APIFY_API_TOKEN = os.getenv("APIFY_API_TOKEN")
@@ -56,35 +69,48 @@ class CostTracker:
     def __init__(self):
         self.total_input_tokens = 0
         self.total_output_tokens = 0
+        self.total_cache_creation_tokens = 0
+        self.total_cache_read_tokens = 0
         self.total_cost = 0
         self.calls = []
     
-    def track(self, usage, function_name):
-        """Enregistre un appel API"""
+    def track(self, usage, function_name, latency=None, model=None):
+        """Enregistre un appel API (latency : durée de l'appel en secondes, model : tarif)"""
         input_tokens = usage.input_tokens
         output_tokens = usage.output_tokens
+        cache_creation_tokens = getattr(usage, 'cache_creation_input_tokens', None) or 0
+        cache_read_tokens = getattr(usage, 'cache_read_input_tokens', None) or 0
         
-        # Prix Claude Sonnet
-        cost = (input_tokens * 0.003 + output_tokens * 0.015) / 1000
+        # Prix selon le modèle (cache : écriture +25%, lecture -90%)
+        cost = compute_cost(usage, model=model)
         
         self.total_input_tokens += input_tokens
         self.total_output_tokens += output_tokens
+        self.total_cache_creation_tokens += cache_creation_tokens
+        self.total_cache_read_tokens += cache_read_tokens
         self.total_cost += cost
         
         self.calls.append({
             'function': function_name,
+            'model': model,
             'input_tokens': input_tokens,
             'output_tokens': output_tokens,
+            'cache_creation_tokens': cache_creation_tokens,
+            'cache_read_tokens': cache_read_tokens,
+            'latency_s': round(latency, 2) if latency is not None else None,
             'cost': cost
         })
         
-        print(f"💰 [{function_name}] Tokens: {input_tokens}→{output_tokens} | Coût: ${cost:.4f}")
+        print(f"💰 [{function_name}] Tokens: {input_tokens}→{output_tokens} "
+              f"(cache lu: {cache_read_tokens}, écrit: {cache_creation_tokens}) | Coût: ${cost:.4f}")
     
     def get_summary(self):
         return {
             'total_calls': len(self.calls),
             'total_input_tokens': self.total_input_tokens,
             'total_output_tokens': self.total_output_tokens,
+            'total_cache_creation_tokens': self.total_cache_creation_tokens,
+            'total_cache_read_tokens': self.total_cache_read_tokens,
             'total_cost': self.total_cost
         }
     
@@ -122,9 +148,8 @@ def scrape_linkedin_profile(apify_client, linkedin_url):
     try:
         log_event('scrape_linkedin_profile_start', {'url': linkedin_url})
         
-        run_input = {"profileUrls": [linkedin_url]}
-        run = apify_client.actor("dev_fusion/Linkedin-Profile-Scraper").call(run_input=run_input)
-        items = list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
+        # Cache disque : pas de nouveau run Apify si profil scrapé récemment
+        items = scrape_profile_cached(apify_client, linkedin_url)
         
         if items:
             log_event('scrape_linkedin_profile_success', {'items_count': len(items)})
@@ -141,15 +166,8 @@ def scrape_linkedin_posts(apify_client, linkedin_url):
     try:
         log_event('scrape_linkedin_posts_start', {'url': linkedin_url})
         
-        run_input = {
-            "deepScrape": True,
-            "limitPerSource": 5,
-            "rawData": False,
-            "urls": [linkedin_url]
-        }
-        
-        run = apify_client.actor("supreme_coder/linkedin-post").call(run_input=run_input)
-        items = list(apify_client.dataset(run["defaultDatasetId"]).iterate_items())
+        # Cache disque : pas de nouveau run Apify si posts scrapés récemment
+        items = scrape_posts_cached(apify_client, linkedin_url, limit_per_source=5)
         
         # Filtrer posts < 3 mois
         filtered = filter_recent_posts(items)
@@ -165,37 +183,40 @@ def scrape_linkedin_posts(apify_client, linkedin_url):
         return []
 
 
+def scrape_linkedin_profiles_batch(apify_client, linkedin_urls, chunk_size=25):
+    """
+    Scrape plusieurs profils LinkedIn en quelques runs Apify
+    Retourne {url_normalisée: profil} (URLs en échec absentes)
+    """
+    try:
+        return scrape_profiles_batch(apify_client, linkedin_urls, chunk_size=chunk_size)
+    except Exception as e:
+        log_error('scrape_linkedin_profiles_batch_error', str(e), {'urls': len(linkedin_urls)})
+        return {}
+
+
+def scrape_linkedin_posts_batch(apify_client, linkedin_urls, chunk_size=25):
+    """
+    Scrape les posts de plusieurs profils LinkedIn en quelques runs Apify
+    Retourne {url_normalisée: posts filtrés <3 mois} (URLs en échec absentes)
+    """
+    try:
+        posts_by_url = scrape_posts_batch(apify_client, linkedin_urls, limit_per_source=5, chunk_size=chunk_size)
+        return {url: filter_recent_posts(items) for url, items in posts_by_url.items()}
+    except Exception as e:
+        log_error('scrape_linkedin_posts_batch_error', str(e), {'urls': len(linkedin_urls)})
+        return {}
+
+
 def filter_recent_posts(posts, max_age_months=3):
-    """Filtre les posts < 3 mois"""
-    if not posts:
-        return []
-    
-    cutoff = datetime.now() - timedelta(days=max_age_months * 30)
-    recent = []
-    
-    for post in posts[:10]:
-        if not isinstance(post, dict):
-            continue
-        
-        date_str = post.get('date') or post.get('postedDate') or ''
-        
-        # Parser la date
-        post_date = None
-        for fmt in ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y']:
-            try:
-                post_date = datetime.strptime(str(date_str)[:10], fmt)
-                break
-            except:
-                continue
-        
-        if post_date and post_date >= cutoff:
-            recent.append(post)
-        elif not post_date:
-            # Pas de date → garder par défaut (max 3)
-            if len(recent) < 3:
-                recent.append(post)
-    
-    return recent[:5]
+    """
+    Filtre les posts < 3 mois (10 premiers posts examinés ; un post sans date
+    n'est gardé que si moins de 3 posts sont déjà retenus)
+    Dates : prospection_utils.date_parsing
+    """
+    return date_parsing.filter_recent_posts(
+        (posts or [])[:10], max_age_months=max_age_months, max_posts=5, max_undated_when_fewer_than=3
+    )
 
 
 # ========================================
@@ -232,14 +253,26 @@ def get_job_title(job_posting_data):
     return title.strip()
 
 
-def format_posts_for_prompt(posts):
-    """Formate les posts LinkedIn pour le prompt"""
+def format_posts_for_prompt(posts, max_tokens=None):
+    """
+    Formate les posts LinkedIn pour le prompt
+    max_tokens : budget des textes (par défaut la part 'posts' du budget)
+    """
     if not posts:
         return "Aucun post LinkedIn récent trouvé."
     
+    posts = [post for post in posts if post.get('text')]
+    if not posts:
+        return "Aucun post LinkedIn récent trouvé."
+    
+    texts = fit_items(
+        [post['text'] for post in posts],
+        max_tokens if max_tokens is not None else share_budget('posts'),
+        max_tokens_per_post()
+    )
+    
     formatted = []
-    for i, post in enumerate(posts[:5], 1):
-        text = post.get('text', '')[:400]
+    for i, (post, text) in enumerate(zip(posts, texts), 1):
         date = post.get('date', post.get('postedDate', 'date inconnue'))
         title = post.get('title', '')
         
@@ -288,46 +321,15 @@ Bonne continuation,"""
 # GÉNÉRATION SÉQUENCE - 1 APPEL CLAUDE
 # ========================================
 
-def generate_sequence_v28(prospect_data, posts_data, job_posting_data, profile_data=None):
-    """
-    Génère M1 + M2 en UN SEUL appel Claude
-    M3 = template fixe
-    """
-    
-    log_event('generate_sequence_v28_start', {
-        'prospect': prospect_data.get('full_name', 'unknown'),
-        'has_posts': bool(posts_data),
-        'has_job_posting': bool(job_posting_data)
-    })
-    
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    
-    # Extraire données
-    prenom = get_firstname(prospect_data)
-    titre_poste = get_job_title(job_posting_data)
-    
-    # Formater pour le prompt
-    posts_formatted = format_posts_for_prompt(posts_data)
-    profile_formatted = format_profile_for_prompt(profile_data or prospect_data)
-    fiche_formatted = job_posting_data.get('description', 'Fiche de poste non disponible') if job_posting_data else 'Fiche de poste non disponible'
-    
-    prompt = f"""Tu es chasseur de têtes Finance chez Entourage Recrutement.
-Tu dois générer 2 messages de prospection pour ce prospect.
-
-═══════════════════════════════════════════════════════════════════
-DONNÉES PROSPECT
-═══════════════════════════════════════════════════════════════════
-{profile_formatted}
-
-═══════════════════════════════════════════════════════════════════
-POSTS LINKEDIN RÉCENTS
-═══════════════════════════════════════════════════════════════════
-{posts_formatted}
-
-═══════════════════════════════════════════════════════════════════
-FICHE DE POSTE : {titre_poste}
-═══════════════════════════════════════════════════════════════════
-{fiche_formatted[:2500]}
+# Consignes identiques pour tous les prospects : préfixe système mis en cache
+# (prompt caching), les données du prospect sont dans le message utilisateur.
+# ~900-1100 tokens (3k caractères) : à la limite du minimum Sonnet (1024), sous
+# celui de Haiku (2048) ; voir cache_creation_tokens dans les logs 'claude_call'
+SEQUENCE_SYSTEM_PROMPT = """Tu es chasseur de têtes Finance chez Entourage Recrutement.
+Tu dois générer 2 messages de prospection pour le prospect décrit dans le message utilisateur
+(données prospect, posts LinkedIn, fiche de poste).
+Dans les structures ci-dessous, remplace [PRÉNOM] et [POSTE] par les valeurs indiquées
+à la fin du message utilisateur.
 
 ═══════════════════════════════════════════════════════════════════
 GÉNÈRE LES 2 MESSAGES SUIVANTS
@@ -335,14 +337,14 @@ GÉNÈRE LES 2 MESSAGES SUIVANTS
 
 **MESSAGE 1 (Icebreaker)** - Structure EXACTE :
 
-Bonjour {prenom},
+Bonjour [PRÉNOM],
 
 [HOOK - CHOISIS UNE OPTION :]
 Option A (si un post LinkedIn est pertinent et récent) : 
   Référence personnalisée au post (mentionne le sujet PRÉCIS, pas de généralités)
   Puis transition vers le poste.
 Option B (si pas de post pertinent) :
-  "Je vous contacte concernant votre recherche de {titre_poste}."
+  "Je vous contacte concernant votre recherche de [POSTE]."
 
 [PAIN POINT #1]
 Identifie LA difficulté principale de ce recrutement en utilisant le VOCABULAIRE EXACT de la fiche.
@@ -359,9 +361,9 @@ Bien à vous,
 
 **MESSAGE 2 (Relance avec profils)** - Structure EXACTE :
 
-Bonjour {prenom},
+Bonjour [PRÉNOM],
 
-Je me permets de vous relancer concernant votre recherche de {titre_poste}.
+Je me permets de vous relancer concernant votre recherche de [POSTE].
 
 [PAIN POINT #2 - DIFFÉRENT DE M1]
 Angle complémentaire sur une AUTRE difficulté du recrutement.
@@ -400,14 +402,75 @@ Retourne UNIQUEMENT les 2 messages, séparés par une ligne :
 [contenu message 2]
 """
 
+
+def generate_sequence_v28(prospect_data, posts_data, job_posting_data, profile_data=None):
+    """
+    Génère M1 + M2 en UN SEUL appel Claude
+    M3 = template fixe
+    """
+    
+    log_event('generate_sequence_v28_start', {
+        'prospect': prospect_data.get('full_name', 'unknown'),
+        'has_posts': bool(posts_data),
+        'has_job_posting': bool(job_posting_data)
+    })
+    
+    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    
+    # Extraire données
+    prenom = get_firstname(prospect_data)
+    titre_poste = get_job_title(job_posting_data)
+    
+    # Formater pour le prompt (fiche et posts ramenés au budget de tokens)
+    description = job_posting_data.get('description', '') if job_posting_data else ''
+    budgets = allocate({
+        'job_description': estimate_tokens(description),
+        'posts': sum(min(estimate_tokens(post.get('text', '')), max_tokens_per_post()) for post in posts_data or [])
+    })
+    posts_formatted = format_posts_for_prompt(posts_data, budgets['posts'])
+    profile_formatted = format_profile_for_prompt(profile_data or prospect_data)
+    fiche_formatted = fit_job_description(description, budgets['job_description']) or 'Fiche de poste non disponible'
+    
+    # Seule partie variable du prompt (le préfixe système est mis en cache)
+    prompt = f"""═══════════════════════════════════════════════════════════════════
+DONNÉES PROSPECT
+═══════════════════════════════════════════════════════════════════
+{profile_formatted}
+
+═══════════════════════════════════════════════════════════════════
+POSTS LINKEDIN RÉCENTS
+═══════════════════════════════════════════════════════════════════
+{posts_formatted}
+
+═══════════════════════════════════════════════════════════════════
+FICHE DE POSTE : {titre_poste}
+═══════════════════════════════════════════════════════════════════
+{fiche_formatted}
+
+═══════════════════════════════════════════════════════════════════
+[PRÉNOM] = {prenom}
+[POSTE] = {titre_poste}
+═══════════════════════════════════════════════════════════════════
+
+Génère les 2 messages."""
+
     try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
+        start = time.perf_counter()
+        message = create_message(
+            client,
+            model=route_model(
+                'sequence',
+                posts_count=len(posts_data or []),
+                has_job_description=bool(job_posting_data),
+                prospect=prospect_data.get('full_name', 'unknown')
+            ),
             max_tokens=1500,
+            system=cached_system(SEQUENCE_SYSTEM_PROMPT),
             messages=[{"role": "user", "content": prompt}]
         )
         
-        tracker.track(message.usage, 'generate_sequence_v28')
+        tracker.track(message.usage, 'generate_sequence_v28', latency=time.perf_counter() - start,
+                      model=message.model)
         result = message.content[0].text.strip()
         
         # Parser les messages
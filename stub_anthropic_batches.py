@@ -0,0 +1,157 @@
+"""
+Serveur local simulant l'API Message Batches d'Anthropic
+Permet de tester le mode batch sans appel réel ni coût
+
+Usage :
+    python stub_anthropic_batches.py [port]
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 streamlit run app_streamlit.py
+
+Endpoints simulés (avec ou sans ?beta=true) :
+    POST /v1/messages/batches
+    GET  /v1/messages/batches/{id}
+    GET  /v1/messages/batches/{id}/results
+Un batch passe à 'ended' après STUB_PROCESSING_SECONDS.
+"""
+
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+DEFAULT_PORT = 8765
+STUB_PROCESSING_SECONDS = 5
+
+# Réponse simulée (format attendu par parse_messages)
+STUB_RESPONSE = """---MESSAGE_1---
+Bonjour [stub],
+
+Je vous contacte concernant votre recherche.
+
+Quels sont les principaux écarts que vous observez entre vos attentes et les profils rencontrés ?
+
+Bien à vous,
+---MESSAGE_2---
+Bonjour [stub],
+
+Je me permets de vous relancer concernant votre recherche.
+
+Bien à vous,"""
+
+_batches = {}
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _batch_object(batch, base_url):
+    ended = time.time() - batch['created_at'] >= STUB_PROCESSING_SECONDS
+    count = len(batch['requests'])
+    return {
+        'id': batch['id'],
+        'type': 'message_batch',
+        'processing_status': 'ended' if ended else 'in_progress',
+        'request_counts': {
+            'processing': 0 if ended else count,
+            'succeeded': count if ended else 0,
+            'errored': 0,
+            'canceled': 0,
+            'expired': 0
+        },
+        'created_at': _iso(batch['created_at']),
+        'expires_at': _iso(batch['created_at'] + timedelta(days=1).total_seconds()),
+        'ended_at': _iso(batch['created_at'] + STUB_PROCESSING_SECONDS) if ended else None,
+        'cancel_initiated_at': None,
+        'archived_at': None,
+        'results_url': f"{base_url}/v1/messages/batches/{batch['id']}/results" if ended else None
+    }
+
+
+def _result_line(request):
+    params = request.get('params', {})
+    return {
+        'custom_id': request['custom_id'],
+        'result': {
+            'type': 'succeeded',
+            'message': {
+                'id': f"msg_stub_{uuid.uuid4().hex[:12]}",
+                'type': 'message',
+                'role': 'assistant',
+                'model': params.get('model', 'stub'),
+                'content': [{'type': 'text', 'text': STUB_RESPONSE}],
+                'stop_reason': 'end_turn',
+                'stop_sequence': None,
+                'usage': {
+                    'input_tokens': 100,
+                    'output_tokens': 200,
+                    'cache_creation_input_tokens': 0,
+                    'cache_read_input_tokens': 900
+                }
+            }
+        }
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def _base_url(self):
+        return f"http://{self.headers.get('Host', f'127.0.0.1:{self.server.server_port}')}"
+
+    def _send_json(self, status, payload, content_type='application/json'):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip('/')
+        if path != '/v1/messages/batches':
+            return self._not_found()
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        batch = {
+            'id': f"msgbatch_stub_{uuid.uuid4().hex[:16]}",
+            'created_at': time.time(),
+            'requests': payload.get('requests', [])
+        }
+        _batches[batch['id']] = batch
+        self._send_json(200, _batch_object(batch, self._base_url()))
+
+    def do_GET(self):
+        parts = urlparse(self.path).path.strip('/').split('/')
+        # v1 / messages / batches / {id} [/ results]
+        if len(parts) < 4 or parts[:3] != ['v1', 'messages', 'batches'] or parts[3] not in _batches:
+            return self._not_found()
+
+        batch = _batches[parts[3]]
+        if len(parts) == 4:
+            return self._send_json(200, _batch_object(batch, self._base_url()))
+
+        if len(parts) == 5 and parts[4] == 'results':
+            lines = '\n'.join(json.dumps(_result_line(request)) for request in batch['requests'])
+            return self._send_json(200, lines.encode('utf-8'), content_type='application/x-jsonl')
+
+        self._not_found()
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    print(f"🧪 Stub Message Batches sur http://127.0.0.1:{port} (Ctrl+C pour arrêter)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()